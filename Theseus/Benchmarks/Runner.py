@@ -0,0 +1,163 @@
+import json
+import os
+import platform
+import time
+
+from Theseus.Common.Base import Data
+from Theseus.version import __version__
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Benchmarks - Timing , results and regression checks'
+__all__ = ['BenchmarkResult', 'measure', 'write_results', 'load_results', 'compare']
+
+
+class BenchmarkResult(Data):
+    """ The timings of one benchmark
+
+    Members:
+        name (str): the benchmark name , parameters are added in brackets e.g. fetch_wallet_list[wallets=100]
+        params (dict): the parameters the benchmark was run with
+        operations (int): how many operations were timed
+        elapsed (float): seconds the timed operations took in total
+        ops_per_second (float): operations per second
+        latency (dict): min , mean , p50 , p90 , p99 and max seconds per operation
+        bytes (int): bytes moved by the operations , 0 unless the operation reports them
+        bytes_per_second (float): bytes moved per second
+
+    """
+    def __init__(self, name, params=None, operations=0, elapsed=0.0, latency=None, bytes=0):
+        self.name = name
+        self.params = params or {}
+        self.operations = operations
+        self.elapsed = elapsed
+        self.ops_per_second = operations / elapsed if elapsed else 0.0
+        self.latency = latency or {}
+        self.bytes = bytes
+        self.bytes_per_second = bytes / elapsed if elapsed else 0.0
+
+    @classmethod
+    def from_latencies(cls, name, latencies, params=None, bytes=0):
+        """ Make a result from the seconds each operation took """
+        ordered = sorted(latencies)
+        if not ordered:
+            return cls(name, params)
+
+        def percentile(fraction):
+            return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+        latency = dict(
+            min=ordered[0],
+            mean=sum(ordered) / len(ordered),
+            p50=percentile(0.5),
+            p90=percentile(0.9),
+            p99=percentile(0.99),
+            max=ordered[-1],
+        )
+        return cls(name, params, len(ordered), sum(ordered), latency, bytes)
+
+    def to_dict(self) -> dict:
+        return dict(name=self.name, params=self.params, operations=self.operations, elapsed=self.elapsed,
+                    ops_per_second=self.ops_per_second, latency=self.latency, bytes=self.bytes,
+                    bytes_per_second=self.bytes_per_second)
+
+    def dump(self) -> str:
+        template = "{0:<40} {1:>12.1f} ops/s  p50 {2:>9.3f}ms  p99 {3:>9.3f}ms"
+        line = template.format(self.name, self.ops_per_second, self.latency.get('p50', 0) * 1000,
+                               self.latency.get('p99', 0) * 1000)
+        if self.bytes:
+            line += "  {0:>8.2f} MB/s".format(self.bytes_per_second / 1000000)
+        return line
+
+
+def measure(name: str, operation, iterations: int=100, warmup: int=5, **params) -> BenchmarkResult:
+    """ Measure: time an operation over and over
+
+    Args:
+        name(str): the benchmark name
+        operation(callable): called with no arguments for each operation , if it returns an int that is taken as the
+                             number of bytes it moved
+        iterations(int): how many times to time the operation, default 100
+        warmup(int): how many times to run it first without timing so caches and connections are warm, default 5
+        params: the parameters of this run , they are recorded and added to the name
+
+    Returns:
+        BenchmarkResult: the timings
+
+    """
+    for i in range(warmup):
+        operation()
+
+    latencies = []
+    moved = 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        result = operation()
+        latencies.append(time.perf_counter() - start)
+        if isinstance(result, int) and not isinstance(result, bool):
+            moved += result
+
+    if params:
+        name = '{0}[{1}]'.format(name, ','.join('{0}={1}'.format(key, value) for key, value in sorted(params.items())))
+    return BenchmarkResult.from_latencies(name, latencies, params, moved)
+
+
+def write_results(results, path: str):
+    """ Write results to a json file with details of the machine they were taken on
+
+    Args:
+        results(list): the BenchmarkResults
+        path(str): the file to write
+
+    """
+    document = dict(
+        timestamp=time.time(),
+        theseus=__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results={result.name: result.to_dict() for result in results},
+    )
+    # write then rename so an interrupted run never leaves a half written file
+    temporary = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(temporary, 'w') as handle:
+        json.dump(document, handle, sort_keys=True, indent=4)
+    os.replace(temporary, path)
+
+
+def load_results(path: str) -> dict:
+    """ Read results written by write_results
+
+    Returns:
+        dict: the result dicts keyed by benchmark name
+
+    """
+    with open(path) as handle:
+        return json.load(handle)['results']
+
+
+def compare(results, baseline: dict, tolerance: float=0.2) -> list:
+    """ Compare: find the benchmarks that got slower than a baseline
+
+    Args:
+        results(list): the BenchmarkResults of this run
+        baseline(dict): the results of an earlier run , as returned by load_results
+        tolerance(float): the fraction a benchmark may slow down by before it counts as a regression, default 0.2
+
+    Returns:
+        list: a dict for each regression with the name , baseline and current ops per second and the change
+
+    Notes:
+        Benchmarks missing from either side are ignored. Throughput is compared rather than latency because it
+        takes in every operation and so is steadier from run to run.
+
+    """
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if not before or not before.get('ops_per_second'):
+            continue
+
+        change = result.ops_per_second / before['ops_per_second'] - 1
+        if change < -tolerance:
+            regressions.append(dict(name=result.name, baseline=before['ops_per_second'],
+                                    current=result.ops_per_second, change=change))
+    return regressions
@@ -0,0 +1,184 @@
+import json
+import socket
+import threading
+
+from Theseus.Benchmarks.Runner import measure, BenchmarkResult
+from Theseus.Common.Address import AddressRequest, AddressResponse
+from Theseus.Common.Generators import generate_mnemonic, encode_spending_password
+from Theseus.Common.Transaction import TransactionRequest, TransactionResponse, TransactionSource, \
+    TransactionDestination
+from Theseus.Common.Wallet import Wallet
+from Theseus.Common.WalletAPI import WalletAPI
+from Theseus.Mock import MockWalletBackend, MockSSHServer, EchoServer
+from Theseus.Protocols.SSHTunnel import SSHTunnel
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Benchmarks - The benchmarks of the client stack'
+__all__ = ['SUITES', 'run', 'generators', 'models', 'api', 'tunnel']
+
+# canned api answers for the model benchmarks , shaped like the real backend's
+_TRANSACTION = dict(status='success', meta={}, data=dict(
+    id='7a8f1ea5e8c5b3b0e25c3b0c0ba1f48f9c6d2e3b1c0d3a9f1b4c5d6e7f8a9b0c',
+    creationTime='2018-10-18T12:00:00.000000', amount=1000000, confirmations=3, direction='outgoing', type='local',
+    status=dict(tag='inNewestBlocks', data={}),
+    inputs=[dict(amount=1000000 + index, address='DdzFFzCqrhsinput{0}'.format(index)) for index in range(4)],
+    outputs=[dict(amount=250000, address='DdzFFzCqrhsoutput{0}'.format(index)) for index in range(4)]))
+
+_ADDRESS = dict(status='success', meta={}, data=dict(id='DdzFFzCqrhsqVGpbnv3LcgKjmiUPsHbqE1kQx5UnBFKL1ENrT8rcsbU',
+                                                     used=False, changeAddress=False))
+
+_WALLET = dict(id='2b5a31f2d5d3d97fd6e8c7b8c9b8ad3dfe8c9b7a', name='benchmark', balance=1000000,
+               assuranceLevel='normal', hasSpendingPassword=False, spendingPasswordLastUpdate='2018-10-18T12:00:00',
+               createdAt='2018-10-18T12:00:00', syncState=dict(tag='synced', data=None), type='regular')
+
+
+def generators(iterations: int=1000) -> list:
+    """ The mnemonic and spending password generators """
+    return [
+        measure('generate_mnemonic', generate_mnemonic, iterations),
+        measure('encode_spending_password', lambda: encode_spending_password('benchmark password'), iterations),
+    ]
+
+
+def models(iterations: int=1000) -> list:
+    """ Turning the api models into json and back """
+    source = TransactionSource(2147483648, _WALLET['id'])
+    destinations = [TransactionDestination(250000, output['address']) for output in _TRANSACTION['data']['outputs']]
+    request = TransactionRequest(source, destinations)
+    transaction = json.dumps(_TRANSACTION)
+    address = json.dumps(_ADDRESS)
+
+    def wallet_round_trip():
+        return Wallet(**json.loads(Wallet(**_WALLET).to_json()))
+
+    return [
+        measure('TransactionRequest.to_json', request.to_json, iterations),
+        measure('TransactionResponse.from_json', lambda: TransactionResponse(transaction), iterations),
+        measure('AddressResponse.from_json', lambda: AddressResponse(address), iterations),
+        measure('Wallet.round_trip', wallet_round_trip, iterations),
+    ]
+
+
+def api(iterations: int=100, wallet_counts=(10, 100, 1000)) -> list:
+    """ WalletAPI calls against a Theseus.Mock.MockWalletBackend
+
+    Args:
+        iterations(int): how many of each call to time
+        wallet_counts(tuple): how many wallets the backend holds for each run of fetch_wallet_list , all of them are
+                              fetched in one page
+
+    """
+    results = []
+    warmup = 5
+    with MockWalletBackend(initial_balance=10 ** 15, seed=1) as backend:
+        client = WalletAPI(automatic=False, **backend.api_args())
+
+        # make the phrases first so only the api call is timed
+        phrases = iter([generate_mnemonic() for i in range(iterations + warmup)])
+        results.append(measure('create_wallet', lambda: client.create_wallet('benchmark', next(phrases)),
+                               iterations, warmup))
+
+        payer = client.create_wallet('payer', generate_mnemonic())
+        payee = client.create_wallet('payee', generate_mnemonic())
+        address = list(client.create_address(AddressRequest(payee)).data)[0]
+        request = TransactionRequest(TransactionSource(payer.account[0].index, payer.id),
+                                     [TransactionDestination(1, address)])
+        results.append(measure('transact', lambda: client.transact(request), iterations, warmup))
+
+    for count in wallet_counts:
+        with MockWalletBackend(seed=1) as backend:
+            # fill the backend directly , going through the api would take longer than the benchmark
+            for i in range(count):
+                backend.state.create_wallet(dict(name='wallet {0}'.format(i),
+                                                 backupPhrase=generate_mnemonic().split()))
+            client = WalletAPI(automatic=False, **backend.api_args())
+            results.append(measure('fetch_wallet_list', lambda: client.fetch_wallet_list(per_page=count),
+                                   iterations, warmup, wallets=count))
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def tunnel(iterations: int=20, size: int=1000000) -> list:
+    """ Bytes through an SSHTunnel to a Theseus.Mock.EchoServer by way of a Theseus.Mock.MockSSHServer
+
+    Both forwarding modes are measured.
+
+    Args:
+        iterations(int): how many times to send the payload
+        size(int): bytes to send each time , they all come back so twice this crosses the tunnel
+
+    """
+    return [_tunnel_round_trips(mode, iterations, size) for mode in ('threads', 'asyncio')]
+
+
+def _tunnel_round_trips(mode: str, iterations: int, size: int) -> BenchmarkResult:
+    payload = b'\x00' * size
+
+    with EchoServer() as echo, MockSSHServer() as ssh:
+        forward = SSHTunnel('theseus', ssh.host, ssh.port, localport=_free_port(), remoteport=echo.port,
+                            key_filename=ssh.key_filename, mode=mode)
+        connection = socket.create_connection(('127.0.0.1', forward.localport))
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def round_trip():
+            # read in another thread so neither side stalls on a full socket buffer
+            received = [0]
+
+            def drain():
+                while received[0] < size:
+                    data = connection.recv(65536)
+                    if not data:
+                        break
+                    received[0] += len(data)
+
+            reader = threading.Thread(target=drain)
+            reader.start()
+            connection.sendall(payload)
+            reader.join()
+            return received[0]
+
+        try:
+            return measure('ssh_tunnel', round_trip, iterations, 2, size=size, mode=mode)
+        finally:
+            connection.close()
+            forward.stop_tunnel()
+
+
+# the suites in the order they run
+SUITES = dict(generators=generators, models=models, api=api, tunnel=tunnel)
+
+# smaller runs for a quick check , e.g. on every commit
+QUICK = dict(
+    generators=dict(iterations=100),
+    models=dict(iterations=100),
+    api=dict(iterations=10, wallet_counts=(10, 100)),
+    tunnel=dict(iterations=3, size=100000),
+)
+
+
+def run(names=None, quick: bool=False, progress=None) -> list:
+    """ Run: run the benchmark suites
+
+    Args:
+        names(list): the suites to run , default None for all of them
+        quick(bool): True for short runs that are noisier but finish in seconds, default False
+        progress(callable): called with each BenchmarkResult as it is made
+
+    Returns:
+        list: the BenchmarkResults
+
+    """
+    results = []
+    for name, suite in SUITES.items():
+        if names and name not in names:
+            continue
+        for result in suite(**(QUICK[name] if quick else {})):
+            if progress:
+                progress(result)
+            results.append(result)
+    return results
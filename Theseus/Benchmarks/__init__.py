@@ -0,0 +1,6 @@
+from .Runner import BenchmarkResult, measure, write_results, load_results, compare
+from .Suites import SUITES, run
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Benchmarks - throughput and latency of the client stack against local stand ins'
+__all__ = ['BenchmarkResult', 'measure', 'write_results', 'load_results', 'compare', 'SUITES', 'run']
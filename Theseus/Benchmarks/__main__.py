@@ -0,0 +1,56 @@
+import argparse
+import logging
+import sys
+
+from Theseus.Benchmarks import SUITES, run, write_results, load_results, compare
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Benchmarks - run the benchmarks from the command line'
+
+
+def main(argv=None) -> int:
+    """ Run the benchmarks , write the results and check them against a baseline
+
+    Usage::
+
+        python -m Theseus.Benchmarks --output baseline.json
+        python -m Theseus.Benchmarks --quick --only models,api --baseline baseline.json --tolerance 0.25
+
+    Returns:
+        int: 1 if anything regressed past the tolerance , otherwise 0
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m Theseus.Benchmarks', description=__doc__)
+    parser.add_argument('--output', default='benchmarks.json', help='where to write the json results')
+    parser.add_argument('--only', default='', help='comma separated suites to run from: ' + ', '.join(SUITES))
+    parser.add_argument('--quick', action='store_true', help='short noisy runs that finish in seconds')
+    parser.add_argument('--baseline', help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='the fraction a benchmark may slow down by before failing, default 0.2')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='theseus log level while running , the default keeps logging out of the timings')
+    args = parser.parse_args(argv)
+
+    names = [name for name in args.only.split(',') if name]
+    unknown = set(names) - set(SUITES)
+    if unknown:
+        parser.error('unknown suites: {0}'.format(', '.join(sorted(unknown))))
+
+    logging.getLogger('theseus').setLevel(args.log_level)
+
+    results = run(names, quick=args.quick, progress=lambda result: print(result.dump(), flush=True))
+    write_results(results, args.output)
+    print('Results written to {0}'.format(args.output))
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION {name}: {baseline:.1f} -> {current:.1f} ops/s ({change:+.0%})'.format(**regression))
+        if regressions:
+            return 1
+        print('No regressions against {0}'.format(args.baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
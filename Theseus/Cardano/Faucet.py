@@ -1,6 +1,8 @@
 import requests
 import Theseus
 import json
+from Theseus.Protocols.RateLimit import RateLimiter
+from Theseus.Logging import PayloadLogger, get_payload_logger
 
 # this hasn't been run yet , the captcha is getting in the way
 # it may need to be replaced by a specific wallet containing funds for tests
@@ -16,18 +18,41 @@ class Faucet:
     If you have ada left over after testing you can return it to the faucet by making a transaction to a faucet receive address which can be obtained wiht get_return_address
 
     This code is currently prevented from working by the existence of a recapcha check and so will fail.
+
+    The faucet rate limits withdrawals so pass a Theseus.Protocols.RateLimit.RateLimiter to keep under its limits ,
+    the endpoints are named withdraw and get_return_address. The same limiter can be shared by every Faucet in a run.
+
+    Args:
+        network(str): the network to use the faucet of, default TestNet
+        rate_limiter(RateLimiter): token buckets to limit the request rate of each endpoint , default None for no
+                                   limits
+        payload_logger(PayloadLogger): how much of the faucet payloads to log , default the shared one which can be
+                                       changed with Theseus.set_payload_logging
      
     """
-    def __init_(self, network: str='TestNet'):
+    def __init__(self, network: str='TestNet', rate_limiter: RateLimiter=None, payload_logger: PayloadLogger=None):
 
         self._faucet_base_url = str
         self.logger = Theseus.get_logger('faucet_{0}'.format(network))
+        self.rate_limiter = rate_limiter
+        self.payload_logger = payload_logger if payload_logger is not None else get_payload_logger()
 
         if network == 'TestNet':
             self._faucet_base_url = 'https://cardano-faucet.cardano-testnet.iohkdev.io'
         else:
             self.logger.error('Only testnet has a faucet at the moment')
 
+    def _wait(self, endpoint: str) -> float:
+        """ Wait for the rate limit of an endpoint , returns the seconds spent queued """
+        delay = self.rate_limiter.acquire(endpoint) if self.rate_limiter else 0.0
+        if delay:
+            self.logger.debug('{0} request queued for {1:.3f}s by the rate limit'.format(endpoint, delay))
+        return delay
+
+    def rate_limit_stats(self) -> dict:
+        """ Rate Limit Stats: get the queueing delay for each rate limited endpoint """
+        return self.rate_limiter.stats() if self.rate_limiter else {}
+
     def withdraw(self, address):
         """ Withdraw - request a transfer of funds from the faucet to your wallet
 
@@ -46,7 +71,9 @@ class Faucet:
             }
         )
 
+        self._wait('withdraw')
         response = requests.post(self._faucet_base_url + '/withdraw', data=payload)
+        self.payload_logger.log(self.logger, 'Withdraw response', response.text)
 
         if response.status_code == 200:
             return Theseus.TransactionResponse(response.text)
@@ -59,6 +86,7 @@ class Faucet:
         Returns:
             str: a return address or an empty string
         """
+        self._wait('get_return_address')
         response = requests.get(self._faucet_base_url + '/return-address')
 
         if response.status_code == 200:
@@ -4,7 +4,6 @@ from typing import Dict, List, Iterable
 # hack to stop urlib3 complaining when we turn off SSL warnings
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-import requests
 
 import logging
 from .Faucet import Faucet
@@ -58,7 +57,8 @@ class Cardano(WalletAPI):
             filePath="state-demo/genesis-keys/generated-keys/poor/key{0}.sk".format(wallet_number)
         )
         self.logger.info("Importing Poor Wallet: {0}".format(wallet_number))
-        response = requests.post(url, verify=self._ssl_verify, headers=self.json_headers, data=json.dumps(payload))
+        self.payload_logger.log(self.logger, 'Import wallet request', payload)
+        response = self._request('POST', 'import_poor_wallet', url, data=json.dumps(payload))
 
         if response.status_code == 200:
             self.logger.info("Poor wallet was imported")
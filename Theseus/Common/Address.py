@@ -35,10 +35,12 @@ class AddressResponse(Response):
         parsed_json = json.loads(json_data)
         self.status = parsed_json['status']
         if parsed_json['status'] != 'error':
-            for data in parsed_json['data']:
+            # the api sends back the new address on its own , keep the addresses keyed by id
+            addresses = parsed_json['data']
+            for data in addresses if isinstance(addresses, list) else [addresses]:
                 temp = Address(json_data=data)
-                self.data.add(temp)
-            self.meta.update(parsed_json['meta'])
+                self.data[temp.id] = temp
+            self.meta.update(parsed_json.get('meta') or {})
 
 
 class Address(Data):
@@ -50,8 +52,8 @@ class Address(Data):
         self.from_json(json_data)
 
     def from_json(self, json_data):
-        """ Populate this object with data from the a json string"""
-        parsed_json = json.loads(json_data)
+        """ Populate this object with data from the a json string or an already parsed dict"""
+        parsed_json = json_data if isinstance(json_data, dict) else json.loads(json_data)
         self.used = parsed_json['used']
         self.changeAddress = parsed_json['changeAddress']
         self.id = parsed_json['id']
\ No newline at end of file
@@ -0,0 +1,577 @@
+import asyncio
+import json
+import time
+import random
+import ssl
+import aiohttp
+
+#  import only the specific parts of theseus we need
+from Theseus.Common.Wallet import Wallet
+from Theseus.Common.Cache import WalletCache
+from Theseus.Common.Transaction import TransactionRequest, TransactionResponse
+from Theseus.Protocols.SSHTunnel import SSHTunnel, shared_tunnels
+from Theseus.Protocols.RateLimit import RateLimiter
+from Theseus.Common.Address import AddressResponse, AddressRequest
+from Theseus import get_logger
+from Theseus.Logging import PayloadLogger, get_payload_logger
+from Theseus.Metrics import Metrics
+from Theseus.Common.Account import Account
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - asyncio Wallet API'
+__all__ = ['AsyncWalletAPI']
+
+
+class AsyncWalletAPI:
+    """ AsyncWalletAPI - Provides asyncio access to the Wallet API
+
+    This is the asyncio twin of Theseus.Common.WalletAPI , it has the same methods but they are coroutines so thousands
+    of wallet and transaction operations can be in flight in one event loop instead of one blocking call at a time.
+    The same Wallet , Account , TransactionRequest/Response and AddressRequest/Response objects are used.
+
+    Args:
+        host(str): The Host/IP Address to connect to the API , default 127.0.0.1
+        port(int): The Port number to connection the API , default 8090
+        ssl_verify(bool): True to enable SSL Certificate verification , False to disable it, default False
+        ssh_tunnel(bool): True to configure an SSH tunnel according to additional params
+        username(str): The Username  for the SSH Connection
+        ssh_port(int): THe SSH Port to connect to for the tunnel
+        local_port(int): The local port to forward from, default 8090
+        remote_port(int): The remote port to forward to, default 8090
+        local_host(str): The local host name to forward from , default 127.0.0.1
+        remote_host(str): The remote host name to forward to , default 127.0.0.1
+        tunnel_mode(str): threads or asyncio , how the ssh tunnel forwards connections , see SSHTunnel, default threads
+        shared_tunnel(bool): True to share one ssh tunnel with every other api for the same host and remote port ,
+                             see Theseus.Protocols.SSHTunnel.TunnelRegistry , default False
+        version(int): The API version number, default 1
+        automatic(bool): True to fetch node info and the wallet list when connect is called, default True
+        pool_maxsize(int): the most connections to keep open to the API at once, default 100
+        keep_alive(bool): True to keep connections to the API open between calls, default True
+        account_fanout(int): the most account requests to have in flight at once when loading accounts, default 10
+        cache_ttl(float): seconds a cached wallet stays fresh for, default 300 , None for no expiry
+        cache_size(int): the most wallets to keep in the wallet cache, default 10000
+        rate_limiter(RateLimiter): token buckets to limit the request rate of each endpoint , default None for no
+                                   limits , the endpoint names are the method names as for WalletAPI
+        payload_logger(PayloadLogger): how much of the api payloads to log , default the shared one which can be
+                                       changed with Theseus.set_payload_logging
+        metrics(Metrics): where to record the latency , status and size of every request , default a Metrics of
+                          its own
+
+    Usage:
+
+    Coroutines can't run in a constructor so the automatic setup happens in connect , the easiest way to get that
+    and a clean shutdown is to use the object as an async context manager::
+
+        async with AsyncWalletAPI(host='remotehost') as api:
+            wallets = await asyncio.gather(*[api.create_wallet(generate_walletname(), generate_mnemonic())
+                                             for i in range(1000)])
+
+    The SSH tunnel works just like it does for WalletAPI , the tunnel runs in its own thread and the event loop
+    talks to its local port. With a big pool_maxsize tunnel_mode='asyncio' saves the tunnel a pair of threads for
+    every pooled connection.
+
+    """
+    def __init__(self, host: str='127.0.0.1', port: int=8090, ssl_verify: bool=False, ssh_tunnel: bool=True,
+                 username: str = '@', ssh_port: int=22, local_port: int=8090, remote_port: int=8090,
+                 local_host: str='127.0.0.1', remote_host: str='127.0.0.1', version: int = 1, automatic=True,
+                 pool_maxsize: int=100, keep_alive: bool=True, account_fanout: int=10, cache_ttl: float=300,
+                 cache_size: int=10000, rate_limiter: RateLimiter=None,
+                 payload_logger: PayloadLogger=None, metrics: Metrics=None, tunnel_mode: str='threads',
+                 shared_tunnel: bool=False):
+        self._host = host
+        self._port = port
+
+        self._ssl_verify = ssl_verify
+        self._automatic = automatic
+        self._ssh_tunnel = ssh_tunnel
+        self._username = username
+        self._local_port = local_port
+        self._remote_port = remote_port
+        self._local_host = local_host
+        self._remote_host = remote_host
+
+        self._version = version
+
+        self._pool_maxsize = pool_maxsize
+        self._keep_alive = keep_alive
+        self._account_fanout = account_fanout
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics is not None else Metrics()
+
+        self.logger = self.get_logger("{0}:{1}".format(self._host, self._port))
+        self.payload_logger = payload_logger if payload_logger is not None else get_payload_logger()
+
+        self.json_headers = {
+            'Accept': 'application/json;charset=utf-8',
+            'Content-Type': 'application/json; charset=utf-8'
+        }
+
+        # the http session has to be made inside a running event loop so it is created on first use
+        self._session = None
+
+        # configure an SSH tunnel if we need one
+        self.tunnel = None
+        self._shared_tunnel = shared_tunnel
+        if ssh_tunnel is True:
+            if shared_tunnel:
+                self.tunnel = shared_tunnels.acquire(username, host, ssh_port, remoteport=remote_port,
+                                                     remotehost=remote_host, localport=local_port, mode=tunnel_mode)
+            else:
+                self.tunnel = SSHTunnel(username, host, ssh_port, local_port, remote_port, mode=tunnel_mode)
+            # if we are tunnelling then set the host and port must be local
+            self._host = '127.0.0.1'
+            # if we are tunneling the set the port to match the local_port of the ssh tunnel , a shared tunnel that
+            # was already open listens where it was first asked to
+            self._port = self.tunnel.localport
+
+        # this is the wallet cache , Wallets keyed by id
+        self._wallets = WalletCache(ttl=cache_ttl, max_size=cache_size)
+
+        # this is node info cache
+        self._node_info = dict
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """ Connect: populate the wallet cache and get node info if automatic is set """
+        if self._automatic:
+            self.logger.info('Connecting to WalletAPI')
+            await self.get_node_info()
+            await self.fetch_wallet_list()
+
+    async def close(self):
+        """ Close: close the http session and the ssh tunnel if there is one """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if self.tunnel:
+            try:
+                # shutdown waits for the tunnel thread so keep it off the event loop
+                loop = asyncio.get_running_loop()
+                if self._shared_tunnel:
+                    await loop.run_in_executor(None, shared_tunnels.release, self.tunnel)
+                else:
+                    await loop.run_in_executor(None, self.tunnel.stop_tunnel)
+            except Exception as e:
+                self.logger.error('Exception stopping ssh tunnel: {0}'.format(e))
+            self.tunnel = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """ The aiohttp session used for all requests , created on first use """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_maxsize,
+                limit_per_host=self._pool_maxsize,
+                # a context rather than ssl=True , which older aiohttp takes as not verifying
+                ssl=ssl.create_default_context() if self._ssl_verify else False,
+                force_close=not self._keep_alive,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.json_headers)
+        return self._session
+
+    async def _request(self, method: str, endpoint: str, url: str, data: str=None):
+        """ Make a request and read the whole response
+
+        Args:
+            method(str): the http method to use
+            endpoint(str): the name of the call , used for rate limiting and metrics
+            url(str): the url to request
+            data(str): optional body for the request
+
+        Returns:
+            tuple: the status code and the text of the response , if no answer was received because the connection
+                   failed or timed out the status is 503 and the text an error body as for WalletAPI
+
+        """
+        if self.rate_limiter:
+            delay = await self.rate_limiter.acquire_async(endpoint)
+            if delay:
+                self.logger.debug('{0} request queued for {1:.3f}s by the rate limit'.format(endpoint, delay))
+
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, url, data=data) as response:
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.metrics.record(endpoint, time.perf_counter() - start, sent=len(data) if data else 0,
+                                error=type(e).__name__)
+            self.logger.error('{0} request failed: {1}'.format(endpoint, repr(e)))
+            return 503, json.dumps(dict(status='error', message=repr(e)))
+
+        self.metrics.record(endpoint, time.perf_counter() - start, status=response.status,
+                            sent=len(data) if data else 0, received=len(body))
+        return response.status, body.decode(response.get_encoding())
+
+    def _url(self, path: str) -> str:
+        """ Make the full url for an api path """
+        return "https://{0}:{1}/api/v{2}/{3}".format(self._host, self._port, self._version, path)
+
+    def cache_stats(self) -> dict:
+        """ Cache Stats: get the hit , miss and refresh counts for the wallet cache """
+        return self._wallets.stats()
+
+    def rate_limit_stats(self) -> dict:
+        """ Rate Limit Stats: get the queueing delay for each rate limited endpoint """
+        return self.rate_limiter.stats() if self.rate_limiter else {}
+
+    def endpoint_stats(self) -> dict:
+        """ Endpoint Stats: get the latency percentiles , rates , status codes and sizes for each endpoint """
+        return self.metrics.snapshot()
+
+    @property
+    def wallets(self):
+        """" A Generator that iterates through the wallet cache"""
+        for wallet in self._wallets.values():
+            yield wallet
+
+    def random_wallet(self) -> Wallet:
+        """" Random Wallet: Chooses a random wallet from the wallet cache
+
+        Returns:
+            Theseus.Wallet: a random wallet or an error wallet.
+
+        """
+        if len(self._wallets):
+            return random.choice(self._wallets.values())
+        else:
+            self.logger.info('No wallets in cache')
+            return Wallet(id='empty', type='error', name='no wallets in cache')
+
+    def get_logger(self, name):
+        """ Get Logger: get a logger handle with the right prefixes
+
+        Args:
+            name(str): the name of your logger handle
+
+        Returns:
+            logger: a Logger object
+
+        """
+        return get_logger('async.' + name)
+
+    async def restore_wallet(self, name: str, phrase: str, password: str, assurance: str="strict") -> Wallet:
+        """ Restore a Wallet: Restores a wallet via the wallet api using the supplied credentials
+
+        Args:
+            name (str): Wallet name
+            phrase (str): Passphrase words seperated by spaces
+            password (str): optional spending password
+            assurance (str): assurance level strict or normal
+
+        Returns:
+            Wallet object
+
+        """
+        return await self.create_wallet(name, phrase, password, assurance, operation='restore')
+
+    async def create_wallet(self, name: str, phrase: str, password: str='',
+                            assurance: str="strict", operation: str='create', fetch_accounts: bool=False) -> Wallet:
+        """ Create a Wallet: Creates a wallet via the wallet api using the supplied credentials
+
+        Args:
+            name (str): Wallet name
+            phrase (str): Passphrase words separated by spaces
+            password (str): optional spending password
+            assurance (str): assurance level strict or normal
+            operation (str): create or restore , defaults to create
+            fetch_accounts (bool): True to fetch the account data straight away , default False , it costs a second
+                                   request so otherwise use load_accounts when it is needed
+
+        Returns:
+            Wallet object
+
+        Notes:
+            This behaves the same as WalletAPI.create_wallet , errors are returned as a wallet with the type 'error'.
+
+        """
+        payload = dict(
+            operation=operation,
+            backupPhrase=phrase.split(),
+            assuranceLevel=assurance,
+            name=name
+        )
+
+        if password:
+            payload['spendingPassword'] = password
+
+        self.logger.info("Creating Wallet: Name: '{0}'".format(name))
+        self.payload_logger.log(self.logger, 'Wallet {0} request'.format(operation), payload)
+        status, text = await self._request('POST', 'create_wallet', self._url('wallets'),
+                                           data=json.dumps(payload))
+
+        self.logger.debug('Wallet {0} returned: {1}'.format(operation, status))
+
+        errors = {400: "Invalid body in request", 415: "Unsupported Media Type", 406: "Invalid Charset"}
+        if status in errors:
+            self.logger.error('Error: {0}'.format(text))
+            return Wallet(id=str(status), type="error", name=errors[status])
+
+        try:
+            response_data = json.loads(text) if status < 500 else None
+        except ValueError:
+            response_data = None
+        if not isinstance(response_data, dict):
+            self.logger.error('Error: {0}'.format(text))
+            return Wallet(id=str(status), type="error", name="Wallet creation failed with status {0}".format(status))
+
+        if response_data.get('status') == 'success':
+            if operation == 'restore':
+                self.logger.info('Restore status: {0}'.format(response_data['data']['syncState']))
+
+            wallet = Wallet(**response_data['data'])
+            if fetch_accounts:
+                wallet.account = await self.get_accounts(wallet)
+            return self._wallets.put(wallet)
+
+        # anything else is a failure or an error such as the wallet already existing
+        self.logger.error('Error: {0}'.format(text))
+        return Wallet(id=str(status), type='error', name="Wallet creation failed in the backend")
+
+    async def delete_wallet(self, wallet: Wallet) -> bool:
+        """ Delete a wallet: Deletes a wallet from the backend
+
+        Args:
+            wallet (Wallet): Wallet to delete
+
+        Returns:
+            boolean : True if wallet was deleted.
+
+        """
+        self.logger.info("Deleting wallet: {0}".format(wallet.name))
+        status, text = await self._request('DELETE', 'delete_wallet', self._url('wallets/{0}'.format(wallet.id)))
+
+        if status == 204:
+            self.logger.info("Wallet deleted: {0}".format(wallet.name))
+            self._wallets.invalidate(wallet.id)
+            return True
+        if status == 404:
+            self.logger.error("Walled deletion: ID not found")
+            return False
+
+        self.logger.info("Wallet deletion failed: {0} returned {1}".format(wallet.name, status))
+        return False
+
+    async def fetch_wallet_list(self, id_filter: str="", balance_filter: str="", sort_by: str="", page: int=1,
+                                per_page: int=50):
+        """ Fetch a list of wallets: Queries the wallet backend and updates the local wallet cache
+
+        Args:
+            id_filter (str): Filter specification for wallet IDs
+            balance_filter (str): Filter specification for wallet balances
+            sort_by (str) : sort specification for wallet listing
+            page (int) : which page of wallet listings to show, default 1
+            per_page(int) : how many listings to show on a page, default 50
+
+        Returns:
+            Dict: a Dict of Wallet objects that where found keyed by ID
+
+        Notes:
+            The accounts for all of the wallets are fetched concurrently rather than one after another, see
+            load_accounts. As with WalletAPI.fetch_wallet_list cached wallets missing from a complete listing are
+            dropped from the cache.
+
+        """
+        url = self._wallet_listing_url(id_filter, balance_filter, sort_by, page, per_page)
+
+        self.logger.debug("Fetching Wallet Listing: Url: '{0}'".format(url))
+        status, text = await self._request('GET', 'fetch_wallet_list', url)
+
+        self.logger.info('Wallet listing request status code: {0}'.format(status))
+        if status != 200:
+            self.logger.error('Error: {0}'.format(text))
+            return {}
+
+        listing = json.loads(text)
+        wallets = [Wallet(**wallet) for wallet in listing['data']]
+        self.logger.info('Fetched data on {0} wallets'.format(len(wallets)))
+
+        await self.load_accounts(wallets)
+
+        temp_wallets = {}
+        for wallet in wallets:
+            temp_wallets.update({wallet.id: wallet})
+
+        if balance_filter or sort_by:
+            # if we have filters don't update the cache , its a user query
+            return temp_wallets
+
+        # refresh just the wallets we were sent
+        for wallet_id, wallet in temp_wallets.items():
+            temp_wallets[wallet_id] = self._wallets.put(wallet)
+
+        if id_filter:
+            return temp_wallets[id_filter]
+
+        if self._wallets.complete_listing(listing, page, per_page):
+            dropped = self._wallets.retain(temp_wallets)
+            if dropped:
+                self.logger.info('Dropped {0} deleted wallets from the cache'.format(dropped))
+
+        return temp_wallets
+
+    async def iter_wallets(self, id_filter: str="", balance_filter: str="", sort_by: str="", per_page: int=50,
+                           prefetch: bool=True):
+        """ Iterate Wallets: An async Generator that walks every page of the wallet listing
+
+        The asyncio version of WalletAPI.iter_wallets , use it with async for.
+
+        Args:
+            id_filter (str): Filter specification for wallet IDs
+            balance_filter (str): Filter specification for wallet balances
+            sort_by (str) : sort specification for wallet listing
+            per_page(int) : how many listings to fetch in each request, default 50
+            prefetch(bool): True to fetch the next page while the current one is consumed
+
+        Returns:
+            AsyncGenerator: yields Wallet objects
+
+        Notes:
+            The wallet cache is not updated and the account data is not loaded , pass batches of wallets to
+            load_accounts if you need it.
+
+        """
+        async def fetch(page_number):
+            url = self._wallet_listing_url(id_filter, balance_filter, sort_by, page_number, per_page)
+            status, text = await self._request('GET', 'iter_wallets', url)
+            if status != 200:
+                self.logger.error('Wallet listing failed: {0} {1}'.format(status, text))
+                return [], {}
+            listing = json.loads(text)
+            return listing['data'], listing.get('meta', {}).get('pagination', {})
+
+        page = 1
+        next_page = asyncio.ensure_future(fetch(page))
+        try:
+            while True:
+                wallets, pagination = await next_page
+                next_page = None
+
+                more = bool(wallets) and page < pagination.get('totalPages', page)
+                if more:
+                    page += 1
+                    next_page = asyncio.ensure_future(fetch(page)) if prefetch else None
+
+                for wallet in wallets:
+                    yield Wallet(**wallet)
+
+                if not more:
+                    return
+                if next_page is None:
+                    next_page = asyncio.ensure_future(fetch(page))
+        finally:
+            if next_page:
+                next_page.cancel()
+
+    def _wallet_listing_url(self, id_filter: str="", balance_filter: str="", sort_by: str="", page: int=1,
+                            per_page: int=50) -> str:
+        """ Make the url for a page of the wallet listing with any filters applied """
+        url = self._url('wallets?page={0};per_page={1}'.format(page, per_page))
+
+        if id_filter:
+            url += ";id={0}".format(id_filter)
+
+        if balance_filter:
+            url += ";balance={0}".format(balance_filter)
+
+        if sort_by:
+            url += ";sort_by={0}".format(sort_by)
+
+        return url
+
+    async def load_accounts(self, wallets=None):
+        """ Load Accounts: fetch the account data for many wallets at once
+
+        No more than account_fanout requests are in flight at once so a big listing doesn't flood the backend.
+
+        Args:
+            wallets (iterable): the Wallets to load the accounts of , defaults to the whole wallet cache if None
+
+        Returns:
+            list: the wallets with their account data loaded
+
+        """
+        wallets = list(self.wallets if wallets is None else wallets)
+        fanout = asyncio.Semaphore(self._account_fanout)
+
+        async def load(wallet):
+            async with fanout:
+                wallet.account = await self.get_accounts(wallet)
+
+        await asyncio.gather(*[load(wallet) for wallet in wallets])
+        return wallets
+
+    async def transact(self, transaction_request: TransactionRequest) -> TransactionResponse:
+        """ Transact: sends your transaction request to the backend to make it happen
+
+        Args:
+            transaction_request (TransactionRequest) : A Transaction Request to enact
+
+        Returns:
+            TransactionResponse: the transaction response
+
+        """
+        status, text = await self._request('POST', 'transact', self._url('transactions'),
+                                           data=transaction_request.to_json())
+        self.logger.info('Transaction request status code: {0}'.format(status))
+        if status == 400:
+            self.logger.error('Error: {0}'.format(text))
+
+        # the balance of the paying wallet has changed
+        self._wallets.expire(getattr(transaction_request.source, 'walletId', None))
+        return TransactionResponse(text)
+
+    async def create_address(self, address_request: AddressRequest) -> AddressResponse:
+        """ Create Address: creates a new receive address
+
+        Args:
+            address_request(AddressRequest): the address request
+
+        Returns:
+            AddressResponse: the Address response
+
+        """
+        status, text = await self._request('POST', 'create_address', self._url('addresses'),
+                                           data=address_request.to_json())
+        self.logger.info('Create address request status code: {0}'.format(status))
+        if status == 400:
+            self.logger.error('Error: {0}'.format(text))
+
+        return AddressResponse(text)
+
+    async def get_accounts(self, wallet: Wallet):
+        """ Get Accounts: get a list of accounts owned by a wallet
+
+        Args:
+            wallet (Wallet): Wallet to find the account of
+
+        Returns:
+            List of Accounts: a populated instance of Account
+
+        """
+        status, text = await self._request('GET', 'get_accounts', self._url('wallets/{0}/accounts'.format(wallet.id)))
+        if status == 200:
+            raw_json = json.loads(text)
+            if raw_json['status'] == 'success':
+                return [Account(**data) for data in raw_json['data']]
+
+        self.logger.error('Error fetching accounts: {0}'.format(text))
+        return []
+
+    async def get_node_info(self):
+        """ Get Node Information: Fetch and log node status info
+
+        You can access the data from it at self._node_info
+
+        """
+        status, text = await self._request('GET', 'get_node_info', self._url('node-info'))
+        if status == 200:
+            self._node_info = json.loads(text)
+            self.payload_logger.log(self.logger, 'Node info', self._node_info, size=len(text))
+        return self._node_info
@@ -53,7 +53,7 @@ class Response(Data):
              bool: a boolean representing the status of the request
 
          """
-        if self.status in ['error', 'failure']:
+        if self.status in ['error', 'failure', 'failed']:
             return False
         else:
             return True
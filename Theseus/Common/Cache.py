@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import OrderedDict
+
+from Theseus.Common.Wallet import Wallet
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - Wallet cache'
+__all__ = ['WalletCache']
+
+
+class WalletCache:
+    """ Wallet Cache - a size bounded cache of Wallets with a time to live on each entry
+
+    The cache is keyed by wallet id. Each entry expires ttl seconds after it was last stored , an expired entry is
+    still kept (so it can be listed and refreshed) but a lookup will report a miss so the caller knows to fetch it
+    again. When the cache is full the least recently used entry is evicted.
+
+    When a wallet that is already in the cache is stored again the cached object is updated in place , so anything
+    holding a reference to a cached Wallet sees the new balance after a refresh.
+
+    Args:
+        ttl(float): seconds an entry stays fresh for, default 300 , None for no expiry
+        max_size(int): the most wallets to hold, default 10000
+
+    Notes:
+        This is thread safe.
+        Hit , miss , refresh , eviction , expiry and invalidation counters are available from stats. An entry is
+        counted as expired once however many lookups find it stale , until it is stored again.
+
+    """
+    def __init__(self, ttl: float=300, max_size: int=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # wallet id -> [wallet, expiry time, expiry counted]
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._counters = dict(hits=0, misses=0, stores=0, refreshes=0, evictions=0, expirations=0, invalidations=0)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, wallet_id):
+        with self._lock:
+            return wallet_id in self._entries
+
+    def _expiry(self) -> float:
+        return time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+
+    def get(self, wallet_id: str):
+        """ Get a fresh wallet from the cache
+
+        Args:
+            wallet_id(str): the id of the wallet to look up
+
+        Returns:
+            Wallet: the cached wallet , or None if it isn't cached or has expired
+
+        """
+        with self._lock:
+            entry = self._entries.get(wallet_id)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+
+            if entry[1] <= time.monotonic():
+                self._counters['misses'] += 1
+                self._expired(entry)
+                return None
+
+            self._entries.move_to_end(wallet_id)
+            self._counters['hits'] += 1
+            return entry[0]
+
+    def peek(self, wallet_id: str):
+        """ Get a wallet from the cache whether it has expired or not , this doesn't touch the counters """
+        with self._lock:
+            entry = self._entries.get(wallet_id)
+            return entry[0] if entry else None
+
+    def put(self, wallet: Wallet) -> Wallet:
+        """ Store a wallet in the cache
+
+        If the wallet is already cached the cached object is updated with the new data and its ttl restarted.
+
+        Args:
+            wallet(Wallet): the wallet to store
+
+        Returns:
+            Wallet: the cached wallet object , use this rather than the one passed in
+
+        """
+        with self._lock:
+            entry = self._entries.get(wallet.id)
+            if entry is not None:
+                if entry[0] is not wallet:
+                    self._refresh(entry[0], wallet)
+                entry[1:] = [self._expiry(), False]
+                self._entries.move_to_end(wallet.id)
+                self._counters['refreshes'] += 1
+                return entry[0]
+
+            self._entries[wallet.id] = [wallet, self._expiry(), False]
+            self._counters['stores'] += 1
+
+            while self.max_size and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+            return wallet
+
+    @staticmethod
+    def _refresh(cached: Wallet, wallet: Wallet):
+        """ Copy the api data of a newer copy of a wallet onto the cached one
+
+        Only the public fields are copied , the cached wallet keeps its own account lock. Accounts the new copy
+        hasn't loaded yet are loaded through it the first time the cached wallet's accounts are used.
+
+        """
+        cached.__dict__.update({key: value for key, value in wallet.__dict__.items()
+                                if not key.startswith('_') and key != 'account'})
+        if wallet.account_loaded:
+            cached.account = wallet.account
+        else:
+            cached.load_account_lazily(lambda: wallet.account)
+
+    def expire(self, wallet_id: str):
+        """ Mark a wallet as stale so the next lookup misses and it gets refreshed
+
+        Args:
+            wallet_id(str): the id of the wallet to expire
+
+        """
+        with self._lock:
+            entry = self._entries.get(wallet_id)
+            if entry is not None:
+                entry[1] = 0
+                self._expired(entry)
+
+    def _expired(self, entry: list):
+        # count each entry going stale once , the flag is reset when it is stored again
+        if not entry[2]:
+            entry[2] = True
+            self._counters['expirations'] += 1
+
+    def invalidate(self, wallet_id: str):
+        """ Remove a wallet from the cache
+
+        Args:
+            wallet_id(str): the id of the wallet to remove
+
+        """
+        with self._lock:
+            if self._entries.pop(wallet_id, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def retain(self, wallet_ids) -> int:
+        """ Remove every wallet that isn't in wallet_ids , use this after a complete listing to drop deleted wallets
+
+        Args:
+            wallet_ids(iterable): the ids of the wallets to keep
+
+        Returns:
+            int: how many wallets were removed
+
+        """
+        keep = set(wallet_ids)
+        with self._lock:
+            gone = [wallet_id for wallet_id in self._entries if wallet_id not in keep]
+            for wallet_id in gone:
+                del self._entries[wallet_id]
+            self._counters['invalidations'] += len(gone)
+        return len(gone)
+
+    @staticmethod
+    def complete_listing(listing: dict, page: int, per_page: int) -> bool:
+        """ Complete Listing: True if a page of the wallet listing holds every wallet the backend has
+
+        Args:
+            listing(dict): the decoded wallet listing response
+            page(int): the page that was asked for
+            per_page(int): the page size that was asked for
+
+        Returns:
+            bool: True if it is the only page , going by the pagination block if there is one
+
+        """
+        if page != 1:
+            return False
+        pages = listing.get('meta', {}).get('pagination', {}).get('totalPages')
+        if pages is not None:
+            return pages <= 1
+        return len(listing['data']) < per_page
+
+    def clear(self):
+        """ Remove everything from the cache """
+        with self._lock:
+            self._counters['invalidations'] += len(self._entries)
+            self._entries.clear()
+
+    def values(self) -> list:
+        """ All of the cached wallets including expired ones , least recently used first """
+        with self._lock:
+            return [entry[0] for entry in self._entries.values()]
+
+    def stats(self) -> dict:
+        """ Get the cache counters
+
+        Returns:
+            dict: the counters along with the current size , limits and hit ratio of the cache
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(size=len(self._entries), max_size=self.max_size, ttl=self.ttl)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
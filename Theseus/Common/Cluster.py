@@ -0,0 +1,329 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from Theseus import get_logger
+from Theseus.Common.Trackers import _PollingLoop
+from Theseus.Common.Wallet import Wallet
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - Several wallet backends used as one'
+__all__ = ['WalletCluster']
+
+
+class _Backend:
+    """ One api in the cluster with its health and load """
+    def __init__(self, api, index: int):
+        self.api = api
+        # the index keeps the name unique when two apis share a host and port
+        self.name = '{0}:{1}#{2}'.format(api._host, api._port, index)
+        self.healthy = True
+        self.failures = 0
+        self.latency = None
+        self.in_flight = 0
+        self.counters = dict(requests=0, pings=0, failed_pings=0)
+
+
+class _HealthChecker(_PollingLoop):
+    """ Pings every backend in the cluster at a steady interval """
+    def __init__(self, cluster, interval: float):
+        super().__init__('cluster-health', interval, interval, 1.0)
+        self.cluster = cluster
+
+    def start(self):
+        self._start(wake=False)
+
+    def _has_work(self) -> bool:
+        return True
+
+    def _poll(self) -> bool:
+        self.cluster.check_health()
+        return True
+
+
+class WalletCluster:
+    """ Wallet Cluster - spreads the work of a test over several wallet backends
+
+    Each backend is a WalletAPI , Daedalus or Cardano object of its own , so each can have its own ssh tunnel. The
+    backends are pinged at a steady interval and one that fails unhealthy_after pings in a row is left out until it
+    answers again.
+
+    Calls that aren't about a particular wallet , get_node_info and new wallets , go to the healthy backend chosen by
+    the routing: least_loaded picks the one with the fewest calls in flight , breaking ties on latency , and latency
+    picks the one that answered its pings fastest. A wallet lives on the backend it was created on or listed from ,
+    so every call about a wallet , transactions , addresses , accounts , updates and deletes , goes to that backend.
+    fetch_wallet_list asks every healthy backend and merges the listings.
+
+    Args:
+        apis(list): the WalletAPI objects to use
+        routing(str): least_loaded or latency, default least_loaded
+        health_interval(float): seconds between health checks , default 10 , None to only check when
+                                check_health is called
+        unhealthy_after(int): failed pings in a row before a backend is left out, default 2
+        smoothing(float): weight given to the newest ping when smoothing the latency, default 0.3
+
+    Usage:
+
+    Make the apis as usual , with a different local port for each tunnel::
+
+        cluster = WalletCluster([Cardano(host='node1', local_port=8091), Cardano(host='node2', local_port=8092)])
+        wallet = cluster.create_wallet('load test', generate_mnemonic())
+        cluster.transact(TransactionRequest(TransactionSource(wallet.account[0].index, wallet.id), destinations))
+
+    Notes:
+        If no backend is healthy calls are sent to all of them in turn rather than failing outright.
+        Health , latency , load and ownership figures for each backend are available from stats.
+
+    """
+    ROUTINGS = ('least_loaded', 'latency')
+
+    def __init__(self, apis: list, routing: str='least_loaded', health_interval: float=10.0,
+                 unhealthy_after: int=2, smoothing: float=0.3):
+        if not apis:
+            raise ValueError('A cluster needs at least one api')
+        if routing not in self.ROUTINGS:
+            raise ValueError('Unknown routing {0} , use least_loaded or latency'.format(routing))
+
+        self.routing = routing
+        self.unhealthy_after = unhealthy_after
+        self.smoothing = smoothing
+
+        self.logger = get_logger('cluster')
+        self._backends = [_Backend(api, index) for index, api in enumerate(apis)]
+        self._lock = threading.Lock()
+        # wallet id -> the backend it lives on
+        self._owners = {}
+        self._counters = dict(routed=0, pinned=0, unowned=0, no_healthy=0)
+
+        self.check_health()
+        self._checker = None
+        if health_interval:
+            self._checker = _HealthChecker(self, health_interval)
+            self._checker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stop(self):
+        """ Stop the background health checks """
+        if self._checker is not None:
+            self._checker.stop()
+
+    @property
+    def apis(self) -> list:
+        return [backend.api for backend in self._backends]
+
+    def _ping(self, backend: _Backend):
+        start = time.perf_counter()
+        try:
+            answered = backend.api.ping()
+        except Exception as e:
+            self.logger.debug('Pinging {0} raised {1!r}'.format(backend.name, e))
+            answered = False
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            backend.counters['pings'] += 1
+            if answered:
+                backend.failures = 0
+                backend.latency = latency if backend.latency is None else \
+                    self.smoothing * latency + (1 - self.smoothing) * backend.latency
+                if not backend.healthy:
+                    self.logger.info('{0} is healthy again'.format(backend.name))
+                backend.healthy = True
+            else:
+                backend.counters['failed_pings'] += 1
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.unhealthy_after:
+                    self.logger.warning('{0} is unhealthy after {1} failed pings'.format(backend.name,
+                                                                                        backend.failures))
+                    backend.healthy = False
+
+    def check_health(self):
+        """ Check Health: ping every backend now , all at once """
+        with ThreadPoolExecutor(max_workers=len(self._backends)) as executor:
+            list(executor.map(self._ping, self._backends))
+
+    def _choose(self) -> _Backend:
+        with self._lock:
+            candidates = [backend for backend in self._backends if backend.healthy]
+            if not candidates:
+                self._counters['no_healthy'] += 1
+                candidates = self._backends
+
+            def latency(backend):
+                return backend.latency if backend.latency is not None else float('inf')
+
+            if self.routing == 'latency':
+                return min(candidates, key=latency)
+            # shuffle first so equal backends share the work
+            candidates = random.sample(candidates, len(candidates))
+            return min(candidates, key=lambda backend: (backend.in_flight, latency(backend)))
+
+    def _owner(self, wallet_id: str) -> _Backend:
+        with self._lock:
+            backend = self._owners.get(wallet_id)
+            self._counters['pinned' if backend else 'unowned'] += 1
+        return backend if backend is not None else self._choose()
+
+    def _own(self, wallet, backend: _Backend):
+        if isinstance(wallet, Wallet) and wallet.type != 'error':
+            with self._lock:
+                self._owners[wallet.id] = backend
+
+    @contextmanager
+    def _using(self, backend: _Backend):
+        with self._lock:
+            backend.in_flight += 1
+            backend.counters['requests'] += 1
+        try:
+            yield backend.api
+        finally:
+            with self._lock:
+                backend.in_flight -= 1
+
+    def api_for(self, wallet) -> object:
+        """ Api For: the api of the backend a wallet lives on
+
+        Args:
+            wallet: a Wallet or wallet id
+
+        Returns:
+            WalletAPI: the api , a routed one if the wallet isn't known to the cluster
+
+        """
+        return self._owner(getattr(wallet, 'id', wallet)).api
+
+    def route(self) -> object:
+        """ Route: the api that should take the next call that isn't about a particular wallet """
+        with self._lock:
+            self._counters['routed'] += 1
+        return self._choose().api
+
+    # calls routed to the best backend
+
+    def create_wallet(self, name: str, phrase: str, password: str='', assurance: str="strict",
+                      operation: str='create') -> Wallet:
+        """ Create a Wallet on the best backend , the wallet stays on that backend , see WalletAPI.create_wallet """
+        with self._lock:
+            self._counters['routed'] += 1
+        backend = self._choose()
+        with self._using(backend) as api:
+            wallet = api.create_wallet(name, phrase, password=password, assurance=assurance, operation=operation)
+        self._own(wallet, backend)
+        return wallet
+
+    def get_node_info(self):
+        """ Get the node info from the best backend , see WalletAPI.get_node_info """
+        with self._lock:
+            self._counters['routed'] += 1
+        with self._using(self._choose()) as api:
+            return api.get_node_info()
+
+    def fetch_wallet_list(self, **kwargs) -> dict:
+        """ Fetch the wallet listing from every healthy backend and merge them , see WalletAPI.fetch_wallet_list
+
+        Returns:
+            Dict: the wallets found keyed by ID , a wallet found on more than one backend stays with the first
+                  backend it was seen on
+
+        Raises:
+            ValueError: if given an id_filter , use get_wallet to fetch one wallet from the backend it lives on
+
+        """
+        if kwargs.get('id_filter'):
+            raise ValueError('fetch_wallet_list can not filter on id across a cluster , use get_wallet')
+
+        with self._lock:
+            backends = [backend for backend in self._backends if backend.healthy] or list(self._backends)
+
+        def fetch(backend):
+            with self._using(backend) as api:
+                return backend, api.fetch_wallet_list(**kwargs)
+
+        merged = {}
+        with ThreadPoolExecutor(max_workers=len(backends)) as executor:
+            for backend, wallets in executor.map(fetch, backends):
+                with self._lock:
+                    for wallet_id, wallet in wallets.items():
+                        self._owners.setdefault(wallet_id, backend)
+                        merged.setdefault(wallet_id, wallet)
+        return merged
+
+    @property
+    def wallets(self):
+        """ A Generator that iterates through the wallet caches of every backend """
+        for backend in self._backends:
+            for wallet in backend.api.wallets:
+                yield wallet
+
+    def random_wallet(self) -> Wallet:
+        """ Random Wallet: a random wallet from any backend's cache """
+        wallets = list(self.wallets)
+        if wallets:
+            return random.choice(wallets)
+        return Wallet(id='empty', type='error', name='no wallets in cache')
+
+    # calls pinned to the backend the wallet lives on
+
+    def get_wallet(self, wallet_id: str, refresh: bool=False) -> Wallet:
+        with self._using(self._owner(wallet_id)) as api:
+            return api.get_wallet(wallet_id, refresh=refresh)
+
+    def refresh_wallet(self, wallet_id: str) -> Wallet:
+        with self._using(self._owner(wallet_id)) as api:
+            return api.refresh_wallet(wallet_id)
+
+    def update_wallet(self, id, assuranceLevel=None, name=None):
+        with self._using(self._owner(id)) as api:
+            return api.update_wallet(id, assuranceLevel=assuranceLevel, name=name)
+
+    def delete_wallet(self, wallet: Wallet) -> bool:
+        with self._using(self._owner(wallet.id)) as api:
+            deleted = api.delete_wallet(wallet)
+        if deleted:
+            with self._lock:
+                self._owners.pop(wallet.id, None)
+        return deleted
+
+    def get_accounts(self, wallet: Wallet):
+        with self._using(self._owner(wallet.id)) as api:
+            return api.get_accounts(wallet)
+
+    def create_address(self, address_request):
+        with self._using(self._owner(address_request.walletId)) as api:
+            return api.create_address(address_request)
+
+    def transact(self, transaction_request):
+        with self._using(self._owner(transaction_request.source.walletId)) as api:
+            return api.transact(transaction_request)
+
+    def list_transactions(self, wallet_id: str, ids: list=None, page: int=1, per_page: int=50) -> list:
+        with self._using(self._owner(wallet_id)) as api:
+            return api.list_transactions(wallet_id, ids=ids, page=page, per_page=per_page)
+
+    def stats(self) -> dict:
+        """ Get the cluster figures
+
+        Returns:
+            dict: routed , pinned , unowned and no healthy backend counts with , for each backend , whether it is
+                  healthy , its smoothed ping latency , calls in flight , calls made , pings and wallets owned
+
+        """
+        with self._lock:
+            owned = {}
+            for backend in self._owners.values():
+                owned[backend.name] = owned.get(backend.name, 0) + 1
+
+            stats = dict(self._counters)
+            stats['backends'] = {
+                backend.name: dict(healthy=backend.healthy, latency=backend.latency, in_flight=backend.in_flight,
+                                   wallets=owned.get(backend.name, 0), **backend.counters)
+                for backend in self._backends
+            }
+        return stats
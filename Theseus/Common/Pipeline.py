@@ -0,0 +1,186 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Theseus import get_logger
+from Theseus.Common.Transaction import TransactionRequest, TransactionResponse
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - Transaction submission pipeline'
+__all__ = ['TransactionPipeline']
+
+
+class TransactionPipeline:
+    """ Transaction Pipeline - keeps a window of transactions in flight against a wallet backend
+
+    Transactions are sent by a pool of worker threads , as each one completes its response is handed back and
+    another transaction is sent in its place so the backend always has work queued.
+
+    The size of the window adapts to how the backend is coping. It starts at max_in_flight , is cut by the backoff
+    factor when a transaction fails or when the smoothed latency climbs past slowdown_factor times the best latency
+    seen , and grows back by one for every window's worth of good responses. This applies backpressure when the
+    backend struggles instead of piling more work onto it.
+
+    Args:
+        api(Theseus.Common.WalletAPI): the wallet api to send the transactions with
+        max_in_flight(int): the largest the window can be, default 8
+        min_in_flight(int): the smallest the window can be cut to, default 1
+        slowdown_factor(float): how many times the best latency counts as a slowdown, default 3
+        backoff(float): what to multiply the window by when it is cut, default 0.5
+
+    Notes:
+        The api pool_maxsize should be at least max_in_flight so every worker has a connection.
+        Counters for the pipeline are available from stats.
+
+    """
+    def __init__(self, api, max_in_flight: int=8, min_in_flight: int=1, slowdown_factor: float=3.0,
+                 backoff: float=0.5):
+        self.api = api
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = max(1, min(min_in_flight, max_in_flight))
+        self.slowdown_factor = slowdown_factor
+        self.backoff = backoff
+
+        self.logger = get_logger('pipeline')
+
+        self._lock = threading.Lock()
+        self._window = float(max_in_flight)
+        self._in_flight = 0
+
+        # latency tracking for slowdown detection
+        self._smoothed = None
+        self._best = None
+        self._last_cut = 0.0
+
+        self._counters = dict(submitted=0, completed=0, errors=0, slowdowns=0, window_cuts=0)
+
+    @property
+    def window(self) -> int:
+        """ How many transactions may be in flight right now """
+        with self._lock:
+            return int(self._window)
+
+    def stats(self) -> dict:
+        """ Get the pipeline counters
+
+        Returns:
+            dict: submitted , completed , errors , slowdowns and window cut counts with the current window and latency
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(window=int(self._window), in_flight=self._in_flight, smoothed_latency=self._smoothed,
+                         best_latency=self._best)
+        return stats
+
+    def run(self, transaction_requests):
+        """ Run: send the transactions and yield the responses as they complete
+
+        Args:
+            transaction_requests(iterable): TransactionRequests to send , this is read lazily so it can be a generator
+
+        Returns:
+            Generator: yields a TransactionResponse for each request in the order they complete
+
+        Notes:
+            A request that raises an exception yields a TransactionResponse with the status 'error'.
+            Stopping the generator early stops any more requests from being sent.
+
+        """
+        completed = queue.Queue()
+        requests = iter(transaction_requests)
+        exhausted = False
+        # sent but not yet handed back , a worker frees its slot before queueing its response so this is
+        # what tells us when we are finished
+        outstanding = 0
+        # kept so anything still queued can be cancelled if we stop early
+        futures = []
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            while True:
+                # top up the window
+                futures = [future for future in futures if not future.done()]
+                while not exhausted and self._take_slot():
+                    try:
+                        transaction_request = next(requests)
+                    except StopIteration:
+                        exhausted = True
+                        self._release_slot()
+                        break
+                    futures.append(executor.submit(self._send, transaction_request, completed))
+                    outstanding += 1
+
+                if not outstanding:
+                    return
+
+                response = completed.get()
+                outstanding -= 1
+                yield response
+        finally:
+            # cancel_futures needs python 3.9 , cancel them one at a time instead
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _take_slot(self) -> bool:
+        with self._lock:
+            if self._in_flight < int(self._window):
+                self._in_flight += 1
+                self._counters['submitted'] += 1
+                return True
+            return False
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._counters['submitted'] -= 1
+
+    def _send(self, transaction_request: TransactionRequest, completed: queue.Queue):
+        """ Send one transaction , adjust the window and queue the response """
+        start = time.perf_counter()
+        try:
+            response = self.api.transact(transaction_request)
+        except Exception as e:
+            self.logger.error('Transaction failed: {0}'.format(e))
+            response = TransactionResponse(json.dumps(dict(status='error', message=repr(e))))
+        latency = time.perf_counter() - start
+
+        self._adjust(latency, bool(response))
+        completed.put(response)
+
+    def _adjust(self, latency: float, success: bool):
+        """ Grow or cut the window based on how the last transaction went """
+        with self._lock:
+            self._in_flight -= 1
+            self._counters['completed'] += 1
+
+            now = time.monotonic()
+            # only cut once per round trip so one bad burst doesn't collapse the window
+            can_cut = now - self._last_cut > (self._smoothed or 0.0)
+
+            if not success:
+                self._counters['errors'] += 1
+                if can_cut:
+                    self._cut(now)
+                return
+
+            self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+            self._best = latency if self._best is None else min(self._best, latency)
+
+            if self._smoothed > self._best * self.slowdown_factor:
+                self._counters['slowdowns'] += 1
+                if can_cut:
+                    self._cut(now)
+                return
+
+            # additive increase , one more slot for each window full of good responses
+            self._window = min(float(self.max_in_flight), self._window + 1.0 / self._window)
+
+    def _cut(self, now: float):
+        self._window = max(float(self.min_in_flight), self._window * self.backoff)
+        self._last_cut = now
+        self._counters['window_cuts'] += 1
+        self.logger.info('Backing off , transaction window is now {0}'.format(int(self._window)))
@@ -0,0 +1,177 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Theseus import get_logger
+from Theseus.Common.Base import Data
+from Theseus.Common.Wallet import Wallet
+from Theseus.Common.Generators import generate_mnemonic, generate_walletname
+from Theseus.Protocols.RateLimit import TokenBucket
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - Bulk wallet provisioning'
+__all__ = ['create_wallets', 'ProvisioningResult', 'WalletCreationFailure']
+
+
+class WalletCreationFailure(Data):
+    """ A wallet that could not be created
+
+    Args:
+        name(str): the name the wallet would have had
+        phrase(str): the mnemonic it was created with
+        status(str): the status code from the backend , empty if the request never got an answer
+        reason(str): why it failed
+        exception(Exception): the exception raised by the request if there was one
+        latency(float): seconds the attempt took
+
+    """
+    def __init__(self, name, phrase, status='', reason='', exception=None, latency=0.0):
+        self.name = name
+        self.phrase = phrase
+        self.status = status
+        self.reason = reason
+        self.exception = exception
+        self.latency = latency
+
+    @property
+    def rejected(self) -> bool:
+        """ True if the backend answered and refused , False if the request itself failed """
+        return self.exception is None
+
+    def dump(self) -> str:
+        template = "Wallet Creation Failure\n\tName:{0}\n\tStatus:{1}\n\tReason:{2}\n\tLatency:{3:.3f}"
+        return template.format(self.name, self.status, self.reason, self.latency)
+
+
+class ProvisioningResult(Data):
+    """ The outcome of a bulk wallet creation
+
+    Members:
+        wallets (list): the wallets that were created
+        failures (list): a WalletCreationFailure for each wallet that wasn't
+        latencies (dict): seconds taken to create each wallet keyed by wallet name
+        elapsed (float): seconds the whole run took
+
+    """
+    def __init__(self):
+        self.wallets = []
+        self.failures = []
+        self.latencies = {}
+        self.elapsed = 0.0
+
+    def __bool__(self):
+        return not self.failures
+
+    @property
+    def rate(self) -> float:
+        """ wallets created per second """
+        return len(self.wallets) / self.elapsed if self.elapsed else 0.0
+
+    def latency_summary(self) -> dict:
+        """ Latency Summary: the spread of creation latencies
+
+        Returns:
+            dict: min , mean , p50 , p90 , p99 and max latency in seconds
+
+        """
+        ordered = sorted(self.latencies.values())
+        if not ordered:
+            return dict(min=0.0, mean=0.0, p50=0.0, p90=0.0, p99=0.0, max=0.0)
+
+        def percentile(fraction):
+            return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+        return dict(
+            min=ordered[0],
+            mean=sum(ordered) / len(ordered),
+            p50=percentile(0.5),
+            p90=percentile(0.9),
+            p99=percentile(0.99),
+            max=ordered[-1],
+        )
+
+    def dump(self) -> str:
+        template = "Provisioning Result\n\tCreated:{0}\n\tFailed:{1}\n\tElapsed:{2:.1f}s\n\tRate:{3:.1f}/s\n\tLatency:{4}"
+        return template.format(len(self.wallets), len(self.failures), self.elapsed, self.rate,
+                               self.latency_summary())
+
+
+def create_wallets(api, n: int, concurrency: int=8, rate: float=None, password: str='', assurance: str='strict',
+                   evil: int=0, progress=None, progress_every: int=100) -> ProvisioningResult:
+    """ Create Wallets: create a lot of wallets at once
+
+    All of the names and mnemonics are generated before anything is sent , then the creates are handed to a pool
+    of concurrency worker threads. If a rate is given the creates are spaced out by a token bucket so no more than
+    rate are started per second.
+
+    Args:
+        api(Theseus.Common.WalletAPI): a wallet api to use
+        n(int): how many wallets to create
+        concurrency(int): the most creates to have in flight at once, default 8
+        rate(float): the most creates to start per second , default None for as fast as possible
+        password(str): optional spending password for all of the wallets
+        assurance(str): assurance level strict or normal
+        evil(int): how evil the generated names should be , see generate_walletname
+        progress(callable): called with (done, total, wallet or failure) after each create
+        progress_every(int): log progress after this many creates, default 100
+
+    Returns:
+        ProvisioningResult: the wallets created , the failures and the latency of each create
+
+    Notes:
+        To keep the workers from fighting over connections make the api pool_maxsize at least as big as concurrency.
+
+    """
+    logger = get_logger('provisioning')
+    result = ProvisioningResult()
+
+    # do the slow generation up front so it doesn't get in the way of the requests
+    plan = [(generate_walletname(evil=evil), generate_mnemonic()) for i in range(n)]
+    logger.info('Creating {0} wallets with {1} workers'.format(n, concurrency))
+
+    # the workers wait on the bucket rather than holding up the submission
+    bucket = TokenBucket(rate) if rate else None
+    started = time.perf_counter()
+
+    def create(name, phrase):
+        if bucket:
+            bucket.acquire()
+
+        start = time.perf_counter()
+        try:
+            wallet = api.create_wallet(name, phrase, password, assurance)
+        except Exception as e:
+            return WalletCreationFailure(name, phrase, reason=repr(e), exception=e,
+                                         latency=time.perf_counter() - start)
+
+        latency = time.perf_counter() - start
+        if not isinstance(wallet, Wallet) or wallet.type == 'error':
+            status = getattr(wallet, 'id', '')
+            reason = getattr(wallet, 'name', 'no wallet returned')
+            return WalletCreationFailure(name, phrase, status=status, reason=reason, latency=latency)
+
+        wallet.passphrase = phrase
+        return wallet, latency
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(create, name, phrase) for name, phrase in plan]
+
+        for done, future in enumerate(as_completed(futures), 1):
+            outcome = future.result()
+            if isinstance(outcome, WalletCreationFailure):
+                result.failures.append(outcome)
+                result.latencies[outcome.name] = outcome.latency
+                item = outcome
+            else:
+                wallet, latency = outcome
+                result.wallets.append(wallet)
+                result.latencies[wallet.name] = latency
+                item = wallet
+
+            if progress:
+                progress(done, n, item)
+            if progress_every and done % progress_every == 0:
+                logger.info('Created {0}/{1} wallets , {2} failures'.format(done, n, len(result.failures)))
+
+    result.elapsed = time.perf_counter() - started
+    logger.info(result.dump())
+    return result
@@ -0,0 +1,540 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from Theseus import get_logger
+from Theseus.Common.Base import Data
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Common - Trackers that poll the wallet api in the background'
+__all__ = ['ConfirmationTracker', 'SyncWatcher', 'SyncProgress']
+
+
+class _PollingLoop:
+    """ A background thread that polls for everything being tracked in one go
+
+    Subclasses provide _poll , which checks on everything being tracked and returns True if anything moved forward,
+    and _has_work. Those that track deadlines also provide _expire , which gives up on anything past its deadline ,
+    and _next_deadline. The loop polls at min_interval while things are progressing and backs off towards
+    max_interval while they are not , but never sleeps past the next deadline so timeouts fire on time even when the
+    backend keeps failing. The thread is started when there is something to track and finishes when there isn't.
+
+    Args:
+        name(str): name for the thread and logger
+        min_interval(float): seconds between polls while things are progressing
+        max_interval(float): the longest to wait between polls
+        backoff(float): what to multiply the interval by after a poll with no progress
+
+    """
+    def __init__(self, name: str, min_interval: float, max_interval: float, backoff: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        self.logger = get_logger(name)
+        self._name = name
+
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._interval = min_interval
+
+        self._counters = dict(polls=0, poll_errors=0)
+
+    def _start(self, wake: bool=True):
+        """ Make sure the polling thread is running
+
+        Args:
+            wake(bool): True to poll straight away at the fastest interval , only worth doing when the loop was idle
+                        otherwise adding lots of things to track one at a time would cause a poll for each
+
+        """
+        with self._lock:
+            self._stopped = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+        if wake:
+            self._interval = self.min_interval
+            self._wake.set()
+
+    def stop(self):
+        """ Stop polling , anything still being tracked is left unresolved """
+        self._stopped = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @property
+    def interval(self) -> float:
+        """ The current time between polls """
+        return self._interval
+
+    def _run(self):
+        while not self._stopped:
+            with self._lock:
+                if not self._has_work():
+                    # nothing to do , let the thread finish and _start will make a new one when needed
+                    self._thread = None
+                    return
+
+            try:
+                progressed = self._poll()
+            except Exception as e:
+                self.logger.error('Polling failed: {0}'.format(e))
+                with self._lock:
+                    self._counters['poll_errors'] += 1
+                progressed = False
+            with self._lock:
+                self._counters['polls'] += 1
+            # outside the try so deadlines still pass while the backend is failing
+            progressed |= self._expire()
+
+            if progressed:
+                self._interval = self.min_interval
+            else:
+                self._interval = min(self._interval * self.backoff, self.max_interval)
+
+            wait = self._interval
+            deadline = self._next_deadline()
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.time()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _has_work(self) -> bool:
+        raise NotImplementedError
+
+    def _poll(self) -> bool:
+        raise NotImplementedError
+
+    def _expire(self) -> bool:
+        """ Give up on anything past its deadline , True if anything was given up on """
+        return False
+
+    def _next_deadline(self):
+        """ The time.time() of the earliest deadline , None if nothing has one """
+        return None
+
+
+class _TrackedTransaction:
+    """ A transaction waiting for confirmations """
+    __slots__ = ['transaction_id', 'wallet_id', 'submitted_at', 'deadline', 'future', 'confirmations']
+
+    def __init__(self, transaction_id, wallet_id, submitted_at, deadline):
+        self.transaction_id = transaction_id
+        self.wallet_id = wallet_id
+        self.submitted_at = submitted_at
+        self.deadline = deadline
+        self.future = Future()
+        self.confirmations = 0
+
+
+class ConfirmationTracker(_PollingLoop):
+    """ Confirmation Tracker - waits for lots of transactions to be confirmed without polling each one
+
+    Transactions are grouped by wallet and checked with one transaction listing request per batch_size
+    transactions , so tracking 10000 transactions in one wallet costs 10000 / batch_size requests per poll rather
+    than 10000. Polls happen every min_interval while confirmations are arriving and back off towards max_interval
+    when nothing changes.
+
+    Args:
+        api(Theseus.Common.WalletAPI): the wallet api to poll with
+        depth(int): how many confirmations a transaction needs to count as confirmed, default 1
+        batch_size(int): the most transactions to ask about in one request, default 100
+        min_interval(float): seconds between polls while confirmations are arriving, default 1
+        max_interval(float): the longest to wait between polls, default 30
+        backoff(float): what to multiply the interval by after a poll with no progress, default 1.5
+
+    Usage::
+
+        tracker = ConfirmationTracker(api, depth=3)
+        futures = [tracker.track_response(request, api.transact(request)) for request in requests]
+        confirmed = [future.result() for future in futures]
+        print(tracker.latency_summary())
+
+    Notes:
+        The futures resolve to the TransactionResponse from the poll that saw the required depth , or raise
+        TimeoutError if a timeout was given and it passed first.
+        Submit to confirm latency for each confirmed transaction is kept in latencies.
+
+    """
+    def __init__(self, api, depth: int=1, batch_size: int=100, min_interval: float=1.0, max_interval: float=30.0,
+                 backoff: float=1.5):
+        super().__init__('confirmation-tracker', min_interval, max_interval, backoff)
+        self.api = api
+        self.depth = depth
+        self.batch_size = batch_size
+
+        # transaction id -> _TrackedTransaction
+        self._pending = {}
+
+        # transaction id -> seconds from submission to confirmation
+        self.latencies = {}
+
+        self._counters.update(tracked=0, confirmed=0, timed_out=0, requests=0)
+
+    def track(self, transaction_id: str, wallet_id: str, submitted_at: float=None, timeout: float=None) -> Future:
+        """ Track: start watching a transaction
+
+        Args:
+            transaction_id(str): the id of the transaction
+            wallet_id(str): the wallet the transaction was paid from
+            submitted_at(float): time.time() when it was submitted , defaults to now
+            timeout(float): seconds to wait before giving up on it , default None to wait forever
+
+        Returns:
+            Future: resolves to a TransactionResponse when the transaction reaches the required depth
+
+        """
+        submitted_at = submitted_at if submitted_at is not None else time.time()
+        deadline = submitted_at + timeout if timeout is not None else None
+        tracked = _TrackedTransaction(transaction_id, wallet_id, submitted_at, deadline)
+
+        with self._lock:
+            existing = self._pending.get(transaction_id)
+            if existing is not None:
+                return existing.future
+            idle = not self._pending
+            self._pending[transaction_id] = tracked
+            self._counters['tracked'] += 1
+
+        self._start(wake=idle)
+        return tracked.future
+
+    def track_response(self, transaction_request, transaction_response, timeout: float=None) -> Future:
+        """ Track Response: start watching a transaction from the request and response of WalletAPI.transact
+
+        Args:
+            transaction_request(TransactionRequest): the request that was sent
+            transaction_response(TransactionResponse): the response it got
+            timeout(float): seconds to wait before giving up on it , default None to wait forever
+
+        Returns:
+            Future: resolves to a TransactionResponse when the transaction reaches the required depth
+
+        """
+        if not transaction_response:
+            future = Future()
+            future.set_exception(ValueError('Transaction was not accepted: {0}'.format(transaction_response.status)))
+            return future
+
+        return self.track(transaction_response.transaction_id, transaction_request.source.walletId, timeout=timeout)
+
+    @property
+    def pending(self) -> int:
+        """ How many transactions are still waiting for confirmation """
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        """ Get the tracker counters
+
+        Returns:
+            dict: tracked , confirmed , timed out , poll and request counts with the pending count and poll interval
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(pending=len(self._pending), interval=self.interval)
+        return stats
+
+    def latency_summary(self) -> dict:
+        """ Latency Summary: the spread of submit to confirm latencies
+
+        Returns:
+            dict: count , min , mean , p50 , p90 , p99 and max latency in seconds
+
+        """
+        with self._lock:
+            ordered = sorted(self.latencies.values())
+        if not ordered:
+            return dict(count=0, min=0.0, mean=0.0, p50=0.0, p90=0.0, p99=0.0, max=0.0)
+
+        def percentile(fraction):
+            return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+        return dict(count=len(ordered), min=ordered[0], mean=sum(ordered) / len(ordered), p50=percentile(0.5),
+                    p90=percentile(0.9), p99=percentile(0.99), max=ordered[-1])
+
+    def _has_work(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def _poll(self) -> bool:
+        """ Check every pending transaction , a batch at a time """
+        with self._lock:
+            by_wallet = {}
+            for tracked in self._pending.values():
+                by_wallet.setdefault(tracked.wallet_id, []).append(tracked.transaction_id)
+
+        progressed = False
+        for wallet_id, transaction_ids in by_wallet.items():
+            for start in range(0, len(transaction_ids), self.batch_size):
+                batch = transaction_ids[start:start + self.batch_size]
+                responses = self.api.list_transactions(wallet_id, ids=batch, per_page=len(batch))
+                self._counters['requests'] += 1
+                for response in responses:
+                    progressed |= self._update(response)
+
+        return progressed
+
+    def _update(self, response) -> bool:
+        """ Record the confirmations of a transaction and resolve it if it is deep enough """
+        with self._lock:
+            tracked = self._pending.get(response.transaction_id)
+            if tracked is None:
+                return False
+
+            confirmations = response.confirmations if isinstance(response.confirmations, int) else 0
+            if confirmations <= tracked.confirmations:
+                return False
+            tracked.confirmations = confirmations
+
+            if confirmations < self.depth:
+                return True
+
+            del self._pending[tracked.transaction_id]
+            self.latencies[tracked.transaction_id] = time.time() - tracked.submitted_at
+            self._counters['confirmed'] += 1
+
+        tracked.future.set_result(response)
+        return True
+
+    def _expire(self) -> bool:
+        """ Give up on any transactions whose deadline has passed """
+        now = time.time()
+        with self._lock:
+            expired = [tracked for tracked in self._pending.values() if tracked.deadline and tracked.deadline <= now]
+            for tracked in expired:
+                del self._pending[tracked.transaction_id]
+                self._counters['timed_out'] += 1
+
+        for tracked in expired:
+            tracked.future.set_exception(TimeoutError('Transaction {0} had {1} of {2} confirmations'.format(
+                tracked.transaction_id, tracked.confirmations, self.depth)))
+        return bool(expired)
+
+    def _next_deadline(self):
+        with self._lock:
+            return min((tracked.deadline for tracked in self._pending.values() if tracked.deadline), default=None)
+
+
+class SyncProgress(Data):
+    """ A progress report for a wallet restore or a node sync
+
+    Args:
+        target(str): the id of the wallet being restored or 'node' for the node sync
+        percentage(float): how far through it is
+        eta(float): estimated seconds until it is done , None if it can't be estimated yet
+        state(str): the sync state reported by the backend
+
+    """
+    def __init__(self, target, percentage, eta=None, state=''):
+        self.target = target
+        self.percentage = percentage
+        self.eta = eta
+        self.state = state
+
+    def dump(self) -> str:
+        eta = '{0:.0f}s'.format(self.eta) if self.eta is not None else 'unknown'
+        return "Sync Progress\n\tTarget:{0}\n\tState:{1}\n\tProgress:{2:.1f}%\n\tETA:{3}".format(
+            self.target, self.state, self.percentage, eta)
+
+
+class _Watched:
+    """ Something waiting to finish syncing """
+    __slots__ = ['target', 'wallet', 'deadline', 'future', 'on_progress', 'percentage', 'first_seen', 'eta']
+
+    def __init__(self, target, wallet, deadline, on_progress):
+        self.target = target
+        self.wallet = wallet
+        self.deadline = deadline
+        self.future = Future()
+        self.on_progress = on_progress
+        self.percentage = None
+        self.first_seen = None
+        self.eta = None
+
+
+class SyncWatcher(_PollingLoop):
+    """ Sync Watcher - waits for wallet restores and the node sync to finish
+
+    Every watched wallet and the node are checked by one polling loop , all of the wallets being restored are
+    fetched with a single listing request each poll. The poll interval grows exponentially while nothing changes
+    and drops back to min_interval when progress is made.
+
+    Args:
+        api(Theseus.Common.WalletAPI): the wallet api to poll with
+        min_interval(float): seconds between polls while progress is being made, default 1
+        max_interval(float): the longest to wait between polls, default 60
+        backoff(float): what to multiply the interval by after a poll with no progress, default 2
+
+    Notes:
+        Progress callbacks are given a SyncProgress with the percentage done and an estimate of the seconds left ,
+        the wallet estimate comes from the backend and the node estimate from the rate of progress so far.
+        Callbacks run on the polling thread so keep them quick.
+
+    """
+    def __init__(self, api, min_interval: float=1.0, max_interval: float=60.0, backoff: float=2.0):
+        super().__init__('sync-watcher', min_interval, max_interval, backoff)
+        self.api = api
+
+        # wallet id or 'node' -> _Watched
+        self._watched = {}
+
+        self._counters.update(watched=0, finished=0, timed_out=0)
+
+    def watch_wallet(self, wallet, timeout: float=None, on_progress=None) -> Future:
+        """ Watch Wallet: wait for a wallet restore to finish
+
+        Args:
+            wallet(Wallet): the wallet being restored
+            timeout(float): seconds to wait before giving up , default None to wait forever
+            on_progress(callable): called with a SyncProgress each time the restore moves forward
+
+        Returns:
+            Future: resolves to the wallet , with its syncState updated , when the restore is done
+
+        """
+        return self._watch(wallet.id, wallet, timeout, on_progress)
+
+    def watch_node(self, timeout: float=None, on_progress=None) -> Future:
+        """ Watch Node: wait for the node to sync with the blockchain
+
+        Args:
+            timeout(float): seconds to wait before giving up , default None to wait forever
+            on_progress(callable): called with a SyncProgress each time the sync moves forward
+
+        Returns:
+            Future: resolves to the node info when the node is fully synced
+
+        """
+        return self._watch('node', None, timeout, on_progress)
+
+    def _watch(self, target, wallet, timeout, on_progress) -> Future:
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            existing = self._watched.get(target)
+            if existing is not None:
+                return existing.future
+            idle = not self._watched
+            watched = _Watched(target, wallet, deadline, on_progress)
+            self._watched[target] = watched
+            self._counters['watched'] += 1
+
+        self._start(wake=idle)
+        return watched.future
+
+    def stats(self) -> dict:
+        """ Get the watcher counters
+
+        Returns:
+            dict: watched , finished , timed out and poll counts with the number still watched and the poll interval
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(watching=len(self._watched), interval=self.interval)
+        return stats
+
+    def _has_work(self) -> bool:
+        with self._lock:
+            return bool(self._watched)
+
+    def _poll(self) -> bool:
+        with self._lock:
+            wallets = {target: watched for target, watched in self._watched.items() if target != 'node'}
+            node = self._watched.get('node')
+
+        progressed = False
+        if wallets:
+            id_filter = 'IN[{0}]'.format(','.join(wallets.keys()))
+            for fresh in self.api.iter_wallets(id_filter=id_filter, per_page=len(wallets), prefetch=False):
+                watched = wallets.get(fresh.id)
+                if watched is None:
+                    continue
+                watched.wallet.syncState = fresh.syncState
+                watched.wallet.balance = fresh.balance
+                progressed |= self._update_wallet(watched)
+
+        if node is not None:
+            node_info = self.api.get_node_info()
+            if isinstance(node_info, dict) and 'data' in node_info:
+                progressed |= self._update_node(node, node_info)
+
+        return progressed
+
+    def _update_wallet(self, watched) -> bool:
+        sync_state = watched.wallet.syncState or {}
+        if sync_state.get('tag') == 'synced':
+            self._report(watched, 100.0, 0.0, 'synced')
+            self._finish(watched, watched.wallet)
+            return True
+
+        data = sync_state.get('data') or {}
+        percentage = float((data.get('percentage') or {}).get('quantity', 0))
+        eta = (data.get('estimatedCompletionTime') or {}).get('quantity')
+        return self._report(watched, percentage, eta / 1000.0 if eta is not None else None,
+                            sync_state.get('tag', 'unknown'))
+
+    def _update_node(self, watched, node_info) -> bool:
+        percentage = float((node_info['data'].get('syncProgress') or {}).get('quantity', 0))
+        now = time.time()
+        if watched.first_seen is None:
+            watched.first_seen = (now, percentage)
+
+        # estimate the time left from how fast it has been going since we started watching
+        eta = None
+        started, start_percentage = watched.first_seen
+        if percentage > start_percentage and now > started:
+            rate = (percentage - start_percentage) / (now - started)
+            eta = (100.0 - percentage) / rate
+
+        if percentage >= 100.0:
+            self._report(watched, 100.0, 0.0, 'synced')
+            self._finish(watched, node_info)
+            return True
+        return self._report(watched, percentage, eta, 'syncing')
+
+    def _report(self, watched, percentage: float, eta, state: str) -> bool:
+        """ Pass on progress if it has moved , returns True if it has """
+        if watched.percentage is not None and percentage <= watched.percentage:
+            return False
+
+        watched.percentage = percentage
+        watched.eta = eta
+        progress = SyncProgress(watched.target, percentage, eta, state)
+        self.logger.info('{0} sync progress {1:.1f}%'.format(watched.target, percentage))
+        if watched.on_progress:
+            try:
+                watched.on_progress(progress)
+            except Exception as e:
+                self.logger.error('Progress callback failed: {0}'.format(e))
+        return True
+
+    def _finish(self, watched, result):
+        with self._lock:
+            self._watched.pop(watched.target, None)
+            self._counters['finished'] += 1
+        watched.future.set_result(result)
+
+    def _expire(self) -> bool:
+        """ Give up on anything whose deadline has passed """
+        now = time.time()
+        with self._lock:
+            expired = [watched for watched in self._watched.values() if watched.deadline and watched.deadline <= now]
+            for watched in expired:
+                del self._watched[watched.target]
+                self._counters['timed_out'] += 1
+
+        for watched in expired:
+            watched.future.set_exception(TimeoutError('{0} was only {1}% synced'.format(
+                watched.target, watched.percentage)))
+        return bool(expired)
+
+    def _next_deadline(self):
+        with self._lock:
+            return min((watched.deadline for watched in self._watched.values() if watched.deadline), default=None)
@@ -65,7 +65,7 @@ class TransactionResponse(Response):
     This data is returned as slice of the data array which may contain multiple transaction responses.
 
     Args:
-        json (str): the raw json response
+        json (str): the raw json response , or the response already parsed into a dict
 
     Members:
         transaction_id (str): the transactions unique identifier
@@ -98,8 +98,9 @@ class TransactionResponse(Response):
 
     def from_json(self, raw_json):
         """ Populate this object with data from a json"""
-        parsed_json = json.loads(raw_json)
+        parsed_json = json.loads(raw_json) if isinstance(raw_json, (str, bytes)) else raw_json
         if parsed_json['status'] in ['error', 'failed']:
+            self.status = parsed_json['status']
             logger = get_logger('TransactionResponse')
             logger.error("Transaction Error: {0}".format(raw_json))
         else:
@@ -1,3 +1,7 @@
+import json
+import threading
+import weakref
+
 from Theseus.Common.Base import Data
 
 
@@ -20,10 +24,19 @@ class Wallet(Data):
     Notes:
         if you need to change values here use the api to change them in the backend and create a new object,
         updating them if possible but changes will not be sent to the back end so its not worth it.
+        The account data can be loaded lazily , see load_account_lazily. to_json writes it as account and loads it
+        first if it hasn't been. The loader and its lock are kept by the class rather than the instance so copying ,
+        pickling and dumping __dict__ only see the wallet data , a copy has the account data loaded so far.
         A wallet is a child of the wallet backend which is part of either Daedalus or Cardano.
         A wallet can have multiple child accounts
 
     """
+    # wallet -> the loader waiting to fetch its accounts , and wallet -> the lock that makes sure only one thread
+    # runs it , both drop their entries when the wallet is garbage collected
+    _account_loaders = weakref.WeakKeyDictionary()
+    _account_locks = weakref.WeakKeyDictionary()
+    _registry_lock = threading.Lock()
+
     def __init__(self, id, name, passphrase=False, balance=0, assuranceLevel="normal", spendingPassword=False,
                  spendingPasswordLastUpdate=str, account=0, hasSpendingPassword=False, syncState={}, createdAt=str, type=str ):
         self.id = id
@@ -38,7 +51,75 @@ class Wallet(Data):
         self.syncState = syncState
         self.createdAt = createdAt
         self.type = type
-        self.account = 0  # this will be overwritten
+
+    @property
+    def account(self):
+        """ The accounts belonging to this wallet , fetched on first access if a loader has been set
+
+        Only one thread runs the loader , others wait for its result. If the loader raises it is kept so the next
+        access tries again. Setting the account or a new loader doesn't wait for a load that is running , whatever
+        was set last wins.
+
+        """
+        while self in Wallet._account_loaders:
+            with self._account_lock():
+                loader = Wallet._account_loaders.get(self)
+                if loader is None:
+                    break
+                account = loader()
+                with Wallet._registry_lock:
+                    if Wallet._account_loaders.get(self) is loader:
+                        del Wallet._account_loaders[self]
+                        # the property shadows the instance attribute so the data lives in __dict__ under account
+                        self.__dict__['account'] = account
+        return self.__dict__.get('account', 0)
+
+    @account.setter
+    def account(self, value):
+        with Wallet._registry_lock:
+            Wallet._account_loaders.pop(self, None)
+            self.__dict__['account'] = value
+
+    def _account_lock(self) -> threading.Lock:
+        """ The lock for this wallet's account data , made the first time it is needed """
+        with Wallet._registry_lock:
+            lock = Wallet._account_locks.get(self)
+            if lock is None:
+                lock = Wallet._account_locks[self] = threading.Lock()
+            return lock
+
+    def load_account_lazily(self, loader):
+        """ Load Account Lazily: defer fetching the account data until it is first used
+
+        Args:
+            loader(callable): called with no arguments on first access to account , its return value becomes the account
+
+        """
+        with Wallet._registry_lock:
+            Wallet._account_loaders[self] = loader
+
+    @property
+    def account_loaded(self) -> bool:
+        """ True if the account data has been fetched or set """
+        return self not in Wallet._account_loaders
+
+    def to_json(self) -> str:
+        """ Dump the wallet to a JSON formatted string that Wallet(**data) can read back
+
+        Returns:
+            str : a string containing a json representation of the wallet
+
+        """
+        return json.dumps(self, default=self.default, sort_keys=True, indent=4)
+
+    @staticmethod
+    def default(o):
+        """ Default: the json encoder hook , writes the account data as account loading it first if needed """
+        if isinstance(o, Wallet):
+            fields = dict(o.__dict__)
+            fields['account'] = o.account
+            return fields
+        return o.__dict__
 
     #def add_account(self, account: Account):
     #    self.accounts.append(account)
@@ -1,4 +1,8 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 #from typing import Dict, List, Iterable
 import random
 # hack to stop urlib3 complaining when we turn off SSL warnings
@@ -8,10 +12,20 @@ import requests
 
 #  import only the specific parts of theseus we need
 from Theseus.Common.Wallet import Wallet
+from Theseus.Common.Cache import WalletCache
+from Theseus.Common.Provisioning import create_wallets, ProvisioningResult
+from Theseus.Common.Pipeline import TransactionPipeline
+from Theseus.Common.Trackers import SyncWatcher
 from Theseus.Common.Transaction import TransactionRequest, TransactionResponse
-from Theseus.Protocols.SSHTunnel import SSHTunnel
+from Theseus.Protocols.SSHTunnel import SSHTunnel, shared_tunnels
+from Theseus.Protocols.HTTP import PooledSession
+from Theseus.Protocols.Policy import TransportPolicy
+from Theseus.Protocols.RateLimit import RateLimiter
+from Theseus.Protocols.Cassette import Cassette
 from Theseus.Common.Address import AddressResponse, AddressRequest
 from Theseus import get_logger
+from Theseus.Logging import PayloadLogger, get_payload_logger
+from Theseus.Metrics import Metrics
 from Theseus.Common.Account import Account
 
 
@@ -38,17 +52,80 @@ class WalletAPI:
         remote_port(int): The remote port to forward to, default 8090
         local_host(str): The local host name to forward from , default 127.0.0.1
         remote_host(str): The remote host name to forward to , default 127.0.0.1
+        tunnel_mode(str): threads or asyncio , how the ssh tunnel forwards connections , see SSHTunnel, default threads
+        shared_tunnel(bool): True to share one ssh tunnel with every other api for the same host and remote port ,
+                             see Theseus.Protocols.SSHTunnel.TunnelRegistry , default False
         version(int): The API version number, default 1
+        automatic(bool): True to fetch the node info and wallet listing when starting up, default True
+        startup(str): when to open the ssh tunnel and do the automatic fetches , eager to do it before returning ,
+                      lazy to do it on first use or background to do it in a thread while the caller carries on,
+                      default eager
+        pool_connections(int): how many hosts to keep a connection pool for, default 10
+        pool_maxsize(int): the most connections to keep open to the API at once, default 10
+        pool_block(bool): True to wait for a free connection when the pool is full, default False
+        keep_alive(bool): True to keep connections to the API open between calls, default True
+        cache_ttl(float): seconds a cached wallet stays fresh for, default 300 , None for no expiry
+        cache_size(int): the most wallets to keep in the wallet cache, default 10000
+        policy(TransportPolicy): the timeouts , retries and circuit breaker to use , default a TransportPolicy() of
+                                 its own
+        rate_limiter(RateLimiter): token buckets to limit the request rate of each endpoint , default None for no
+                                   limits
+        payload_logger(PayloadLogger): how much of the api payloads to log , default the shared one which can be
+                                       changed with Theseus.set_payload_logging
+        metrics(Metrics): where to record the latency , status and size of every request , default a Metrics of
+                          its own
+        cassette(Cassette): record every request and response to a cassette file or answer them from one instead
+                            of a backend , default None for neither
 
     For more info on the SSHTunnel see the Theseus.Protocol.SSHTunnel documentation.
     The tunnel will stay up as long as this object is still in scope and will be closed down on exit.
 
+    Starting up can take many seconds on a busy backend. With startup='lazy' nothing is done until the first call ,
+    which opens the tunnel and fills the caches before going ahead. With startup='background' that happens in a
+    thread straight away and calls made before the tunnel is up wait for it , use wait_until_ready to wait for the
+    caches too. How long construction , the tunnel and the warmup took is available from startup_stats.
+
+    Requests are sent through a pooled keep-alive session so the TCP , TLS and ssh channel setup is only paid for once
+    per connection rather than on every call, see the Theseus.Protocols.HTTP documentation for details.
+    Pool hit and miss counts are available from pool_stats.
+
+    Every request goes through a Theseus.Protocols.Policy.TransportPolicy which applies per endpoint timeouts ,
+    retries idempotent calls after transient failures and fails fast once an endpoint looks to be down. The endpoint
+    names are the method names , e.g. TransportPolicy(timeouts=dict(transact=60)). A request that gets no answer
+    comes back as a 503 so the usual error objects are returned rather than an exception being raised.
+    Retry and circuit breaker counts are available from policy_stats.
+
+    A Theseus.Protocols.RateLimit.RateLimiter keeps requests to a steady rate , it uses the same endpoint names and
+    can be shared with other api objects. How long requests were queued for is available from rate_limit_stats.
+
+    The latency , status code , payload sizes and error class of every request are recorded in a Theseus.Metrics
+    object under the same endpoint names , endpoint_stats gives the percentiles and rates and metrics can write them
+    out as prometheus text or json.
+
+    With a Theseus.Protocols.Cassette.Cassette in record mode every exchange with the backend is saved to a file , in
+    replay mode the requests are answered from the file and no ssh tunnel is opened , so a suite can be rerun in
+    seconds without a node.
+
+    Wallets are kept in a Theseus.Common.Cache.WalletCache , calls that change a wallet only refresh or drop that
+    wallet and cached Wallet objects are updated in place when they are refreshed. Use get_wallet to read through
+    the cache and cache_stats to see how well it is working.
+
     """
     def __init__(self, host: str='127.0.0.1', port: int=8090, ssl_verify: bool=False, ssh_tunnel: bool=True,
                  username: str = '@', ssh_port: int=22, local_port: int=8090, remote_port: int=8090,
-                 local_host: str='127.0.0.1', remote_host: str='127.0.0.1', version: int = 1, automatic=True):
+                 local_host: str='127.0.0.1', remote_host: str='127.0.0.1', version: int = 1, automatic=True,
+                 pool_connections: int=10, pool_maxsize: int=10, pool_block: bool=False, keep_alive: bool=True,
+                 cache_ttl: float=300, cache_size: int=10000, policy: TransportPolicy=None,
+                 rate_limiter: RateLimiter=None, payload_logger: PayloadLogger=None,
+                 metrics: Metrics=None, cassette: Cassette=None, startup: str='eager', tunnel_mode: str='threads',
+                 shared_tunnel: bool=False):
+        constructing = time.perf_counter()
+        if startup not in ('eager', 'lazy', 'background'):
+            raise ValueError('Unknown startup {0} , use eager , lazy or background'.format(startup))
+
         self._host = host
         self._port = port
+        self._tunnel_host = host
 
         self._ssl_verify = ssl_verify
         self._automatic = automatic
@@ -58,50 +135,264 @@ class WalletAPI:
         self._remote_port = remote_port
         self._local_host = local_host
         self._remote_host = remote_host
+        self._tunnel_mode = tunnel_mode
+        self._shared_tunnel = shared_tunnel
 
         self._version = version
 
         self.logger = self.get_logger("{0}:{1}".format(self._host, self._port))
+        self.payload_logger = payload_logger if payload_logger is not None else get_payload_logger()
 
         self.json_headers = {
             'Accept': 'application/json;charset=utf-8',
             'Content-Type': 'application/json; charset=utf-8'
         }
 
-        # configure an SSH tunnel if we need one
-        if ssh_tunnel is True:
-            self.tunnel = SSHTunnel(username, host, ssh_port, local_port, remote_port)
+        # a pooled session so connections (and their ssh channels) get reused between calls
+        self.session = PooledSession(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                     pool_block=pool_block, keep_alive=keep_alive)
+
+        # timeouts , retries and circuit breaking for every request
+        self.policy = policy if policy is not None else TransportPolicy()
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics is not None else Metrics()
+
+        # record or replay the traffic , a replay has no backend so needs no tunnel
+        self.cassette = cassette
+        if cassette is not None:
+            cassette.mount(self.session)
+
+        # configure an SSH tunnel if we need one , it is opened by start
+        self.tunnel = None
+        self._ssh_port = ssh_port
+        self._needs_tunnel = ssh_tunnel is True and not (cassette is not None and cassette.replaying)
+        if self._needs_tunnel:
             # if we are tunnelling then set the host and port must be local
             self._host = '127.0.0.1'
             # if we are tunneling the set the port to match the local_port of the ssh tunnel
             self._port = local_port
 
-        # this is the wallet cache , a dict of Wallets keyed by name
-        self._wallets = {}
+        # this is the wallet cache , Wallets keyed by id
+        self._wallets = WalletCache(ttl=cache_ttl, max_size=cache_size)
 
         # this is node info cache
         self._node_info = dict
 
-        # automatically populate wallet cache and get node info
-        if self._automatic:
-            self.logger.info('Connecting to WalletAPI')
-            self.get_node_info()
-            self.fetch_wallet_list()
+        # watches restores and the node sync , made when first needed
+        self._sync_watcher = None
+
+        # startup state , requests wait for _connected and cache readers for _warmed
+        self._startup = startup
+        self._start_lock = threading.Lock()
+        self._starting = False
+        self._connected = threading.Event()
+        self._warmed = threading.Event()
+        self._startup_times = dict(construction=0.0, tunnel=0.0, warmup=0.0, first_use_wait=0.0)
+
+        if startup == 'eager':
+            self.start()
+        elif startup == 'background':
+            threading.Thread(target=self.start, name='theseus-api-startup', daemon=True).start()
+
+        self._startup_times['construction'] = time.perf_counter() - constructing
+        self.logger.debug('WalletAPI constructed in {0:.3f}s ({1} startup)'.format(
+            self._startup_times['construction'], startup))
+
+    def start(self):
+        """ Start: open the ssh tunnel and fetch the node info and wallet listing if automatic
+
+        This is run by the constructor , on first use or in a background thread depending on startup , it only
+        does anything the first time it is called. A call while another thread is starting up waits until the tunnel
+        is up.
+
+        """
+        with self._start_lock:
+            first = not self._starting
+            self._starting = True
+        if not first:
+            self._connected.wait()
+            return
+
+        try:
+            begin = time.perf_counter()
+            if self._needs_tunnel and self._shared_tunnel:
+                self.tunnel = shared_tunnels.acquire(self._username, self._tunnel_host, self._ssh_port,
+                                                     remoteport=self._remote_port, remotehost=self._remote_host,
+                                                     localport=self._local_port, mode=self._tunnel_mode)
+                # a tunnel that was already open listens where it was first asked to
+                self._port = self.tunnel.localport
+            elif self._needs_tunnel:
+                self.tunnel = SSHTunnel(self._username, self._tunnel_host, self._ssh_port,
+                                        self._local_port, self._remote_port, mode=self._tunnel_mode)
+            self._startup_times['tunnel'] = time.perf_counter() - begin
+        finally:
+            self._connected.set()
+
+        try:
+            # automatically populate wallet cache and get node info
+            if self._automatic:
+                begin = time.perf_counter()
+                self.logger.info('Connecting to WalletAPI')
+                self.get_node_info()
+                self.fetch_wallet_list()
+                self._startup_times['warmup'] = time.perf_counter() - begin
+                self.logger.info('WalletAPI warmed up in {0:.3f}s with {1} wallets'.format(
+                    self._startup_times['warmup'], len(self._wallets)))
+        finally:
+            self._warmed.set()
+
+    def wait_until_ready(self, timeout: float=None) -> bool:
+        """ Wait Until Ready: wait for the tunnel and the automatic fetches to finish , starting them if needed
+
+        Args:
+            timeout(float): the most seconds to wait , default None to wait for as long as it takes
+
+        Returns:
+            bool: True if startup has finished
+
+        """
+        if self._startup == 'lazy':
+            self.start()
+        return self._warmed.wait(timeout)
+
+    def startup_stats(self) -> dict:
+        """ Startup Stats: get how long starting up took
+
+        Returns:
+            dict: seconds taken by the constructor , opening the tunnel , the automatic fetches and the time calls
+                  spent waiting for startup to finish , with the startup mode and whether it is connected and warm
+
+        """
+        stats = dict(self._startup_times)
+        stats.update(startup=self._startup, connected=self._connected.is_set(), warm=self._warmed.is_set())
+        return stats
 
     def __del__(self):
         try:
-            if self.tunnel:
-                self.tunnel.server.shutdown()
-            else:
+            self.session.close()
+            if self.tunnel and self._shared_tunnel:
+                shared_tunnels.release(self.tunnel)
+            elif self.tunnel:
+                self.tunnel.stop_tunnel()
+            elif self._ssh_tunnel:
                 self.logger.info('SSH tunnel seems to have died of natural causes')
         except Exception as e:
             self.logger.error('Exception stopping ssh tunnel: {0}'.format(e))
 
+    def pool_stats(self) -> dict:
+        """ Pool Stats: get the hit and miss counts for the connection pool
+
+        Returns:
+            dict: the connection pool counters , see Theseus.Protocols.HTTP.PooledSession.pool_stats
+
+        """
+        return self.session.pool_stats()
+
+    def policy_stats(self) -> dict:
+        """ Policy Stats: get the retry , timeout and circuit breaker counts for the transport policy
+
+        Returns:
+            dict: the transport policy counters , see Theseus.Protocols.Policy.TransportPolicy.stats
+
+        """
+        return self.policy.stats()
+
+    def rate_limit_stats(self) -> dict:
+        """ Rate Limit Stats: get the queueing delay for each rate limited endpoint
+
+        Returns:
+            dict: the token bucket counters keyed by endpoint , see Theseus.Protocols.RateLimit.RateLimiter.stats
+
+        """
+        return self.rate_limiter.stats() if self.rate_limiter else {}
+
+    def cassette_stats(self) -> dict:
+        """ Cassette Stats: get the recorded and replayed counts of the cassette
+
+        Returns:
+            dict: the cassette counters , see Theseus.Protocols.Cassette.Cassette.stats , empty if there is no cassette
+
+        """
+        return self.cassette.stats() if self.cassette else {}
+
+    def tunnel_stats(self) -> dict:
+        """ Tunnel Stats: get the channel , traffic and channel open latency figures of the ssh tunnel
+
+        Returns:
+            dict: the tunnel figures , see Theseus.Protocols.SSHTunnel.SSHTunnel.tunnel_stats , empty if there is no
+                  tunnel , compare them with endpoint_stats to tell a slow tunnel from a slow backend
+
+        """
+        return self.tunnel.tunnel_stats() if self.tunnel else {}
+
+    def endpoint_stats(self) -> dict:
+        """ Endpoint Stats: get the latency percentiles , rates , status codes and sizes for each endpoint
+
+        Returns:
+            dict: the figures keyed by endpoint , see Theseus.Metrics.Metrics.snapshot
+
+        """
+        return self.metrics.snapshot()
+
+    def _request(self, method: str, endpoint: str, url: str, data: str=None) -> requests.Response:
+        """ Request: send a request to the api under the transport policy
+
+        Args:
+            method(str): the http method
+            endpoint(str): the name of the call , used for the timeout and counters
+            url(str): the url to request
+            data(str): optional body to send
+
+        Returns:
+            requests.Response: the response , if no answer was received because the connection failed , timed out
+                               or the circuit breaker is open a 503 response with an error body is returned instead
+
+        """
+        if not self._connected.is_set():
+            # lazy or background startup , the tunnel has to be up before anything can be sent
+            waiting = time.perf_counter()
+            port = self._port
+            self.start()
+            with self._start_lock:
+                self._startup_times['first_use_wait'] += time.perf_counter() - waiting
+            if self._port != port:
+                # the url was made before a shared tunnel said which port it is on
+                url = url.replace(':{0}/'.format(port), ':{0}/'.format(self._port), 1)
+
+        if self.rate_limiter:
+            delay = self.rate_limiter.acquire(endpoint)
+            if delay:
+                self.logger.debug('{0} request queued for {1:.3f}s by the rate limit'.format(endpoint, delay))
+
+        start = time.perf_counter()
+        try:
+            response = self.policy.send(self.session, method, endpoint, url, verify=self._ssl_verify,
+                                        headers=self.json_headers, data=data)
+        except requests.RequestException as e:
+            self.metrics.record(endpoint, time.perf_counter() - start, sent=len(data) if data else 0,
+                                error=type(e).__name__)
+            self.logger.error('{0} request failed: {1}'.format(endpoint, e))
+            return TransportPolicy.error_response(url, e)
+
+        self.metrics.record(endpoint, time.perf_counter() - start, status=response.status_code,
+                            sent=len(data) if data else 0, received=len(response.content))
+        return response
+
+    def cache_stats(self) -> dict:
+        """ Cache Stats: get the hit , miss and refresh counts for the wallet cache
+
+        Returns:
+            dict: the wallet cache counters , see Theseus.Common.Cache.WalletCache.stats
+
+        """
+        return self._wallets.stats()
+
     @property
     def wallets(self):
         """" A Generator that iterates through the wallet cache"""
-        for name in self._wallets.keys():
-            yield self._wallets[name]
+        self.wait_until_ready()
+        for wallet in self._wallets.values():
+            yield wallet
 
     def random_wallet(self) -> Wallet:
         """" Random Wallet: Chooses a random wallet from the wallet cache
@@ -110,8 +401,9 @@ class WalletAPI:
             Theseus.Wallet: a random wallet or an error wallet.
 
         """
-        if self._wallets.items():
-            return random.sample(list(self._wallets.values()), 1)[0]
+        self.wait_until_ready()
+        if len(self._wallets):
+            return random.choice(self._wallets.values())
         else:
             self.logger.info('No wallets in cache')
             return Wallet(id='empty', type='error', name='no wallets in cache')
@@ -165,7 +457,7 @@ class WalletAPI:
 
         Notes:
             The created wallet object will also be appended to the local wallet cache.
-            The accounts data will be fetched for this wallet automatically
+            The accounts data will be fetched for this wallet automatically the first time it is used
             To check the status of the operation properly you need to read the status field of the wallet
             in the event of an error you the status will be 'error', the ID will be a status code and the name will be an error message
 
@@ -184,8 +476,9 @@ class WalletAPI:
         url = "https://{0}:{1}/api/v{2}/wallets".format(self._host, self._port, self._version)
 
         # make request
-        self.logger.info("Creating Wallet: Name: '{0}' Phrase: '{1}'".format(name, phrase))
-        response = requests.post(url, verify=self._ssl_verify, headers=self.json_headers, data=json.dumps(payload))
+        self.logger.info("Creating Wallet: Name: '{0}'".format(name))
+        self.payload_logger.log(self.logger, 'Wallet {0} request'.format(operation), payload)
+        response = self._request('POST', 'create_wallet', url, data=json.dumps(payload))
 
         self.logger.debug('Wallet {0} returned: {1}'.format(operation, response.status_code))
 
@@ -202,20 +495,89 @@ class WalletAPI:
             self.logger.error('Error: {0}'.format(response.text))
             return Wallet(id=str(response.status_code), type="error", name="Invalid Charset")
 
+        if response.status_code >= 500:
+            self.logger.error('Error: {0}'.format(response.text))
+            return Wallet(id=str(response.status_code), type="error", name=response.reason)
+
         # we should now be safe to process the json
         response_data = response.json()
         if response_data['status'] == 'success':
             if operation == 'restore':
-                # Todo: watch the operation until the status is done , more important for restore ,
+                # use wait_for_restore to wait until the restore is done
                 self.logger.info('Restore status: {0}'.format(response_data['data']['syncState']))
 
-            wallet = Wallet(**response_data['data'])
-            wallet.account = self.get_accounts(wallet)
-            self._wallets.update({wallet.id: wallet})
-            return wallet
+            wallet = self._make_wallet(response_data['data'])
+            return self._wallets.put(wallet)
+
+        # anything else is a failure or an error such as the wallet already existing
+        self.logger.error('Error: {0}'.format(response.text))
+        return Wallet(id=str(response.status_code), type='error', name="Wallet creation failed in the backend")
+
+    def create_wallets(self, n: int, concurrency: int=8, rate: float=None, password: str='',
+                       assurance: str='strict', progress=None) -> ProvisioningResult:
+        """ Create Wallets: create a lot of wallets at once through a bounded pool of workers
 
-        if response_data['status'] == 'failure':
-            return Wallet(id=response.status_code, type='error', name="Wallet creation failed in the backend")
+        Args:
+            n (int): how many wallets to create
+            concurrency (int): the most creates to have in flight at once, default 8
+            rate (float): the most creates to start per second , default None for as fast as possible
+            password (str): optional spending password for all of the wallets
+            assurance (str): assurance level strict or normal
+            progress (callable): called with (done, total, wallet or failure) after each create
+
+        Returns:
+            ProvisioningResult: the wallets created , typed failures and the latency of each create
+
+        Notes:
+            See Theseus.Common.Provisioning.create_wallets for the details.
+            The created wallets are added to the wallet cache.
+
+        """
+        return create_wallets(self, n, concurrency=concurrency, rate=rate, password=password, assurance=assurance,
+                              progress=progress)
+
+    @property
+    def sync_watcher(self) -> SyncWatcher:
+        """ The SyncWatcher that polls restores and the node sync for this api , see Theseus.Common.Trackers """
+        if self._sync_watcher is None:
+            self._sync_watcher = SyncWatcher(self)
+        return self._sync_watcher
+
+    def wait_for_restore(self, wallet: Wallet, timeout: float=None, on_progress=None) -> Wallet:
+        """ Wait For Restore: block until a wallet has finished restoring
+
+        All of the wallets being waited on share one polling loop which backs off exponentially while nothing
+        changes , use sync_watcher.watch_wallet directly to get a Future instead of blocking.
+
+        Args:
+            wallet (Wallet): the wallet returned by restore_wallet
+            timeout (float): seconds to wait before giving up , default None to wait forever
+            on_progress (callable): called with a SyncProgress each time the restore moves forward
+
+        Returns:
+            Wallet: the wallet with its syncState updated
+
+        Raises:
+            TimeoutError: if the restore didn't finish within the timeout
+
+        """
+        return self.sync_watcher.watch_wallet(wallet, timeout=timeout, on_progress=on_progress).result()
+
+    def wait_for_node_sync(self, timeout: float=None, on_progress=None) -> dict:
+        """ Wait For Node Sync: block until the node has synced with the blockchain
+
+        Args:
+            timeout (float): seconds to wait before giving up , default None to wait forever
+            on_progress (callable): called with a SyncProgress each time the sync moves forward
+
+        Returns:
+            dict: the node info once it is synced
+
+        Raises:
+            TimeoutError: if the node didn't sync within the timeout
+
+        """
+        return self.sync_watcher.watch_node(timeout=timeout, on_progress=on_progress).result()
 
     def delete_wallet(self, wallet: Wallet)-> bool:
         """ Delete a wallet: Deletes a wallet from daedalus
@@ -229,10 +591,11 @@ class WalletAPI:
         """
         url = "https://{0}:{1}/api/v{2}/wallets/{3}".format(self._host, self._port, self._version, wallet.id)
         self.logger.info("Deleting wallet: {0} {1}".format(wallet.name, url))
-        response = requests.delete(url, verify=self._ssl_verify, headers=self.json_headers)
+        response = self._request('DELETE', 'delete_wallet', url)
 
         if response.status_code == 204:
             self.logger.info("Wallet deleted: {0}".format(wallet.name))
+            self._wallets.invalidate(wallet.id)
             return True
         if response.status_code == 404:
             self.logger.error("Walled deletion: ID not found")
@@ -243,13 +606,13 @@ class WalletAPI:
 
     def delete_all_wallets(self) -> bool:
         """ Delete all the wallets: Deletes all the wallets from daedalus and the local wallet cache"""
-        #try:
-        for name in self.wallets:
-            self.logger.info('Deleting wallet: {0}'.format(self._wallets[name]))
-            self.delete_wallet(self._wallets[name].id())
+        # take a copy as each deletion removes the wallet from the cache
+        for wallet in list(self.wallets):
+            self.logger.info('Deleting wallet: {0}'.format(wallet))
+            self.delete_wallet(wallet)
 
         # empty the wallet cache so its in sync
-        self._wallets = dict
+        self._wallets.clear()
         return True
 
     def fetch_wallet_list(self, id_filter: str="", balance_filter: str="", sort_by: str="", page: int=1, per_page: int=50):
@@ -267,9 +630,156 @@ class WalletAPI:
 
         Notes:
             Defaults to fetching 100 wallets to avoid having to use using pagination
+            Wallets that are already cached are refreshed in place , wallets found by a balance or sort query are
+            not added to the cache. When the listing holds every wallet the backend has , cached wallets that are
+            missing from it have been deleted and are dropped from the cache
+            Account data is fetched the first time each wallet's account is used, call load_accounts to fetch it up
+            front for a lot of wallets at once
             Specification syntax can be found at https://cardanodocs.com/technical/wallet/api/v1/
 
         """
+        url = self._wallet_listing_url(id_filter, balance_filter, sort_by, page, per_page)
+
+        self.logger.debug("Fetching Wallet Listing: Url: '{0}'".format(url))
+        response = self._request('GET', 'fetch_wallet_list', url)
+
+        self.logger.info('Wallet listing request status code: {0}'.format(response.status_code))
+        if response.status_code != 200:
+            if getattr(response, 'exception', None) is not None:
+                self.logger.error('No answer from the api , check the details and the ssh tunnel make sense')
+            self.logger.error('Error: {0}'.format(response.text))
+            return {}
+
+        wallet_data = response.json()
+        self.payload_logger.log(self.logger, 'Fetched wallets', wallet_data['data'], size=len(response.content))
+        wallets = wallet_data['data']
+        self.logger.info('Fetched data on {0} wallets'.format(len(wallets)))
+
+        temp_wallets = {}
+        for wallet in wallets:
+            temp_wallets.update({wallet['id']: self._make_wallet(wallet)})
+
+        if balance_filter or sort_by:
+            # if we have filters don't update the cache , its a user query
+            return temp_wallets
+
+        # refresh just the wallets we were sent
+        for wallet_id, wallet in temp_wallets.items():
+            temp_wallets[wallet_id] = self._wallets.put(wallet)
+
+        if id_filter:
+            return temp_wallets[id_filter]
+
+        if self._wallets.complete_listing(wallet_data, page, per_page):
+            dropped = self._wallets.retain(temp_wallets)
+            if dropped:
+                self.logger.info('Dropped {0} deleted wallets from the cache'.format(dropped))
+
+        return temp_wallets
+
+    def get_wallet(self, wallet_id: str, refresh: bool=False) -> Wallet:
+        """ Get Wallet: get a wallet from the cache , fetching it from the backend if it is missing or stale
+
+        Args:
+            wallet_id (str): the id of the wallet
+            refresh (bool): True to fetch it from the backend even if the cached copy is fresh
+
+        Returns:
+            Wallet: the cached wallet or an error wallet if it could not be fetched
+
+        """
+        if not refresh:
+            wallet = self._wallets.get(wallet_id)
+            if wallet is not None:
+                return wallet
+
+        return self.refresh_wallet(wallet_id)
+
+    def refresh_wallet(self, wallet_id: str) -> Wallet:
+        """ Refresh Wallet: fetch one wallet from the backend and update it in the cache
+
+        Args:
+            wallet_id (str): the id of the wallet
+
+        Returns:
+            Wallet: the refreshed wallet or an error wallet if it could not be fetched
+
+        """
+        url = "https://{0}:{1}/api/v{2}/wallets/{3}".format(self._host, self._port, self._version, wallet_id)
+        response = self._request('GET', 'refresh_wallet', url)
+        self.logger.debug('Wallet refresh request status code: {0}'.format(response.status_code))
+
+        if response.status_code == 404:
+            # it has gone from the backend so it shouldn't be in the cache
+            self._wallets.invalidate(wallet_id)
+
+        if response.status_code == 200:
+            parsed = response.json()
+            if parsed['status'] == 'success':
+                return self._wallets.put(self._make_wallet(parsed['data']))
+
+        self.logger.error('Error refreshing wallet: {0}'.format(response.text))
+        return Wallet(id=str(response.status_code), type="error", name=response.reason)
+
+    def iter_wallets(self, id_filter: str="", balance_filter: str="", sort_by: str="", per_page: int=50,
+                     prefetch: bool=True):
+        """ Iterate Wallets: A Generator that walks every page of the wallet listing
+
+        Pages are fetched as they are needed using the meta.pagination block of each response to find out when to
+        stop , so only the current page (and the next one if prefetching) is held in memory however many wallets
+        the backend has.
+
+        Args:
+            id_filter (str): Filter specification for wallet IDs
+            balance_filter (str): Filter specification for wallet balances
+            sort_by (str) : sort specification for wallet listing
+            per_page(int) : how many listings to fetch in each request, default 50
+            prefetch(bool): True to fetch the next page in the background while the current one is consumed
+
+        Returns:
+            Generator: yields Wallet objects
+
+        Notes:
+            The wallet cache is not updated by this , use fetch_wallet_list for that.
+            Account data is fetched the first time each wallet's account is used.
+            If a page request fails the error is logged and the iteration stops.
+
+        """
+        def fetch(page_number):
+            return self._fetch_wallet_page(
+                self._wallet_listing_url(id_filter, balance_filter, sort_by, page_number, per_page))
+
+        # a single worker is all that is needed to keep one page ahead of the consumer
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        page = 1
+        next_page = executor.submit(fetch, page) if prefetch else None
+        try:
+            while True:
+                wallets, pagination = next_page.result() if prefetch else fetch(page)
+                next_page = None
+
+                more = bool(wallets) and page < pagination.get('totalPages', page)
+                if more:
+                    page += 1
+                    if prefetch:
+                        next_page = executor.submit(fetch, page)
+
+                for wallet in wallets:
+                    yield self._make_wallet(wallet)
+
+                # drop our reference to this page before moving on to the next
+                del wallets
+                if not more:
+                    return
+        finally:
+            if executor:
+                if next_page:
+                    next_page.cancel()
+                executor.shutdown(wait=False)
+
+    def _wallet_listing_url(self, id_filter: str="", balance_filter: str="", sort_by: str="", page: int=1,
+                            per_page: int=50) -> str:
+        """ Make the url for a page of the wallet listing with any filters applied """
         url = "https://{0}:{1}/api/v{2}/wallets?page={3};per_page={4}".format(
             self._host, self._port, self._version, page, per_page)
 
@@ -280,43 +790,59 @@ class WalletAPI:
             url += ";balance={0}".format(balance_filter)
 
         if sort_by:
-            sort_by += ";sort_buy".format(sort_by)
+            url += ";sort_by={0}".format(sort_by)
+
+        return url
 
-        response = requests.Response
+    def _fetch_wallet_page(self, url: str):
+        """ Fetch one page of the wallet listing
 
+        Args:
+            url(str): the listing url for the page
+
+        Returns:
+            tuple: a list of the raw wallet data and the pagination block , the list is empty if the request failed
+
+        """
         self.logger.debug("Fetching Wallet Listing: Url: '{0}'".format(url))
-        try:
-            response = requests.get(url, verify=self._ssl_verify, headers=self.json_headers)
-        except ConnectionRefusedError as e:
-            self.logger.error('Connection Refused: {0} check the details and the ssh tunnel make sense'.format(e))
+        response = self._request('GET', 'iter_wallets', url)
+        if response.status_code != 200:
+            self.logger.error('Wallet listing failed: {0} {1}'.format(response.status_code, response.text))
+            return [], {}
 
-        self.logger.info('Wallet listing request status code: {0}'.format(response.status_code))
-        if response.status_code == 400:
-            self.logger.error('Error: {0}'.format(response.text))
-            return {}
+        listing = response.json()
+        return listing['data'], listing.get('meta', {}).get('pagination', {})
 
-        if response.status_code == 200:
-            wallet_data = response.json()
-            self.logger.info('Fetched Wallet: ' + json.dumps(wallet_data['data'], default=lambda o: o.__dict__, sort_keys=True, indent=4))
-            wallets = wallet_data['data']
-            self.logger.info('Fetched data on {0} wallets'.format(len(wallets)))
-
-            temp_wallets = {}
-            for wallet in wallets:
-                # create a wallet object with all the values as kwargs, the keys match
-                fresh = Wallet(**wallet)
-                fresh.account = self.get_accounts(fresh)
-                temp_wallets.update({wallet['id']: fresh})
-
-            if id_filter:
-                return temp_wallets[id_filter]
-
-            if balance_filter or sort_by:
-                # if we have filters don't update the cache , its a user query
-                return temp_wallets
-            else:
-                self._wallets = temp_wallets
-                return temp_wallets
+    def _make_wallet(self, data: dict) -> Wallet:
+        """ Make a Wallet from the api data that will load its accounts on first use """
+        # create a wallet object with all the values as kwargs, the keys match
+        wallet = Wallet(**data)
+        wallet.load_account_lazily(partial(self.get_accounts, wallet))
+        return wallet
+
+    def load_accounts(self, wallets=None, max_workers: int=8):
+        """ Load Accounts: fetch the account data for many wallets at once
+
+        The requests are spread over a bounded pool of threads so a big wallet listing doesn't take a round trip
+        per wallet one after another.
+
+        Args:
+            wallets (iterable): the Wallets to load the accounts of , defaults to the whole wallet cache if None
+            max_workers (int): the most account requests to have in flight at once, default 8
+
+        Returns:
+            list: the wallets with their account data loaded
+
+        """
+        wallets = list(self.wallets if wallets is None else wallets)
+        pending = [wallet for wallet in wallets if not wallet.account_loaded]
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for wallet, account in zip(pending, executor.map(self.get_accounts, pending)):
+                    wallet.account = account
+
+        return wallets
 
     def dump_wallets(self):
         """ Dump Wallets: dumps the contents of the wallet cache to the logs """
@@ -337,17 +863,38 @@ class WalletAPI:
 
         Notes:
             You will allways get a transaction response object and the status code for the request will be logged.
+            The source wallet is marked as stale in the wallet cache so its balance is refreshed the next time it is
+            fetched with get_wallet.
 
         """
         url = "https://{0}:{1}/api/v{2}/transactions".format(self._host, self._port, self._version)
 
-        response = requests.post(url, verify=self._ssl_verify, headers=self.json_headers,
-                                 data=transaction_request.to_json())
+        response = self._request('POST', 'transact', url, data=transaction_request.to_json())
         self.logger.info('Transaction request status code: {0}'.format(response.status_code))
         if response.status_code == 400:
             self.logger.error('Error: {0}'.format(response.text))
+
+        # the balance of the paying wallet has changed
+        self._wallets.expire(getattr(transaction_request.source, 'walletId', None))
         return TransactionResponse(response.text)
 
+    def transact_many(self, transaction_requests, max_in_flight: int=8):
+        """ Transact Many: send a stream of transactions keeping a window of them in flight
+
+        Args:
+            transaction_requests (iterable) : TransactionRequests to enact , read lazily so it can be a generator
+            max_in_flight (int) : the most transactions to have in flight at once, default 8
+
+        Returns:
+            Generator: yields a TransactionResponse for each request as they complete
+
+        Notes:
+            The window shrinks when the backend returns errors or slows down and grows back when it recovers,
+            see Theseus.Common.Pipeline.TransactionPipeline. Use that directly if you want its counters.
+
+        """
+        return TransactionPipeline(self, max_in_flight=max_in_flight).run(transaction_requests)
+
     def create_address(self, address_request: AddressRequest) -> AddressResponse:
         """ Create Address: creates a new receive address
 
@@ -365,13 +912,41 @@ class WalletAPI:
 
         url = "https://{0}:{1}/api/v{2}/addresses".format(self._host, self._port, self._version)
 
-        response = requests.post(url, verify=self._ssl_verify, headers=self.json_headers, data=address_request.to_json())
+        response = self._request('POST', 'create_address', url, data=address_request.to_json())
         self.logger.info('Create address request status code: {0}'.format(response.status_code))
         if response.status_code == 400:
             self.logger.error('Error: {0}'.format(response.text))
 
         return AddressResponse(response.text)
 
+    def list_transactions(self, wallet_id: str, ids: list=None, page: int=1, per_page: int=50) -> list:
+        """ List Transactions: fetch the transaction history of a wallet
+
+        Args:
+            wallet_id (str): the wallet to list the transactions of
+            ids (list): optional transaction ids to restrict the listing to
+            page (int) : which page of the listing to fetch, default 1
+            per_page (int) : how many transactions to fetch on a page, default 50
+
+        Returns:
+            list: a TransactionResponse for each transaction found , empty if the request failed
+
+        """
+        url = "https://{0}:{1}/api/v{2}/transactions?wallet_id={3};page={4};per_page={5}".format(
+            self._host, self._port, self._version, wallet_id, page, per_page)
+
+        if ids:
+            url += ";id=IN[{0}]".format(','.join(ids))
+
+        response = self._request('GET', 'list_transactions', url)
+        self.logger.debug('Transaction listing request status code: {0}'.format(response.status_code))
+        if response.status_code != 200:
+            self.logger.error('Error listing transactions: {0}'.format(response.text))
+            return []
+
+        parsed = response.json()
+        return [TransactionResponse(dict(status=parsed['status'], data=data)) for data in parsed['data']]
+
     def get_accounts(self, wallet: Wallet):
         """ Get Accounts: get a list of accounts owned by a wallet
 
@@ -387,7 +962,7 @@ class WalletAPI:
 
         url = "https://{0}:{1}/api/v{2}/wallets/{3}/accounts".format(self._host, self._port, self._version, wallet.id)
 
-        response = requests.get(url, verify=self._ssl_verify, headers=self.json_headers)
+        response = self._request('GET', 'get_accounts', url)
         if response.status_code == 200:
             raw_json = json.loads(response.text)
             if raw_json['status'] == 'success':
@@ -397,24 +972,38 @@ class WalletAPI:
                 return accounts
 
             if raw_json['status'] == 'failure':
-                self.logger.error('Error fetching accounts: {0}'.format(response.error))
+                self.logger.error('Error fetching accounts: {0}'.format(response.text))
 
     def get_node_info(self):
         """ Get Node Information: Fetch and log node status info
 
         This is run when we first connect to the node
 
-        You can access the data from it at self._node_info
+        You can access the data from it at self._node_info , it is also returned
 
         The spec for this is here
         https://cardanodocs.com/technical/wallet/api/v1/#tag/Info
 
         """
         url = "https://{0}:{1}/api/v{2}/node-info".format(self._host, self._port, self._version)
-        response = requests.get(url, verify=self._ssl_verify, headers=self.json_headers)
+        response = self._request('GET', 'get_node_info', url)
         if response.status_code == 200:
             self._node_info = json.loads(response.text)
-            self.logger.info("Node info: \n {0}".format(json.dumps(self._node_info, default=lambda o: o.__dict__, sort_keys=True, indent=4)))
+            self.payload_logger.log(self.logger, 'Node info', self._node_info, size=len(response.content))
+        return self._node_info
+
+    def ping(self) -> bool:
+        """ Ping: check the backend is answering by fetching the node info
+
+        Returns:
+            bool: True if the node info came back
+
+        Notes:
+            This is counted as the ping endpoint so health checks don't mix with the get_node_info figures.
+
+        """
+        url = "https://{0}:{1}/api/v{2}/node-info".format(self._host, self._port, self._version)
+        return self._request('GET', 'ping', url).status_code == 200
 
     def update_wallet(self, id, assuranceLevel=None, name=None):
         """ Update the wallet with correspending ID in the backend to match the supplied wallet object
@@ -427,9 +1016,11 @@ class WalletAPI:
         Returns:
             Wallet: updated wallet in sync with the backend.
 
+        Notes:
+            The cached copy of the wallet is updated to match the backend.
+
         """
-        # fetch wallet with unique ID , will be first in list
-        wallet_to_update = self.fetch_wallet_list(id_filter=id)
+        wallet_to_update = self.get_wallet(id)
 
         url = "https://{0}:{1}/api/v{2}/wallets/{3}".format(self._host, self._port, self._version, id)
         update = {}
@@ -445,7 +1036,7 @@ class WalletAPI:
             update['name'] = wallet_to_update.name
 
         #  update field on backend
-        response = requests.put(url, verify=self._ssl_verify, headers=self.json_headers, data=json.dumps(update))
+        response = self._request('PUT', 'update_wallet', url, data=json.dumps(update))
         self.logger.info('Update wallet request status code: {0}'.format(response.status_code))
         if response.status_code == 400:
             self.logger.error('Error: {0}'.format(response.text))
@@ -454,7 +1045,7 @@ class WalletAPI:
             parsed = response.json()
             if parsed['status'] == 'success':
                 # if its successful
-                return Wallet(**parsed['data'])
+                return self._wallets.put(self._make_wallet(parsed['data']))
 
             if parsed['status'] in ['failed', 'error']:
                 self.logger.error('Error updating wallet: {0}'.format(response.text))
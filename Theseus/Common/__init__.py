@@ -5,7 +5,12 @@ from .Address import AddressRequest, AddressResponse, Address
 from .Transaction import TransactionResponse, TransactionRequest, TransactionDestination, TransactionSource
 from .Wallet import Wallet
 from .WalletAPI import WalletAPI
+from .AsyncWalletAPI import AsyncWalletAPI
 from .Actions import quickpay, find_genesis_wallet
+from .Provisioning import create_wallets, ProvisioningResult, WalletCreationFailure
+from .Pipeline import TransactionPipeline
+from .Trackers import ConfirmationTracker, SyncWatcher, SyncProgress
+from .Cluster import WalletCluster
 
 __author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
 __doc__ = 'Common components for Theseus'
@@ -15,6 +20,8 @@ __any__ = [
             'Request', 'Response',
             'generate_mnemonic', 'check_mnemonic',  'generate_walletname', 'generate_spending_password', 'encode_spending_password',
             'TransactionDestination', 'TransactionSource', 'TransactionRequest', 'TransactionResponse',
-            'Wallet', 'WalletAPI',
+            'Wallet', 'WalletAPI', 'AsyncWalletAPI',
+            'create_wallets', 'ProvisioningResult', 'WalletCreationFailure', 'TransactionPipeline',
+            'ConfirmationTracker', 'SyncWatcher', 'SyncProgress', 'WalletCluster',
             'Base', 'Response', 'Request', 'Location', 'Source', 'Destination', 'Data',
            ]
@@ -0,0 +1,169 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Theseus import get_logger
+from Theseus.Common.Address import AddressRequest
+from Theseus.Common.Transaction import TransactionRequest, TransactionSource, TransactionDestination
+from Theseus.Common.Wallet import Wallet
+from Theseus.Load.Report import Recorder, LoadReport
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Load - Open loop constant arrival rate load generator'
+__all__ = ['OpenLoop']
+
+
+class OpenLoop:
+    """ Open Loop - sends calls on a fixed timetable whatever the backend is doing
+
+    A closed loop , where each user waits for an answer before sending again , sends less when the backend slows
+    down so the queueing it causes never shows up in the figures. This works out when every call should be sent
+    before the run starts , either evenly spaced or as a poisson process , and sends each one at its time from a pool
+    of workers. Latency is measured from when the call should have been sent , not when it was , so time spent
+    waiting for a free worker counts against the backend just as it would for a real user.
+
+    Args:
+        api(WalletAPI): the api to send the calls with , its pool_maxsize should be at least max_in_flight
+        wallet(Wallet): the funded wallet to pay from and add addresses to , its accounts must be loadable
+        rate(float): calls per second
+        duration(float): seconds to send calls for
+        actions(dict): relative weights of transact and create_address, default transact only
+        arrival(str): constant for evenly spaced calls or poisson for random gaps averaging 1/rate, default constant
+        addresses(list): addresses to pay to , default the wallet's own , new addresses are added as they are made
+        amount(int): lovelace for each transaction, default 1
+        password(str): the wallet's spending password, default ''
+        max_in_flight(int): how many calls can be waiting for an answer at once, default 64
+        lag_tolerance(float): seconds a call can start late before it counts as missing its time, default 0.01
+        seed(int): seed for the arrival times and action choices, default None
+
+    Usage::
+
+        with MockWalletBackend(latency=0.05, initial_balance=10 ** 12) as backend:
+            api = WalletAPI(automatic=False, pool_maxsize=64, **backend.api_args())
+            wallet = api.create_wallet('open loop', generate_mnemonic())
+            report = OpenLoop(api, wallet, rate=200, duration=30, arrival='poisson').run()
+
+    Notes:
+        The report counters give how many calls were scheduled and completed , how many missed their time by more
+        than lag_tolerance and the mean and worst start lag. A lot of misses means the backend , or this machine ,
+        can't keep up with the rate.
+
+    """
+    ACTIONS = ('transact', 'create_address')
+
+    def __init__(self, api, wallet: Wallet, rate: float, duration: float, actions: dict=None,
+                 arrival: str='constant', addresses: list=None, amount: int=1, password: str='',
+                 max_in_flight: int=64, lag_tolerance: float=0.01, seed: int=None):
+        self.api = api
+        self.wallet = wallet
+        self.rate = float(rate)
+        self.duration = float(duration)
+        self.actions = dict(actions or dict(transact=1))
+        self.arrival = arrival
+        self.amount = amount
+        self.password = password
+        self.max_in_flight = max_in_flight
+        self.lag_tolerance = lag_tolerance
+
+        if self.rate <= 0:
+            raise ValueError('The rate must be more than 0')
+        if arrival not in ('constant', 'poisson'):
+            raise ValueError('Unknown arrival {0} , use constant or poisson'.format(arrival))
+        unknown = set(self.actions) - set(self.ACTIONS)
+        if unknown:
+            raise ValueError('Unknown actions {0} , the actions are {1}'.format(', '.join(sorted(unknown)),
+                                                                                  ', '.join(self.ACTIONS)))
+
+        self.logger = get_logger('open-loop')
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._addresses = list(addresses or [])
+        self._counters = dict(scheduled=0, completed=0, missed=0, total_lag=0.0, max_lag=0.0)
+
+    def schedule(self) -> list:
+        """ Schedule: work out when each call should be sent
+
+        Returns:
+            list: (seconds from the start , action) for every call in the run
+
+        """
+        names = list(self.actions)
+        weights = [self.actions[name] for name in names]
+
+        offsets = []
+        if self.arrival == 'constant':
+            offsets = [index / self.rate for index in range(int(self.duration * self.rate))]
+        else:
+            offset = self._random.expovariate(self.rate)
+            while offset < self.duration:
+                offsets.append(offset)
+                offset += self._random.expovariate(self.rate)
+
+        return list(zip(offsets, self._random.choices(names, weights, k=len(offsets))))
+
+    def _transact(self):
+        with self._lock:
+            address = self._random.choice(self._addresses)
+        request = TransactionRequest(TransactionSource(self.wallet.account[0].index, self.wallet.id),
+                                     [TransactionDestination(self.amount, address)], spendingPassword=self.password)
+        return bool(self.api.transact(request))
+
+    def _create_address(self):
+        response = self.api.create_address(AddressRequest(self.wallet))
+        if response:
+            with self._lock:
+                self._addresses.extend(response.data)
+        return bool(response)
+
+    def _fire(self, action: str, intended: float, recorder: Recorder):
+        lag = time.monotonic() - intended
+        try:
+            error = None if getattr(self, '_' + action)() else 'failed'
+        except Exception as e:
+            error = type(e).__name__
+            self.logger.debug('{0} raised {1!r}'.format(action, e))
+        finished = time.monotonic()
+        recorder.record(action, finished, finished - intended, error)
+
+        with self._lock:
+            self._counters['completed'] += 1
+            self._counters['total_lag'] += lag
+            self._counters['max_lag'] = max(self._counters['max_lag'], lag)
+            if lag > self.lag_tolerance:
+                self._counters['missed'] += 1
+
+    def run(self) -> LoadReport:
+        """ Run: send every call at its time and report on them
+
+        Returns:
+            LoadReport: latency from the intended send time and throughput for each action , with the schedule
+                        counters
+
+        """
+        if not self._addresses:
+            # loading the account here also keeps it out of the first call's latency
+            self._addresses = [address['id'] for address in self.wallet.account[0].addresses]
+
+        schedule = self.schedule()
+        recorder = Recorder()
+        self._counters = dict(scheduled=len(schedule), completed=0, missed=0, total_lag=0.0, max_lag=0.0)
+        self.logger.info('Open loop: {0} calls at {1}/s ({2}) over {3}s'.format(len(schedule), self.rate,
+                                                                            self.arrival, self.duration))
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='theseus-open-loop') as executor:
+            for offset, action in schedule:
+                intended = start + offset
+                delay = intended - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._fire, action, intended, recorder)
+        end = time.monotonic()
+
+        with self._lock:
+            counters = dict(self._counters)
+        counters['mean_lag'] = counters.pop('total_lag') / counters['completed'] if counters['completed'] else 0.0
+        report = recorder.report('open loop {0}/s {1}'.format(self.rate, self.arrival), start, end, counters)
+        self.logger.info(report.dump())
+        return report
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+from collections import Counter
+
+from Theseus.Common.Base import Data
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Load - Latency and throughput reports'
+__all__ = ['Recorder', 'ActionReport', 'LoadReport']
+
+
+def _latency_summary(latencies) -> dict:
+    ordered = sorted(latencies)
+    if not ordered:
+        return dict(min=0.0, mean=0.0, p50=0.0, p90=0.0, p99=0.0, max=0.0)
+
+    def percentile(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    return dict(
+        min=ordered[0],
+        mean=sum(ordered) / len(ordered),
+        p50=percentile(0.5),
+        p90=percentile(0.9),
+        p99=percentile(0.99),
+        max=ordered[-1],
+    )
+
+
+class ActionReport(Data):
+    """ The figures for one action in a load run
+
+    Members:
+        name (str): the action
+        count (int): how many were done in the measured window
+        errors (int): how many of those failed
+        error_classes (dict): failure counts by reason , the exception class or 'failed' if the api said no
+        rate (float): completed actions per second over the window
+        latency (dict): min , mean , p50 , p90 , p99 and max seconds
+
+    """
+    def __init__(self, name, count=0, errors=0, error_classes=None, rate=0.0, latency=None):
+        self.name = name
+        self.count = count
+        self.errors = errors
+        self.error_classes = error_classes or {}
+        self.rate = rate
+        self.latency = latency or _latency_summary([])
+
+    def to_dict(self) -> dict:
+        return dict(name=self.name, count=self.count, errors=self.errors, error_classes=self.error_classes,
+                    rate=self.rate, latency=self.latency)
+
+    def dump(self) -> str:
+        template = "{0:<20} {1:>8} done {2:>6} errors {3:>9.1f}/s  p50 {4:>9.1f}ms  p90 {5:>9.1f}ms  p99 {6:>9.1f}ms"
+        return template.format(self.name, self.count, self.errors, self.rate, self.latency['p50'] * 1000,
+                               self.latency['p90'] * 1000, self.latency['p99'] * 1000)
+
+
+class LoadReport(Data):
+    """ The outcome of a load run
+
+    Members:
+        name (str): the name of the run
+        window (float): seconds the figures were measured over
+        actions (dict): an ActionReport for each action keyed by name
+        excluded (int): actions left out of the figures because they finished outside the window , e.g. in ramp up
+        counters (dict): anything else the load generator counted
+
+    """
+    def __init__(self, name, window=0.0, actions=None, excluded=0, counters=None):
+        self.name = name
+        self.window = window
+        self.actions = actions or {}
+        self.excluded = excluded
+        self.counters = counters or {}
+
+    def __bool__(self):
+        return not any(action.errors for action in self.actions.values())
+
+    def to_dict(self) -> dict:
+        return dict(name=self.name, window=self.window, excluded=self.excluded, counters=self.counters,
+                    actions={name: action.to_dict() for name, action in self.actions.items()})
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), sort_keys=True, indent=4)
+
+    def write(self, path: str):
+        """ Write the report to a json file
+
+        Args:
+            path(str): the file to write
+
+        """
+        # write then rename so nothing ever reads a half written report
+        temporary = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(temporary, 'w') as handle:
+            handle.write(self.to_json())
+        os.replace(temporary, path)
+
+    def dump(self) -> str:
+        lines = ["Load Report: {0}\n\tWindow:{1:.1f}s\n\tExcluded:{2}".format(self.name, self.window, self.excluded)]
+        lines += ['\t{0}: {1}'.format(counter, value) for counter, value in sorted(self.counters.items())]
+        lines += ['\t' + action.dump() for name, action in sorted(self.actions.items())]
+        return '\n'.join(lines)
+
+
+class Recorder:
+    """ Recorder - collects the outcome of every action from many threads
+
+    Each action is kept with when it finished so a report can leave out the ramp up and wind down.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # action -> list of (finish time , latency , error or None)
+        self._samples = {}
+
+    def record(self, action: str, finished: float, latency: float, error: str=None):
+        """ Record one action
+
+        Args:
+            action(str): the action name
+            finished(float): when it finished , on the time.monotonic clock
+            latency(float): seconds it took
+            error(str): why it failed , None if it worked
+
+        """
+        with self._lock:
+            self._samples.setdefault(action, []).append((finished, latency, error))
+
+    def report(self, name: str, start: float, end: float, counters: dict=None) -> LoadReport:
+        """ Report: work out the figures for the actions that finished between start and end
+
+        Args:
+            name(str): the name of the run
+            start(float): the start of the measured window on the time.monotonic clock
+            end(float): the end of the window
+            counters(dict): extra counters to include
+
+        Returns:
+            LoadReport: the report
+
+        """
+        window = max(end - start, 1e-9)
+        report = LoadReport(name, window=end - start, counters=dict(counters or {}))
+        with self._lock:
+            samples = {action: list(recorded) for action, recorded in self._samples.items()}
+
+        for action, recorded in samples.items():
+            inside = [sample for sample in recorded if start <= sample[0] <= end]
+            report.excluded += len(recorded) - len(inside)
+            errors = Counter(error for finished, latency, error in inside if error)
+            report.actions[action] = ActionReport(
+                action,
+                count=len(inside),
+                errors=sum(errors.values()),
+                error_classes=dict(errors),
+                rate=len(inside) / window,
+                latency=_latency_summary([latency for finished, latency, error in inside]),
+            )
+        return report
@@ -0,0 +1,273 @@
+import json
+import random
+import threading
+import time
+
+from Theseus import get_logger
+from Theseus.Common.Address import AddressRequest
+from Theseus.Common.Generators import generate_mnemonic, generate_walletname
+from Theseus.Common.Transaction import TransactionRequest, TransactionSource, TransactionDestination
+from Theseus.Common.WalletAPI import WalletAPI
+from Theseus.Load.Report import Recorder, LoadReport
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Load - Declarative multi user load scenarios'
+__all__ = ['Scenario', 'ACTIONS']
+
+
+def _create_wallet(user, password: str=''):
+    wallet = user.api.create_wallet(generate_walletname(), generate_mnemonic(), password=password)
+    if wallet.type == 'error':
+        return False
+    user.created.append(wallet)
+    return True
+
+
+def _create_address(user):
+    response = user.api.create_address(AddressRequest(user.wallet))
+    if not response:
+        return False
+    user.scenario.add_addresses(response.data)
+    return True
+
+
+def _transact(user, amount: int=1, password: str=''):
+    destination = TransactionDestination(amount, user.scenario.random_address(user.random))
+    request = TransactionRequest(TransactionSource(user.wallet.account[0].index, user.wallet.id), [destination],
+                                 spendingPassword=password)
+    return bool(user.api.transact(request))
+
+
+def _list_wallets(user, per_page: int=50):
+    # the user's own wallet is always there so an empty listing means the request failed
+    return bool(user.api.fetch_wallet_list(per_page=per_page))
+
+
+# the actions a scenario can use , each is called with the virtual user and the options from the scenario file
+# and returns True if it worked
+ACTIONS = dict(
+    create_wallet=_create_wallet,
+    create_address=_create_address,
+    transact=_transact,
+    list_wallets=_list_wallets,
+)
+
+
+class _VirtualUser:
+    """ One virtual user , it owns a wallet and does actions one after another """
+    def __init__(self, scenario, api, index: int):
+        self.scenario = scenario
+        self.api = api
+        self.index = index
+        self.random = random.Random(None if scenario.seed is None else scenario.seed + index)
+        self.wallet = None
+        self.created = []
+
+
+class Scenario:
+    """ Scenario - a load test described in a json or yaml file
+
+    A number of virtual users are started evenly over the ramp up , each creates a wallet of its own and then does
+    weighted random actions against the wallet api until the steady state is over. Latency and throughput are
+    reported for each action over the steady state only.
+
+    Args:
+        name(str): the name of the scenario
+        users(int): how many virtual users to run
+        actions(list): dicts with the action name , its weight and any options for it , see below
+        ramp_up(float): seconds over which the users are started, default 0
+        duration(float): seconds of steady state after the ramp up, default 60
+        think_time(float): seconds each user waits between actions, default 0
+        api(dict): arguments for the WalletAPI the users share, default {} for a local backend
+        cleanup(bool): True to delete the wallets the run created when it finishes, default True
+        seed(int): seed for the action choices so a run can be repeated, default None
+
+    The actions are:
+        create_wallet: create a new wallet , options password
+        create_address: create an address in the user's wallet , it becomes a destination for transact
+        transact: pay from the user's wallet to a random known address , options amount (default 1) and password
+        list_wallets: fetch a page of the wallet listing , options per_page (default 50)
+
+    Usage:
+
+    A scenario file looks like this , in yaml or the same structure in json::
+
+        name: spending spree
+        users: 20
+        ramp_up: 10
+        duration: 60
+        api:
+          host: 127.0.0.1
+          port: 8090
+          ssh_tunnel: false
+        actions:
+          - action: transact
+            weight: 5
+            amount: 1000
+          - action: create_address
+            weight: 2
+          - action: list_wallets
+            weight: 1
+
+    and runs with::
+
+        report = Scenario.from_file('spree.yaml').run()
+        print(report.dump())
+
+    or from the command line with python -m Theseus.Load spree.yaml --output report.json
+
+    Notes:
+        Transactions need funded wallets , against a Theseus.Mock.MockWalletBackend give it an initial_balance.
+        The shared WalletAPI has a connection pool as big as the number of users unless api says otherwise.
+
+    """
+    def __init__(self, name: str, users: int, actions: list, ramp_up: float=0.0, duration: float=60.0,
+                 think_time: float=0.0, api: dict=None, cleanup: bool=True, seed: int=None):
+        self.name = name
+        self.users = int(users)
+        self.ramp_up = float(ramp_up)
+        self.duration = float(duration)
+        self.think_time = float(think_time)
+        self.api_args = dict(api or {})
+        self.cleanup = cleanup
+        self.seed = seed
+
+        self.actions = []
+        for entry in actions:
+            options = dict(entry)
+            action = options.pop('action', None)
+            if action not in ACTIONS:
+                raise ValueError('Unknown action {0} , the actions are {1}'.format(action, ', '.join(ACTIONS)))
+            weight = float(options.pop('weight', 1))
+            if weight < 0:
+                raise ValueError('The weight of {0} can not be negative'.format(action))
+            self.actions.append((action, weight, options))
+        if self.users < 1 or not any(weight for action, weight, options in self.actions):
+            raise ValueError('A scenario needs at least one user and one action with a weight')
+
+        self.logger = get_logger('scenario')
+        self._lock = threading.Lock()
+        self._addresses = []
+
+    @classmethod
+    def from_dict(cls, settings: dict):
+        """ Make a scenario from the parsed contents of a scenario file """
+        return cls(**settings)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """ Load a scenario from a json or yaml file
+
+        Args:
+            path(str): the file , files ending .yaml or .yml are read as yaml and the rest as json
+
+        Returns:
+            Scenario: the scenario
+
+        Notes:
+            Reading yaml needs PyYAML installed.
+
+        """
+        with open(path) as handle:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError('PyYAML is needed to read yaml scenarios , install it or use json')
+                settings = yaml.safe_load(handle)
+            else:
+                settings = json.load(handle)
+        settings.setdefault('name', path)
+        return cls.from_dict(settings)
+
+    def add_addresses(self, addresses):
+        """ Make more addresses available to transact to """
+        with self._lock:
+            self._addresses.extend(addresses)
+
+    def random_address(self, chooser: random.Random) -> str:
+        with self._lock:
+            return chooser.choice(self._addresses)
+
+    def _make_api(self) -> WalletAPI:
+        settings = dict(self.api_args)
+        settings.setdefault('automatic', False)
+        settings.setdefault('pool_maxsize', self.users)
+        return WalletAPI(**settings)
+
+    def _setup(self, user: _VirtualUser) -> bool:
+        user.wallet = user.api.create_wallet('{0} {1}'.format(self.name, user.index), generate_mnemonic())
+        if user.wallet.type == 'error':
+            self.logger.error('Virtual user {0} could not create its wallet: {1}'.format(user.index,
+                                                                                         user.wallet.name))
+            return False
+        user.created.append(user.wallet)
+        # load the account and its address now so it isn't part of the first action's latency
+        self.add_addresses(address['id'] for address in user.wallet.account[0].addresses)
+        return True
+
+    def _run_user(self, user: _VirtualUser, start_at: float, stop_at: float, recorder: Recorder):
+        time.sleep(max(0.0, start_at - time.monotonic()))
+        if not self._setup(user):
+            return
+
+        names = [action for action, weight, options in self.actions]
+        weights = [weight for action, weight, options in self.actions]
+        options = {action: settings for action, weight, settings in self.actions}
+
+        while time.monotonic() < stop_at:
+            action = user.random.choices(names, weights)[0]
+            start = time.monotonic()
+            try:
+                error = None if ACTIONS[action](user, **options[action]) else 'failed'
+            except Exception as e:
+                error = type(e).__name__
+                self.logger.debug('{0} by virtual user {1} raised {2!r}'.format(action, user.index, e))
+            finished = time.monotonic()
+            recorder.record(action, finished, finished - start, error)
+            if self.think_time:
+                time.sleep(self.think_time)
+
+    def run(self, api=None) -> LoadReport:
+        """ Run: run the scenario and report on it
+
+        Args:
+            api(WalletAPI): the api for the users to share , default None to make one from the scenario's api settings
+
+        Returns:
+            LoadReport: latency and throughput for each action over the steady state , the counters say how many
+                        users started and how many failed to set up
+
+        """
+        api = api if api is not None else self._make_api()
+        recorder = Recorder()
+        with self._lock:
+            self._addresses = []
+        users = [_VirtualUser(self, api, index) for index in range(self.users)]
+
+        begin = time.monotonic()
+        steady = begin + self.ramp_up
+        stop_at = steady + self.duration
+        self.logger.info('Running scenario {0}: {1} users , {2}s ramp up , {3}s steady state'.format(
+            self.name, self.users, self.ramp_up, self.duration))
+
+        threads = []
+        for user in users:
+            start_at = begin + self.ramp_up * user.index / self.users
+            thread = threading.Thread(target=self._run_user, args=(user, start_at, stop_at, recorder),
+                                      name='theseus-user-{0}'.format(user.index), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        end = min(time.monotonic(), stop_at)
+
+        failed = len([user for user in users if user.wallet is None or user.wallet.type == 'error'])
+        report = recorder.report(self.name, steady, end, counters=dict(users=self.users, failed_users=failed))
+        self.logger.info(report.dump())
+
+        if self.cleanup:
+            for user in users:
+                for wallet in user.created:
+                    api.delete_wallet(wallet)
+        return report
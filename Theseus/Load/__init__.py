@@ -0,0 +1,7 @@
+from .Report import Recorder, ActionReport, LoadReport
+from .Scenario import Scenario, ACTIONS
+from .OpenLoop import OpenLoop
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Load - load generators for wallet backends'
+__all__ = ['Recorder', 'ActionReport', 'LoadReport', 'Scenario', 'ACTIONS', 'OpenLoop']
@@ -0,0 +1,35 @@
+import argparse
+import sys
+
+from Theseus.Load import Scenario
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Load - run a load scenario from the command line'
+
+
+def main(argv=None) -> int:
+    """ Run a scenario file , print the report and optionally write it out as json
+
+    Usage::
+
+        python -m Theseus.Load spree.yaml --output report.json
+
+    Returns:
+        int: 1 if any action failed , otherwise 0
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m Theseus.Load', description=__doc__)
+    parser.add_argument('scenario', help='the json or yaml scenario file')
+    parser.add_argument('--output', help='where to write the json report')
+    args = parser.parse_args(argv)
+
+    report = Scenario.from_file(args.scenario).run()
+    print(report.dump())
+    if args.output:
+        report.write(args.output)
+        print('Report written to {0}'.format(args.output))
+    return 0 if report else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
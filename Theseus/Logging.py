@@ -1,8 +1,11 @@
+import itertools
+import json
 import logging
 
 __author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
 __doc__ = 'Theseus - Logging Functions'
-__all__ = ['log_to_console', 'log_to_file', 'get_logger']
+__all__ = ['log_to_console', 'log_to_file', 'get_logger', 'PayloadLogger', 'get_payload_logger',
+           'set_payload_logging']
 
 logger = logging.getLogger('theseus')
 
@@ -113,3 +116,130 @@ def log_to_file(filename, level=None, formatter=None):
         logger.addHandler(filehandler)
 
     return logger
+
+
+class _Serialised:
+    """ Turns a payload into pretty printed json only when the log record is actually formatted """
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        if isinstance(self.payload, (str, bytes)):
+            return self.payload if isinstance(self.payload, str) else self.payload.decode('utf-8', 'replace')
+        return json.dumps(self.payload, default=lambda o: o.__dict__, sort_keys=True, indent=4)
+
+
+class PayloadLogger:
+    """ Payload Logger - decides how much of the api payloads make it into the logs
+
+    Serialising big payloads for the logs costs more than the requests themselves at high request rates , so the api
+    objects hand their payloads to one of these rather than logging them directly.
+
+    Modes:
+        off: payloads are not logged
+        summary: one INFO line with the number of items and size of each payload
+        sampled: the whole payload at INFO for 1 in sample_every payloads
+        full: the whole payload at DEBUG for every payload
+
+    Args:
+        mode(str): one of off , summary , sampled or full, default summary
+        sample_every(int): log 1 in this many payloads in sampled mode, default 100
+
+    Notes:
+        Payloads are only serialised when the record is going to be emitted , so full mode costs nothing unless DEBUG
+        logging is turned on.
+
+    """
+    OFF = 'off'
+    SUMMARY = 'summary'
+    SAMPLED = 'sampled'
+    FULL = 'full'
+
+    def __init__(self, mode: str='summary', sample_every: int=100):
+        # next() on a count is atomic so threads can share it without a lock
+        self._seen = itertools.count()
+        self.configure(mode, sample_every)
+
+    def configure(self, mode: str, sample_every: int=100):
+        """ Change the mode , everything using this PayloadLogger picks up the change straight away
+
+        Args:
+            mode(str): one of off , summary , sampled or full
+            sample_every(int): log 1 in this many payloads in sampled mode, default 100
+
+        """
+        if mode not in (self.OFF, self.SUMMARY, self.SAMPLED, self.FULL):
+            raise ValueError('Unknown payload logging mode: {0}'.format(mode))
+
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+
+    @staticmethod
+    def _count(payload):
+        if isinstance(payload, dict) and isinstance(payload.get('data'), list):
+            return len(payload['data'])
+        if isinstance(payload, (list, tuple)):
+            return len(payload)
+        return 1
+
+    def log(self, handle: logging.Logger, label: str, payload, size: int=None):
+        """ Log a payload according to the mode
+
+        Args:
+            handle(Logger): the logger to log to
+            label(str): what the payload is , e.g. 'Node info'
+            payload: the payload , a dict or list to be written as json or the raw str or bytes
+            size(int): the size in bytes of the payload on the wire if it is known
+
+        """
+        if self.mode == self.OFF:
+            return
+
+        if self.mode == self.SUMMARY:
+            if handle.isEnabledFor(logging.INFO):
+                if size is None and isinstance(payload, (str, bytes)):
+                    size = len(payload)
+                handle.info('%s: %d items , %s bytes', label, self._count(payload), '?' if size is None else size)
+            return
+
+        if self.mode == self.SAMPLED:
+            if next(self._seen) % self.sample_every == 0 and handle.isEnabledFor(logging.INFO):
+                handle.info('%s (sampled 1 in %d): %s', label, self.sample_every, _Serialised(payload))
+            return
+
+        if handle.isEnabledFor(logging.DEBUG):
+            handle.debug('%s: %s', label, _Serialised(payload))
+
+
+_payload_logger = PayloadLogger()
+
+
+def get_payload_logger():
+    """ Get the shared PayloadLogger used by the api objects that weren't given one of their own
+
+    Returns:
+        (PayloadLogger) : the shared payload logger
+    """
+    return _payload_logger
+
+
+def set_payload_logging(mode, sample_every=100):
+    """ Set how payloads are logged by the api objects using the shared PayloadLogger
+
+    Supported modes are off, summary, sampled and full , see PayloadLogger for what they do.
+
+    Example:
+        set_payload_logging('full') and log_to_console('DEBUG') shows every payload
+        set_payload_logging('sampled', 1000) shows one payload in a thousand at INFO
+
+    Args:
+        mode (str) : the payload logging mode
+        sample_every (int) : log 1 in this many payloads in sampled mode
+
+    Returns:
+        (PayloadLogger) : the shared payload logger
+    """
+    _payload_logger.configure(mode, sample_every)
+    return _payload_logger
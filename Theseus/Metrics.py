@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Theseus - Request metrics'
+__all__ = ['Metrics']
+
+
+class _Endpoint:
+    """ The counters and latency sample for one endpoint """
+    def __init__(self, reservoir_size: int):
+        self.reservoir_size = reservoir_size
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = []
+        self.statuses = Counter()
+        self.error_classes = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def add(self, latency: float, status, sent: int, received: int, error: str):
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+        # reservoir sampling keeps a fair sample of every latency seen in a fixed amount of memory
+        if len(self.sample) < self.reservoir_size:
+            self.sample.append(latency)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.sample[slot] = latency
+
+        if status is not None:
+            self.statuses[str(status)] += 1
+        if error:
+            self.errors += 1
+            self.error_classes[error] += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+
+class Metrics:
+    """ Metrics - latency , status and size figures for each api endpoint
+
+    Every request is recorded against its endpoint , the api objects use their method names such as 'transact' or
+    'get_accounts'. Latencies are kept in a bounded random sample for each endpoint so the percentiles stay accurate
+    without memory growing over a long run.
+
+    Args:
+        reservoir_size(int): how many latencies to keep for each endpoint, default 1024
+
+    Usage:
+
+    Read the figures with snapshot , or write them out for dashboards::
+
+        api = WalletAPI(host='remotehost')
+        ...
+        api.metrics.write_prometheus('/var/lib/node_exporter/theseus.prom')
+        api.metrics.write_json('metrics.json')
+
+    Notes:
+        This is thread safe and one Metrics can be shared by several api objects.
+
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, reservoir_size: int=1024):
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Forget everything recorded so far and restart the clock for the rates """
+        with self._lock:
+            self._endpoints = {}
+            self._started = time.time()
+
+    def record(self, endpoint: str, latency: float, status=None, sent: int=0, received: int=0, error: str=None):
+        """ Record one request
+
+        Args:
+            endpoint(str): the name of the endpoint
+            latency(float): seconds the request took
+            status(int): the http status code , None if there was no answer
+            sent(int): bytes in the request body
+            received(int): bytes in the response body
+            error(str): the class of error if the request failed without an answer , e.g. 'ConnectTimeout'
+
+        """
+        with self._lock:
+            counters = self._endpoints.get(endpoint)
+            if counters is None:
+                counters = self._endpoints[endpoint] = _Endpoint(self.reservoir_size)
+            counters.add(latency, status, sent, received, error)
+
+    def snapshot(self) -> dict:
+        """ Get the figures for every endpoint
+
+        Returns:
+            dict: keyed by endpoint , each has the count , rate per second , errors , mean , p50 , p90 , p99 and max
+                  latency in seconds , counts by status code and error class and the bytes sent and received
+
+        """
+        with self._lock:
+            elapsed = max(time.time() - self._started, 1e-9)
+            snapshot = {}
+            for endpoint, counters in self._endpoints.items():
+                ordered = sorted(counters.sample)
+                figures = dict(
+                    count=counters.count,
+                    rate=counters.count / elapsed,
+                    errors=counters.errors,
+                    mean=counters.total / counters.count,
+                    max=counters.max,
+                    statuses=dict(counters.statuses),
+                    error_classes=dict(counters.error_classes),
+                    bytes_sent=counters.bytes_sent,
+                    bytes_received=counters.bytes_received,
+                )
+                for quantile in self.QUANTILES:
+                    figures['p{0:g}'.format(quantile * 100)] = ordered[min(int(quantile * len(ordered)),
+                                                                          len(ordered) - 1)]
+                snapshot[endpoint] = figures
+            return snapshot
+
+    def to_json(self) -> str:
+        """ The snapshot as json with a timestamp """
+        return json.dumps(dict(timestamp=time.time(), endpoints=self.snapshot()), sort_keys=True, indent=4)
+
+    def to_prometheus(self, prefix: str='theseus_api') -> str:
+        """ The snapshot in the prometheus text exposition format
+
+        Args:
+            prefix(str): the start of every metric name, default theseus_api
+
+        Returns:
+            str: the metrics , latency is a summary and the rest are counters and gauges labelled by endpoint
+
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+            lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                label_text = ','.join('{0}="{1}"'.format(label, setting) for label, setting in labels)
+                lines.append('{0}_{1}{2}{{{3}}} {4}'.format(prefix, name, suffix, label_text, value))
+
+        latency = []
+        for endpoint, figures in sorted(snapshot.items()):
+            for quantile in self.QUANTILES:
+                latency.append(('', [('endpoint', endpoint), ('quantile', quantile)],
+                                figures['p{0:g}'.format(quantile * 100)]))
+            latency.append(('_sum', [('endpoint', endpoint)], figures['mean'] * figures['count']))
+            latency.append(('_count', [('endpoint', endpoint)], figures['count']))
+        metric('request_seconds', 'summary', 'Request latency in seconds', latency)
+
+        metric('request_seconds_max', 'gauge', 'Slowest request in seconds',
+               [('', [('endpoint', endpoint)], figures['max']) for endpoint, figures in sorted(snapshot.items())])
+
+        metric('requests_per_second', 'gauge', 'Requests per second since the metrics were reset',
+               [('', [('endpoint', endpoint)], figures['rate']) for endpoint, figures in sorted(snapshot.items())])
+
+        metric('responses_total', 'counter', 'Responses by status code',
+               [('', [('endpoint', endpoint), ('status', status)], count)
+                for endpoint, figures in sorted(snapshot.items())
+                for status, count in sorted(figures['statuses'].items())])
+
+        metric('errors_total', 'counter', 'Requests that got no answer by error class',
+               [('', [('endpoint', endpoint), ('error', error)], count)
+                for endpoint, figures in sorted(snapshot.items())
+                for error, count in sorted(figures['error_classes'].items())])
+
+        metric('sent_bytes_total', 'counter', 'Bytes sent in request bodies',
+               [('', [('endpoint', endpoint)], figures['bytes_sent'])
+                for endpoint, figures in sorted(snapshot.items())])
+
+        metric('received_bytes_total', 'counter', 'Bytes received in response bodies',
+               [('', [('endpoint', endpoint)], figures['bytes_received'])
+                for endpoint, figures in sorted(snapshot.items())])
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _write(path: str, text: str):
+        # write then rename so a collector never reads a half written file
+        temporary = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(temporary, 'w') as handle:
+            handle.write(text)
+        os.replace(temporary, path)
+
+    def write_json(self, path: str):
+        """ Write the json snapshot to a file
+
+        Args:
+            path(str): the file to write
+
+        """
+        self._write(path, self.to_json())
+
+    def write_prometheus(self, path: str, prefix: str='theseus_api'):
+        """ Write the prometheus metrics to a file , e.g. for the node exporter textfile collector
+
+        Args:
+            path(str): the file to write , the textfile collector only reads files ending .prom
+            prefix(str): the start of every metric name, default theseus_api
+
+        """
+        self._write(path, self.to_prometheus(prefix))
@@ -0,0 +1,279 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import paramiko
+
+from Theseus import get_logger
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Mock - SSH server and echo server for testing tunnels'
+__all__ = ['MockSSHServer', 'EchoServer']
+
+
+def _pump(source, destination, counter, lock):
+    """ Copy bytes one way until either end closes """
+    try:
+        while True:
+            data = source.recv(65536)
+            if not data:
+                break
+            # count first so the bytes are counted by the time the other end has them
+            with lock:
+                counter[0] += len(data)
+            destination.sendall(data)
+    except (OSError, EOFError, paramiko.SSHException):
+        pass
+    finally:
+        for end in (source, destination):
+            try:
+                end.close()
+            except (OSError, EOFError):
+                pass
+
+
+class _Interface(paramiko.ServerInterface):
+    """ Lets in one key and allows port forwarding """
+    def __init__(self, client_key):
+        self.client_key = client_key
+        self.destinations = {}
+
+    def get_allowed_auths(self, username):
+        return 'publickey'
+
+    def check_auth_publickey(self, username, key):
+        if key.get_fingerprint() == self.client_key.get_fingerprint():
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'direct-tcpip':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        self.destinations[chanid] = destination
+        return paramiko.OPEN_SUCCEEDED
+
+
+class MockSSHServer:
+    """ Mock SSH Server - a local ssh server that only does port forwarding
+
+    This stands in for the ssh server on a wallet host so SSHTunnel can be tested and benchmarked without one. It
+    accepts a single client key , made when it starts and written to key_filename , and forwards direct-tcpip
+    channels to wherever they ask to go.
+
+    Args:
+        host(str): the address to listen on, default 127.0.0.1
+        port(int): the port to listen on, default 0 to pick a free one
+
+    Usage::
+
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=8091, remoteport=echo.port,
+                               key_filename=ssh.key_filename)
+
+    Notes:
+        Connection , channel and forwarded byte counts are available from stats.
+
+    """
+    def __init__(self, host: str='127.0.0.1', port: int=0):
+        self.host = host
+        self._port = port
+        self.logger = get_logger('mock-ssh')
+
+        self._lock = threading.Lock()
+        self._forwarded = [0]
+        self._counters = dict(connections=0, channels=0)
+        self._transports = []
+
+        self._socket = None
+        self._thread = None
+        self._directory = None
+        self.key_filename = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        """ The port being listened on """
+        return self._socket.getsockname()[1] if self._socket else self._port
+
+    def start(self):
+        """ Make the keys and start accepting connections in a background thread
+
+        Returns:
+            MockSSHServer: this server so it can be chained
+
+        """
+        self._host_key = paramiko.ECDSAKey.generate()
+        self._client_key = paramiko.ECDSAKey.generate()
+
+        self._directory = tempfile.mkdtemp(prefix='theseus-mock-ssh-')
+        self.key_filename = os.path.join(self._directory, 'id_ecdsa')
+        self._client_key.write_private_key_file(self.key_filename)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self._port))
+        self._socket.listen(16)
+
+        self._thread = threading.Thread(target=self._accept, name='theseus-mock-ssh', daemon=True)
+        self._thread.start()
+        self.logger.info('Mock ssh server listening on {0}:{1}'.format(self.host, self.port))
+        return self
+
+    def stop(self):
+        """ Stop accepting , drop every connection and remove the keys """
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+        self.drop_connections()
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def drop_connections(self):
+        """ Close every ssh connection as if the network had failed , the server keeps listening """
+        with self._lock:
+            transports, self._transports = self._transports, []
+        for transport in transports:
+            transport.close()
+
+    def stats(self) -> dict:
+        """ Get the server counters
+
+        Returns:
+            dict: connection and channel counts with the total bytes forwarded in both directions
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['forwarded_bytes'] = self._forwarded[0]
+            stats['open_connections'] = len([t for t in self._transports if t.is_active()])
+        return stats
+
+    def _accept(self):
+        listener = self._socket
+        # a timeout lets the loop notice the listener being closed by stop
+        listener.settimeout(0.5)
+        while self._socket is listener:
+            try:
+                client, address = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        interface = _Interface(self._client_key)
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self._host_key)
+        try:
+            transport.start_server(server=interface)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            self.logger.debug('ssh negotiation failed: {0}'.format(e))
+            return
+
+        with self._lock:
+            self._counters['connections'] += 1
+            self._transports.append(transport)
+
+        while transport.is_active():
+            channel = transport.accept(timeout=1)
+            if channel is None:
+                continue
+
+            destination = interface.destinations.pop(channel.get_id(), None)
+            try:
+                target = socket.create_connection(destination, timeout=10)
+                target.settimeout(None)
+                target.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (OSError, TypeError) as e:
+                self.logger.debug('Could not forward to {0}: {1}'.format(destination, e))
+                channel.close()
+                continue
+
+            with self._lock:
+                self._counters['channels'] += 1
+            for source, sink in ((channel, target), (target, channel)):
+                threading.Thread(target=_pump, args=(source, sink, self._forwarded, self._lock), daemon=True).start()
+
+        with self._lock:
+            if transport in self._transports:
+                self._transports.remove(transport)
+
+
+class EchoServer:
+    """ Echo Server - a tcp server that sends back everything it is sent , a target for tunnel tests
+
+    Args:
+        host(str): the address to listen on, default 127.0.0.1
+        port(int): the port to listen on, default 0 to pick a free one
+
+    """
+    def __init__(self, host: str='127.0.0.1', port: int=0):
+        self.host = host
+        self._port = port
+        self._socket = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1] if self._socket else self._port
+
+    def start(self):
+        """ Start echoing in a background thread """
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self._port))
+        self._socket.listen(16)
+        threading.Thread(target=self._accept, name='theseus-echo', daemon=True).start()
+        return self
+
+    def stop(self):
+        """ Stop accepting connections """
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def _accept(self):
+        listener = self._socket
+        # a timeout lets the loop notice the listener being closed by stop
+        listener.settimeout(0.5)
+        while self._socket is listener:
+            try:
+                client, address = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            # stand ins should never be the slow part , send small writes straight away
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._echo, args=(client,), daemon=True).start()
+
+    @staticmethod
+    def _echo(client):
+        try:
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    break
+                client.sendall(data)
+        except OSError:
+            pass
+        finally:
+            client.close()
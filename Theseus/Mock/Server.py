@@ -0,0 +1,361 @@
+import datetime
+import ipaddress
+import json
+import os
+import random
+import shutil
+import socket
+import ssl
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from Theseus import get_logger
+from Theseus.Mock.State import MockState, MockError
+from Theseus.Protocols.RateLimit import TokenBucket
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Mock - HTTPS wallet backend server'
+__all__ = ['MockWalletBackend', 'make_certificate']
+
+
+def make_certificate(directory: str, host: str='127.0.0.1'):
+    """ Make Certificate: write a self signed certificate and key for the mock server
+
+    Args:
+        directory(str): where to write the files
+        host(str): the address the certificate is for , localhost is always included
+
+    Returns:
+        tuple: the paths of the certificate and key files
+
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'theseus-mock')])
+
+    names = [x509.DNSName('localhost')]
+    try:
+        names.append(x509.IPAddress(ipaddress.ip_address(host)))
+    except ValueError:
+        names.append(x509.DNSName(host))
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder()
+                   .subject_name(name)
+                   .issuer_name(name)
+                   .public_key(key.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(now - datetime.timedelta(minutes=5))
+                   .not_valid_after(now + datetime.timedelta(days=7))
+                   .add_extension(x509.SubjectAlternativeName(names), critical=False)
+                   .sign(key, hashes.SHA256()))
+
+    certificate_file = os.path.join(directory, 'mock.crt')
+    key_file = os.path.join(directory, 'mock.key')
+    with open(certificate_file, 'wb') as handle:
+        handle.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, 'wb') as handle:
+        handle.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.NoEncryption()))
+    return certificate_file, key_file
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ Hands every request to the MockWalletBackend that owns the server """
+    protocol_version = 'HTTP/1.1'
+    # drop idle keep-alive connections eventually so their threads finish
+    timeout = 60
+
+    def setup(self):
+        super().setup()
+        # headers and body go out in separate writes , without this nagle holds the body for a delayed ack
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # the listening socket doesn't do the tls handshake so a slow client can't hold up accepting others
+        self.request.do_handshake()
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        status, payload = self.server.backend.handle(self.command, self.path, body)
+
+        content = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if content:
+            self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _answer
+    do_POST = _answer
+    do_PUT = _answer
+    do_DELETE = _answer
+
+    def log_message(self, format, *args):
+        self.server.backend.logger.debug(format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients going away mid request are normal under load , don't print tracebacks for them
+        self.backend.logger.debug('Connection from {0} failed'.format(client_address), exc_info=True)
+
+
+class MockWalletBackend:
+    """ Mock Wallet Backend - a local HTTPS server that stands in for a cardano wallet backend
+
+    This implements the parts of the v1 wallet api Theseus uses , wallets , accounts , addresses , transactions and
+    node-info , with the state kept in memory by a Theseus.Mock.State.MockState. It serves https with a self signed
+    certificate made when it starts so WalletAPI and AsyncWalletAPI talk to it exactly as they would to a real node.
+
+    The backend can be made to behave like a loaded one so client side performance work can be measured on any
+    machine without a node.
+
+    Args:
+        host(str): the address to listen on, default 127.0.0.1
+        port(int): the port to listen on, default 0 to pick a free one
+        latency(float): seconds to take over every request, default 0
+        jitter(float): up to this many seconds are randomly added to or taken off the latency, default 0
+        error_rate(float): the fraction of requests that get an error response, default 0
+        error_status(int): the status code of the injected errors, default 500
+        throughput(float): the most requests to serve per second , others wait their turn, default None for no limit
+        max_in_flight(int): the most requests to work on at once , others are refused with a 503, default None
+        initial_balance(int): lovelace to give every new wallet, default 0
+        restore_time(float): seconds a restored wallet takes to sync, default 0
+        confirmation_interval(float): seconds between confirmations of a transaction, default 1
+        fee(int): lovelace charged for each transaction, default 0
+        seed(int): seed for the random parts so a run can be repeated, default None
+        version(int): the api version to serve, default 1
+
+    Usage:
+
+    Use it as a context manager and point an api at it with api_args::
+
+        with MockWalletBackend(latency=0.02, jitter=0.01, initial_balance=1000000) as backend:
+            api = WalletAPI(**backend.api_args())
+            wallet = api.create_wallet(generate_walletname(), generate_mnemonic())
+
+    Notes:
+        Request , injected error and refusal counts are available from stats.
+
+    """
+    def __init__(self, host: str='127.0.0.1', port: int=0, latency: float=0.0, jitter: float=0.0,
+                 error_rate: float=0.0, error_status: int=500, throughput: float=None, max_in_flight: int=None,
+                 initial_balance: int=0, restore_time: float=0.0, confirmation_interval: float=1.0, fee: int=0,
+                 seed: int=None, version: int=1):
+        self._host = host
+        self._port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_in_flight = max_in_flight
+        self.version = version
+
+        self.state = MockState(initial_balance=initial_balance, restore_time=restore_time,
+                               confirmation_interval=confirmation_interval, fee=fee, seed=seed)
+        self.logger = get_logger('mock')
+
+        self._random = random.Random(seed)
+        self._bucket = TokenBucket(throughput) if throughput else None
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = dict(requests=0, injected_errors=0, refused=0, api_errors=0)
+
+        self._server = None
+        self._thread = None
+        self._directory = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def port(self) -> int:
+        """ The port being listened on , only known once started if port 0 was asked for """
+        return self._server.server_address[1] if self._server else self._port
+
+    @property
+    def url(self) -> str:
+        return 'https://{0}:{1}/api/v{2}/'.format(self.host, self.port, self.version)
+
+    def api_args(self) -> dict:
+        """ The arguments to give WalletAPI or AsyncWalletAPI to use this backend """
+        return dict(host=self.host, port=self.port, ssh_tunnel=False, version=self.version)
+
+    def start(self):
+        """ Start serving in a background thread
+
+        Returns:
+            MockWalletBackend: this backend so it can be chained
+
+        """
+        self._directory = tempfile.mkdtemp(prefix='theseus-mock-')
+        certificate_file, key_file = make_certificate(self._directory, self._host)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certificate_file, key_file)
+
+        self._server = _Server((self._host, self._port), _Handler)
+        self._server.backend = self
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True,
+                                                  do_handshake_on_connect=False)
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='theseus-mock', daemon=True)
+        self._thread.start()
+        self.logger.info('Mock wallet backend listening on {0}'.format(self.url))
+        return self
+
+    def stop(self):
+        """ Stop serving and remove the certificate """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def stats(self) -> dict:
+        """ Get the backend counters
+
+        Returns:
+            dict: request , injected error , refused and api error counts with the current in flight count and the
+                  size of the state
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = self._in_flight
+        stats.update(self.state.stats())
+        return stats
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def handle(self, method: str, path: str, body: bytes):
+        """ Work out the answer to a request , this runs in the request's own thread
+
+        Args:
+            method(str): the http method
+            path(str): the path with the query string
+            body(bytes): the request body
+
+        Returns:
+            tuple: the status code and the payload to send as json , None for no body
+
+        """
+        with self._lock:
+            self._counters['requests'] += 1
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                self._counters['refused'] += 1
+                return 503, dict(status='error', diagnostic={}, message='ServerBusy')
+            self._in_flight += 1
+
+        try:
+            if self._bucket:
+                self._bucket.acquire()
+
+            delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+            if delay > 0:
+                time.sleep(delay)
+
+            if self.error_rate and self._random.random() < self.error_rate:
+                self._count('injected_errors')
+                return self.error_status, dict(status='error', diagnostic={}, message='InjectedError')
+
+            try:
+                parsed = json.loads(body.decode('utf-8')) if body else {}
+                return self._route(method, path, parsed)
+            except MockError as e:
+                self._count('api_errors')
+                return e.status, dict(status='error', diagnostic={}, message=e.message)
+            except ValueError:
+                self._count('api_errors')
+                return 400, dict(status='error', diagnostic={}, message='InvalidJson')
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    @staticmethod
+    def _query(text: str) -> dict:
+        # the wallet api separates parameters with ; as well as &
+        query = {}
+        for pair in text.replace(';', '&').split('&'):
+            if pair:
+                key, _, value = pair.partition('=')
+                query[unquote(key)] = unquote(value)
+        return query
+
+    @staticmethod
+    def _page(items: list, query: dict) -> tuple:
+        """ One page of a listing with the pagination block the client uses to walk the pages """
+        page = max(1, int(query.get('page', 1)))
+        per_page = max(1, int(query.get('per_page', 10)))
+        total_pages = max(1, -(-len(items) // per_page))
+        meta = dict(pagination=dict(totalPages=total_pages, page=page, perPage=per_page, totalEntries=len(items)))
+        return 200, dict(status='success', data=items[(page - 1) * per_page:page * per_page], meta=meta)
+
+    def _route(self, method: str, path: str, body: dict) -> tuple:
+        parts = urlsplit(path)
+        query = self._query(parts.query)
+        resource = [unquote(part) for part in parts.path.strip('/').split('/')]
+
+        if resource[:2] != ['api', 'v{0}'.format(self.version)]:
+            raise MockError(404, 'NotFound')
+        resource = resource[2:]
+
+        def success(data):
+            return 200, dict(status='success', data=data, meta={})
+
+        if resource == ['node-info'] and method == 'GET':
+            return success(self.state.node_info())
+
+        if resource == ['wallets']:
+            if method == 'GET':
+                return self._page(self.state.list_wallets(query.get('id', ''), query.get('balance', ''),
+                                                          query.get('sort_by', '')), query)
+            if method == 'POST':
+                return success(self.state.create_wallet(body))
+
+        if len(resource) == 2 and resource[0] == 'wallets':
+            if method == 'GET':
+                return success(self.state.get_wallet(resource[1]))
+            if method == 'PUT':
+                return success(self.state.update_wallet(resource[1], body))
+            if method == 'DELETE':
+                self.state.delete_wallet(resource[1])
+                return 204, None
+
+        if len(resource) == 3 and resource[0] == 'wallets' and resource[2] == 'accounts' and method == 'GET':
+            return success(self.state.list_accounts(resource[1]))
+
+        if resource == ['addresses'] and method == 'POST':
+            return success(self.state.create_address(body))
+
+        if resource == ['transactions']:
+            if method == 'GET':
+                return self._page(self.state.list_transactions(query.get('wallet_id', ''), query.get('id', '')),
+                                  query)
+            if method == 'POST':
+                return success(self.state.transact(body))
+
+        raise MockError(404, 'NotFound')
@@ -0,0 +1,284 @@
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Mock - In memory wallet backend state'
+__all__ = ['MockState', 'MockError']
+
+# the index cardano gives the first account of a wallet
+FIRST_ACCOUNT = 2147483648
+
+
+class MockError(Exception):
+    """ An api error to send back , the message becomes the error body
+
+    Args:
+        status(int): the http status code
+        message(str): the error name , as the real backend uses e.g. 'WalletNotFound'
+
+    """
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+def _matches(value, specification: str) -> bool:
+    """ Check a value against a v1 api filter like IN[a,b] , GT[5] or a plain value """
+    operator, _, operand = specification.partition('[')
+    if not operand:
+        return str(value) == specification
+
+    operand = operand.rstrip(']')
+    if operator == 'IN':
+        return str(value) in operand.split(',')
+    if operator == 'EQ':
+        return str(value) == operand
+
+    compare = dict(LT=lambda a, b: a < b, LTE=lambda a, b: a <= b, GT=lambda a, b: a > b, GTE=lambda a, b: a >= b)
+    if operator in compare:
+        return compare[operator](float(value), float(operand))
+
+    raise MockError(400, 'InvalidFilter')
+
+
+class MockState:
+    """ Mock State - the wallets , accounts , addresses and transactions of a mock backend
+
+    Wallet ids are worked out from the backup phrase like the real backend so creating the same wallet twice fails
+    and a restore finds it again. Restores take restore_time seconds to sync and transactions gain a confirmation
+    every confirmation_interval seconds.
+
+    Args:
+        initial_balance(int): lovelace put in the first account of every new wallet, default 0
+        restore_time(float): seconds a restore takes to sync, default 0
+        confirmation_interval(float): seconds between confirmations of a transaction, default 1
+        fee(int): lovelace charged for each transaction, default 0
+        seed(int): seed for the random addresses and transaction ids so runs can be repeated, default None
+
+    Notes:
+        All of the methods are thread safe , they return plain dicts ready to be sent as json.
+
+    """
+    def __init__(self, initial_balance: int=0, restore_time: float=0.0, confirmation_interval: float=1.0,
+                 fee: int=0, seed: int=None):
+        self.initial_balance = initial_balance
+        self.restore_time = restore_time
+        self.confirmation_interval = confirmation_interval
+        self.fee = fee
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+        # wallet id -> wallet record , the record holds its accounts and when its restore finishes
+        self._wallets = {}
+        # address -> (wallet id , account index)
+        self._addresses = {}
+        # transaction id -> (wallet id , transaction data , submit time)
+        self._transactions = {}
+
+    def _token(self, prefix: str) -> str:
+        return prefix + ''.join(self._random.choice('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz')
+                                for i in range(40))
+
+    def _wallet(self, wallet_id: str) -> dict:
+        record = self._wallets.get(wallet_id)
+        if record is None:
+            raise MockError(404, 'WalletNotFound')
+        return record
+
+    def _wallet_data(self, record: dict) -> dict:
+        remaining = record['synced_at'] - time.monotonic()
+        if remaining > 0 and self.restore_time:
+            done = 100 * (1 - remaining / self.restore_time)
+            sync_state = dict(tag='restoring', data=dict(
+                percentage=dict(quantity=int(done), unit='percent'),
+                estimatedCompletionTime=dict(quantity=int(remaining * 1000), unit='milliseconds'),
+                throughput=dict(quantity=100, unit='blocksPerSecond')))
+        else:
+            sync_state = dict(tag='synced', data=None)
+
+        data = dict(record['wallet'])
+        data['balance'] = sum(account['amount'] for account in record['accounts'].values())
+        data['syncState'] = sync_state
+        return data
+
+    def _account_data(self, account: dict) -> dict:
+        data = dict(account)
+        data['addresses'] = [dict(address) for address in account['addresses']]
+        return data
+
+    def _new_address(self, wallet_id: str, account: dict) -> dict:
+        address = dict(id=self._token('DdzFF'), used=False, changeAddress=False)
+        account['addresses'].append(address)
+        self._addresses[address['id']] = (wallet_id, account['index'])
+        return address
+
+    def create_wallet(self, body: dict) -> dict:
+        """ Create or restore a wallet from a POST to wallets """
+        try:
+            phrase = ' '.join(body['backupPhrase'])
+            name = body['name']
+            operation = body.get('operation', 'create')
+        except (KeyError, TypeError):
+            raise MockError(400, 'InvalidBody')
+
+        wallet_id = hashlib.blake2b(phrase.encode('utf-8'), digest_size=20).hexdigest()
+        with self._lock:
+            if wallet_id in self._wallets:
+                raise MockError(403, 'WalletAlreadyExists')
+
+            record = dict(
+                wallet=dict(
+                    id=wallet_id,
+                    name=name,
+                    assuranceLevel=body.get('assuranceLevel', 'normal'),
+                    hasSpendingPassword=bool(body.get('spendingPassword')),
+                    spendingPasswordLastUpdate=_now(),
+                    createdAt=_now(),
+                ),
+                accounts={},
+                synced_at=time.monotonic() + (self.restore_time if operation == 'restore' else 0),
+            )
+            account = dict(walletId=wallet_id, index=FIRST_ACCOUNT, amount=self.initial_balance,
+                           name='Initial account', addresses=[])
+            record['accounts'][FIRST_ACCOUNT] = account
+            self._new_address(wallet_id, account)
+            self._wallets[wallet_id] = record
+            return self._wallet_data(record)
+
+    def get_wallet(self, wallet_id: str) -> dict:
+        """ One wallet """
+        with self._lock:
+            return self._wallet_data(self._wallet(wallet_id))
+
+    def update_wallet(self, wallet_id: str, body: dict) -> dict:
+        """ Change the name or assurance level of a wallet """
+        with self._lock:
+            record = self._wallet(wallet_id)
+            for field in ('name', 'assuranceLevel'):
+                if field in body:
+                    record['wallet'][field] = body[field]
+            return self._wallet_data(record)
+
+    def delete_wallet(self, wallet_id: str):
+        """ Remove a wallet and its addresses """
+        with self._lock:
+            record = self._wallets.pop(wallet_id, None)
+            if record is None:
+                raise MockError(404, 'WalletNotFound')
+            for account in record['accounts'].values():
+                for address in account['addresses']:
+                    self._addresses.pop(address['id'], None)
+
+    def list_wallets(self, id_filter: str='', balance_filter: str='', sort_by: str='') -> list:
+        """ The wallets matching the filters in the order asked for """
+        with self._lock:
+            wallets = [self._wallet_data(record) for record in self._wallets.values()]
+
+        if id_filter:
+            wallets = [wallet for wallet in wallets if _matches(wallet['id'], id_filter)]
+        if balance_filter:
+            wallets = [wallet for wallet in wallets if _matches(wallet['balance'], balance_filter)]
+        if sort_by:
+            direction, _, field = sort_by.partition('[')
+            field = field.rstrip(']') or direction
+            wallets.sort(key=lambda wallet: wallet.get(field, ''), reverse=direction == 'DES')
+        return wallets
+
+    def list_accounts(self, wallet_id: str) -> list:
+        """ The accounts of a wallet """
+        with self._lock:
+            return [self._account_data(account) for account in self._wallet(wallet_id)['accounts'].values()]
+
+    def create_address(self, body: dict) -> dict:
+        """ A new address in an account """
+        with self._lock:
+            record = self._wallet(body.get('walletId'))
+            account = record['accounts'].get(body.get('accountIndex'))
+            if account is None:
+                raise MockError(404, 'AccountNotFound')
+            return dict(self._new_address(record['wallet']['id'], account))
+
+    def _transaction_data(self, transaction: dict, submitted: float) -> dict:
+        data = dict(transaction)
+        data['confirmations'] = int((time.monotonic() - submitted) / self.confirmation_interval) \
+            if self.confirmation_interval else 0
+        data['status'] = dict(tag='inNewestBlocks' if data['confirmations'] else 'applying', data={})
+        return data
+
+    def transact(self, body: dict) -> dict:
+        """ Move lovelace from a wallet account to the destination addresses """
+        try:
+            wallet_id = body['source']['walletId']
+            account_index = body['source']['accountIndex']
+            destinations = [(int(destination['amount']), destination['address'])
+                            for destination in body['destinations']]
+        except (KeyError, TypeError, ValueError):
+            raise MockError(400, 'InvalidBody')
+
+        with self._lock:
+            record = self._wallet(wallet_id)
+            account = record['accounts'].get(account_index)
+            if account is None:
+                raise MockError(404, 'AccountNotFound')
+
+            amount = sum(value for value, address in destinations)
+            if account['amount'] < amount + self.fee:
+                raise MockError(403, 'NotEnoughMoney')
+
+            account['amount'] -= amount + self.fee
+            for value, address in destinations:
+                owner = self._addresses.get(address)
+                if owner and owner[0] in self._wallets:
+                    self._wallets[owner[0]]['accounts'][owner[1]]['amount'] += value
+
+            source_address = account['addresses'][0]['id'] if account['addresses'] else ''
+            transaction = dict(
+                id=self._token(''),
+                creationTime=_now(),
+                amount=amount,
+                inputs=[dict(amount=amount + self.fee, address=source_address)],
+                outputs=[dict(amount=value, address=address) for value, address in destinations],
+                direction='outgoing',
+                type='local',
+            )
+            submitted = time.monotonic()
+            self._transactions[transaction['id']] = (wallet_id, transaction, submitted)
+            return self._transaction_data(transaction, submitted)
+
+    def list_transactions(self, wallet_id: str='', id_filter: str='') -> list:
+        """ The transactions of a wallet , oldest first """
+        with self._lock:
+            found = [self._transaction_data(transaction, submitted)
+                     for owner, transaction, submitted in self._transactions.values()
+                     if not wallet_id or owner == wallet_id]
+
+        if id_filter:
+            found = [transaction for transaction in found if _matches(transaction['id'], id_filter)]
+        return found
+
+    def node_info(self) -> dict:
+        """ The node is always synced , its height grows by one block every 20 seconds """
+        height = int((time.monotonic() - self._started) / 20) + 1000
+        return dict(
+            syncProgress=dict(quantity=100, unit='percent'),
+            blockchainHeight=dict(quantity=height, unit='blocks'),
+            localBlockchainHeight=dict(quantity=height, unit='blocks'),
+            localTimeInformation=dict(differenceFromNtpServer=dict(quantity=0, unit='microseconds')),
+            subscriptionStatus={},
+        )
+
+    def stats(self) -> dict:
+        """ How many wallets , addresses and transactions the backend holds """
+        with self._lock:
+            return dict(wallets=len(self._wallets), addresses=len(self._addresses),
+                        transactions=len(self._transactions))
@@ -0,0 +1,7 @@
+from .State import MockState, MockError
+from .Server import MockWalletBackend, make_certificate
+from .SSH import MockSSHServer, EchoServer
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Mock - a local stand in for a cardano wallet backend'
+__all__ = ['MockWalletBackend', 'MockState', 'MockError', 'make_certificate', 'MockSSHServer', 'EchoServer']
@@ -0,0 +1,239 @@
+import datetime
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Cassette - record api traffic and replay it without a backend'
+__all__ = ['Cassette', 'CassetteMissError']
+
+# the response headers worth keeping , the rest only make the cassette bigger
+_KEPT_HEADERS = ('Content-Type',)
+
+
+class CassetteMissError(requests.RequestException):
+    """ Raised when a replayed request has no recording to answer it """
+
+
+def _target(url: str) -> str:
+    """ The path and query of a url , the host is left out so a cassette replays whatever host it is pointed at """
+    parts = urlsplit(url)
+    return parts.path + ('?' + parts.query if parts.query else '')
+
+
+def _fingerprint(body) -> str:
+    """ A short hash of a request body , bodies can hold spending passwords so they are never written out """
+    if not body:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class _RecordingAdapter(BaseAdapter):
+    """ Passes requests on to the real adapter and writes each exchange to the cassette """
+    def __init__(self, cassette, adapter: BaseAdapter):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        # requests only fills in response.elapsed after the adapter returns so time it here
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class _ReplayAdapter(BaseAdapter):
+    """ Answers requests from the cassette """
+    def __init__(self, cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        return self.cassette.replay(request)
+
+    def close(self):
+        pass
+
+
+class Cassette:
+    """ Cassette - a recording of api requests and responses that can stand in for the backend
+
+    In record mode every exchange is written to the cassette file as it happens. In replay mode requests are answered
+    from the file without any network , so a suite recorded once against a real node over ssh can be run again in
+    a fraction of a second to check the parsing and caching logic , or to compare client performance with the
+    backend taken out of the figures.
+
+    Args:
+        path(str): the cassette file , one compact json line per exchange
+        mode(str): record or replay, default replay
+        timing(str): when replaying , none to answer straight away or realistic to take as long as the recorded
+                     request did, default none
+        speed(float): with realistic timing , how many times faster than recorded to answer, default 1
+
+    Usage:
+
+    Give it to an api object , when replaying no ssh tunnel is opened::
+
+        api = WalletAPI(host='remotehost', cassette=Cassette('wallets.cassette', mode='record'))
+        ...
+        api = WalletAPI(cassette=Cassette('wallets.cassette', timing='realistic'))
+
+    Notes:
+        Requests are matched on method and path , the host and port are ignored. A request with the same body as a
+        recorded one gets that one's response , otherwise recordings are handed out in the order they were made , so
+        generated wallet names and mnemonics still replay. When the recordings for a request run out the last one is
+        repeated. Request bodies are only stored as a hash so spending passwords never reach the file , response
+        bodies are stored as they are.
+        Recorded , replayed , repeated and missed counts are available from stats.
+
+    """
+    MODES = ('record', 'replay')
+    TIMINGS = ('none', 'realistic')
+
+    def __init__(self, path: str, mode: str='replay', timing: str='none', speed: float=1.0):
+        if mode not in self.MODES:
+            raise ValueError('Unknown cassette mode {0} , use record or replay'.format(mode))
+        if timing not in self.TIMINGS:
+            raise ValueError('Unknown cassette timing {0} , use none or realistic'.format(timing))
+
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.speed = speed
+
+        self._lock = threading.Lock()
+        self._counters = dict(recorded=0, replayed=0, repeated=0, missed=0)
+        # (method , target) -> the recorded exchanges in order and which of them have been used
+        self._tracks = {}
+
+        if self.replaying:
+            self._load()
+        else:
+            # start a fresh recording
+            open(self.path, 'w').close()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def mount(self, session: requests.Session):
+        """ Mount: put the cassette between a session and the network
+
+        Args:
+            session(requests.Session): the session to record or answer the requests of
+
+        """
+        for prefix in ('https://', 'http://'):
+            if self.replaying:
+                session.mount(prefix, _ReplayAdapter(self))
+            else:
+                session.mount(prefix, _RecordingAdapter(self, session.get_adapter(prefix)))
+
+    def record(self, request, response: requests.Response, elapsed: float):
+        """ Write one exchange to the cassette file
+
+        Args:
+            request(requests.PreparedRequest): the request
+            response(requests.Response): the answer it got
+            elapsed(float): seconds it took
+
+        """
+        exchange = dict(
+            method=request.method,
+            target=_target(request.url),
+            body=_fingerprint(request.body),
+            status=response.status_code,
+            reason=response.reason,
+            headers={header: response.headers[header] for header in _KEPT_HEADERS if header in response.headers},
+            content=response.content.decode(response.encoding or 'utf-8', errors='replace'),
+            elapsed=elapsed,
+        )
+        line = json.dumps(exchange, separators=(',', ':'), sort_keys=True) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as handle:
+                handle.write(line)
+            self._counters['recorded'] += 1
+
+    def _load(self):
+        with open(self.path) as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                exchange = json.loads(line)
+                track = self._tracks.setdefault((exchange['method'], exchange['target']), dict(exchanges=[], used=[]))
+                track['exchanges'].append(exchange)
+                track['used'].append(False)
+
+    def _find(self, method: str, target: str, body: str) -> dict:
+        with self._lock:
+            track = self._tracks.get((method, target))
+            if track is None:
+                self._counters['missed'] += 1
+                return None
+
+            unused = [index for index, used in enumerate(track['used']) if not used]
+            if not unused:
+                self._counters['repeated'] += 1
+                return track['exchanges'][-1]
+
+            # the same body if there is one , otherwise the next in recorded order
+            chosen = next((index for index in unused if track['exchanges'][index]['body'] == body), unused[0])
+            track['used'][chosen] = True
+            self._counters['replayed'] += 1
+            return track['exchanges'][chosen]
+
+    def replay(self, request) -> requests.Response:
+        """ Replay: answer a request from the cassette
+
+        Args:
+            request(requests.PreparedRequest): the request
+
+        Returns:
+            requests.Response: the recorded response
+
+        Raises:
+            CassetteMissError: if nothing like the request was recorded
+
+        """
+        exchange = self._find(request.method, _target(request.url), _fingerprint(request.body))
+        if exchange is None:
+            raise CassetteMissError('No recording of {0} {1} in {2}'.format(request.method, _target(request.url),
+                                                                            self.path), request=request)
+
+        if self.timing == 'realistic' and self.speed > 0:
+            time.sleep(exchange['elapsed'] / self.speed)
+
+        response = requests.Response()
+        response.status_code = exchange['status']
+        response.reason = exchange['reason']
+        response.headers = CaseInsensitiveDict(exchange['headers'])
+        response._content = exchange['content'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=exchange['elapsed'])
+        return response
+
+    def stats(self) -> dict:
+        """ Get the cassette counters
+
+        Returns:
+            dict: recorded , replayed , repeated and missed counts with the mode and timing
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(mode=self.mode, timing=self.timing)
+        return stats
@@ -0,0 +1,161 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'HTTP - pooled keep-alive sessions'
+__all__ = ['PooledSession', 'PoolStats']
+
+
+class PoolStats:
+    """ Pool Stats - counts how often the connection pool could reuse a connection
+
+    A hit is a request that was sent over a connection that was already open , a miss is a request that had to open a
+    new connection (and so pay for the TCP , TLS and ssh channel setup).
+
+    This object is shared between all of the connection pools owned by a session so it is thread safe.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._misses = 0
+
+    def request(self):
+        """ Record that a connection was taken from the pool """
+        with self._lock:
+            self._requests += 1
+
+    def miss(self):
+        """ Record that a new connection had to be opened """
+        with self._lock:
+            self._misses += 1
+
+    @property
+    def hits(self) -> int:
+        with self._lock:
+            return max(self._requests - self._misses, 0)
+
+    @property
+    def misses(self) -> int:
+        with self._lock:
+            return self._misses
+
+    def reset(self):
+        """ Zero all the counters """
+        with self._lock:
+            self._requests = 0
+            self._misses = 0
+
+    def to_dict(self) -> dict:
+        """ Dump the counters to a dict
+
+        Returns:
+            dict: hits , misses , requests and the hit ratio of the pool
+
+        """
+        with self._lock:
+            requests_made = self._requests
+            misses = self._misses
+        hits = max(requests_made - misses, 0)
+        return dict(
+            requests=requests_made,
+            hits=hits,
+            misses=misses,
+            hit_ratio=hits / requests_made if requests_made else 0.0,
+        )
+
+
+def _counting_pool(base, stats: PoolStats):
+    """ Make a subclass of a urllib3 connection pool that reports connection reuse to stats """
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            # this runs for every new socket , including reconnects of a dropped keep-alive connection
+            stats.miss()
+            return super().connect()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+
+        def _get_conn(self, timeout=None):
+            stats.request()
+            return super()._get_conn(timeout=timeout)
+
+    CountingPool.__name__ = 'Counting' + base.__name__
+    return CountingPool
+
+
+class PoolingAdapter(HTTPAdapter):
+    """ A requests transport adapter that uses counting connection pools
+
+    Args:
+        stats(PoolStats): the stats object to report pool usage to
+        kwargs: passed on to requests.adapters.HTTPAdapter
+
+    """
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+
+class PooledSession(requests.Session):
+    """ Pooled Session - a requests session that keeps connections open between requests
+
+    The module level requests.get/post/put/delete calls make a new connection for every request , when going through
+    an SSHTunnel that also means a new ssh channel per request. This session keeps connections alive and hands them
+    out again so the setup cost is only paid once per connection.
+
+    Args:
+        pool_connections(int): how many hosts to keep a connection pool for, default 10
+        pool_maxsize(int): the most connections to keep open to any one host, default 10
+        pool_block(bool): True to make callers wait for a free connection when a host is at pool_maxsize,
+                          False to open an extra throw away connection, default False
+        keep_alive(bool): True to keep connections open between requests, default True
+
+    Notes:
+        pool_maxsize is the per host limit , to get the most out of it set it to the amount of threads that
+        will be using the session at once.
+        The pool hit and miss counts are available from the stats member or pool_stats method.
+
+    """
+    def __init__(self, pool_connections: int=10, pool_maxsize: int=10, pool_block: bool=False,
+                 keep_alive: bool=True):
+        super().__init__()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+
+        self.stats = PoolStats()
+
+        adapter = PoolingAdapter(self.stats, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                 pool_block=pool_block)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+        if not keep_alive:
+            self.headers['Connection'] = 'close'
+
+    def pool_stats(self) -> dict:
+        """ Pool Stats: get the connection pool hit and miss counts
+
+        Returns:
+            dict: the pool counters and the configuration of the pool
+
+        """
+        stats = self.stats.to_dict()
+        stats.update(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            keep_alive=self.keep_alive,
+        )
+        return stats
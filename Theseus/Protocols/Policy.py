@@ -0,0 +1,269 @@
+import json
+import random
+import threading
+import time
+import logging
+import requests
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Policy - timeouts , retries and circuit breaking for api requests'
+__all__ = ['TransportPolicy', 'CircuitBreaker', 'CircuitOpenError']
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """ Raised instead of making a request while the circuit breaker is open """
+    pass
+
+
+class CircuitBreaker:
+    """ Circuit Breaker - stops sending requests to a backend that keeps failing
+
+    After failure_threshold failures in a row the breaker trips open and requests fail straight away without
+    touching the network. Once reset_timeout seconds have passed a single trial request is let through (half open) ,
+    if it works the breaker closes again and if it fails it goes back to open for another reset_timeout.
+
+    Args:
+        failure_threshold(int): failures in a row that trip the breaker, default 5
+        reset_timeout(float): seconds to stay open before letting a trial request through, default 30
+
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int=5, reset_timeout: float=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self.trips = 0
+        self.short_circuits = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """ Allow: check whether a request may be sent
+
+        Returns:
+            bool: True if the request can go ahead , False if it should fail fast
+
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+
+            self.short_circuits += 1
+            return False
+
+    def record_success(self):
+        """ Record that a request worked , this closes the breaker """
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+            self._trial_running = False
+
+    def release(self):
+        """ Release: hand back the trial request after it ended without saying whether the endpoint works """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        """ Record that a request failed , this may trip the breaker """
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and
+                                                 self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+                self.trips += 1
+
+
+class TransportPolicy:
+    """ Transport Policy - the timeouts , retries and circuit breaker applied to every api request
+
+    Each request is made for a named endpoint , for WalletAPI these are the method names such as 'transact' or
+    'get_accounts'. Timeouts can be set for each endpoint. Requests using an idempotent http method are retried
+    after connection errors , timeouts and retry_statuses responses , waiting a random time up to an exponentially
+    growing limit between tries (full jitter) so lots of clients don't all retry at once. Every endpoint has a
+    circuit breaker of its own so a backend that is down fails fast rather than making every caller wait for a
+    timeout , while one slow or broken endpoint doesn't stop the others , e.g. ping keeps working while transact is
+    failing. A request counts as one failure for its breaker once its retries are used up , however many tries it
+    took.
+
+    Args:
+        timeouts(dict): seconds to wait for each endpoint keyed by endpoint name
+        default_timeout(float): seconds to wait for endpoints not in timeouts, default 30
+        retries(int): the most times to retry an idempotent request, default 3
+        backoff(float): the base wait in seconds before the first retry, default 0.1
+        max_backoff(float): the longest to wait before a retry, default 5
+        retry_statuses(tuple): http status codes that are worth retrying, default 502 , 503 and 504
+        idempotent_methods(tuple): http methods that are safe to retry, default GET , PUT , DELETE , HEAD and OPTIONS
+        failure_threshold(int): failed requests in a row that trip the circuit breaker of an endpoint, default 5
+        reset_timeout(float): seconds the circuit breaker of an endpoint stays open, default 30
+
+    Notes:
+        Retry , timeout , error and circuit breaker counters are available from stats.
+
+    """
+    def __init__(self, timeouts: dict=None, default_timeout: float=30.0, retries: int=3, backoff: float=0.1,
+                 max_backoff: float=5.0, retry_statuses: tuple=(502, 503, 504),
+                 idempotent_methods: tuple=('GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'), failure_threshold: int=5,
+                 reset_timeout: float=30.0):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+        self.idempotent_methods = tuple(method.upper() for method in idempotent_methods)
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.logger = logging.getLogger('theseus.policy')
+
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        # endpoint -> CircuitBreaker
+        self._breakers = {}
+
+    def timeout(self, endpoint: str) -> float:
+        """ The timeout for an endpoint """
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """ The circuit breaker for an endpoint , made the first time the endpoint is used """
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(failure_threshold=self.failure_threshold,
+                                                                    reset_timeout=self.reset_timeout)
+            return breaker
+
+    def _count(self, endpoint: str, counter: str):
+        with self._lock:
+            counters = self._endpoints.setdefault(endpoint, dict(requests=0, retries=0, timeouts=0, errors=0,
+                                                                 short_circuits=0))
+            counters[counter] += 1
+
+    def _wait(self, attempt: int):
+        """ Sleep before a retry , a random time up to an exponentially growing limit """
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def send(self, session: requests.Session, method: str, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """ Send: make a request under this policy
+
+        Args:
+            session(requests.Session): the session to send the request with
+            method(str): the http method
+            endpoint(str): the name of the endpoint , used for timeouts and counters
+            url(str): the url to request
+            kwargs: passed on to session.request
+
+        Returns:
+            requests.Response: the response
+
+        Raises:
+            CircuitOpenError: if the circuit breaker for the endpoint is open
+            requests.RequestException: if the request failed and couldn't be retried
+
+        """
+        retryable = method.upper() in self.idempotent_methods
+        kwargs.setdefault('timeout', self.timeout(endpoint))
+        breaker = self.breaker(endpoint)
+        attempt = 0
+
+        # the retries belong to the request the breaker let through so it is only asked once
+        if not breaker.allow():
+            self._count(endpoint, 'short_circuits')
+            raise CircuitOpenError('Circuit breaker is open , not sending {0} request'.format(endpoint))
+
+        try:
+            while True:
+                self._count(endpoint, 'requests')
+                try:
+                    response = session.request(method, url, **kwargs)
+                except requests.RequestException as e:
+                    self._count(endpoint, 'timeouts' if isinstance(e, requests.Timeout) else 'errors')
+                    if not (retryable and attempt < self.retries and isinstance(e, (requests.ConnectionError,
+                                                                                    requests.Timeout))):
+                        breaker.record_failure()
+                        raise
+                    self.logger.info('Retrying {0} after {1}'.format(endpoint, e))
+                else:
+                    if response.status_code < 500:
+                        breaker.record_success()
+                        return response
+
+                    self._count(endpoint, 'errors')
+                    if not (retryable and attempt < self.retries and response.status_code in self.retry_statuses):
+                        breaker.record_failure()
+                        return response
+                    self.logger.info('Retrying {0} after status {1}'.format(endpoint, response.status_code))
+
+                self._count(endpoint, 'retries')
+                self._wait(attempt)
+                attempt += 1
+        except BaseException:
+            # anything else , a bad argument or an interrupt , says nothing about the endpoint but mustn't leave
+            # a half open breaker waiting forever on a trial that is never coming back
+            breaker.release()
+            raise
+
+    @staticmethod
+    def error_response(url: str, error: Exception) -> requests.Response:
+        """ Error Response: make a stand in response for a request that failed without an answer
+
+        This lets callers handle transport failures the same way as error responses from the backend.
+
+        Args:
+            url(str): the url that was requested
+            error(Exception): what went wrong
+
+        Returns:
+            requests.Response: a 503 response with an api style error body , the error is kept in its exception member
+
+        """
+        response = requests.Response()
+        response.status_code = 503
+        response.reason = type(error).__name__
+        response.url = url
+        response._content = json.dumps(dict(status='error', message=str(error))).encode('utf-8')
+        response.encoding = 'utf-8'
+        response.exception = error
+        return response
+
+    def stats(self) -> dict:
+        """ Get the policy counters
+
+        Returns:
+            dict: request , retry , timeout , error and short circuit counts for each endpoint , the total retries
+                  and the circuit breaker state and trip count for each endpoint under breakers
+
+        """
+        with self._lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._endpoints.items()}
+            breakers = dict(self._breakers)
+        return dict(
+            endpoints=endpoints,
+            retries=sum(counters['retries'] for counters in endpoints.values()),
+            breakers={endpoint: dict(state=breaker.state, trips=breaker.trips, short_circuits=breaker.short_circuits)
+                      for endpoint, breaker in breakers.items()},
+        )
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'RateLimit - token bucket rate limits for api requests'
+__all__ = ['TokenBucket', 'RateLimiter']
+
+
+class TokenBucket:
+    """ Token Bucket - lets requests through at a steady rate with room for a burst
+
+    The bucket fills at rate tokens per second up to burst tokens and each request takes a token. When the bucket is
+    empty a request reserves the next token and waits until it is due , so waiting requests are let through in the
+    order they arrived at exactly the target rate rather than all retrying together.
+
+    Args:
+        rate(float): tokens added per second , the steady request rate
+        burst(float): the most tokens the bucket can hold , how many requests can go at once after a quiet spell,
+                      default 1
+
+    Notes:
+        The same bucket can be used from many threads and event loops at once , acquire blocks the calling thread and
+        acquire_async only suspends the calling coroutine.
+        Both return the time the caller was queued for , totals are available from stats.
+
+    """
+    def __init__(self, rate: float, burst: float=1):
+        if rate <= 0:
+            raise ValueError('rate must be more than 0')
+
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+        self._counters = dict(acquired=0, delayed=0, total_delay=0.0, max_delay=0.0)
+
+    def _reserve(self, tokens: float) -> float:
+        """ Take tokens from the bucket and work out how long to wait for them
+
+        The tokens are taken even if the bucket goes negative , that reserves them for this caller so later callers
+        queue up behind it.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self._counters['acquired'] += 1
+            if delay:
+                self._counters['delayed'] += 1
+                self._counters['total_delay'] += delay
+                self._counters['max_delay'] = max(self._counters['max_delay'], delay)
+            return delay
+
+    def acquire(self, tokens: float=1) -> float:
+        """ Acquire: wait until the tokens are available
+
+        Args:
+            tokens(float): how many tokens to take, default 1
+
+        Returns:
+            float: the seconds spent waiting in the queue
+
+        """
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: float=1) -> float:
+        """ Acquire Async: wait until the tokens are available without blocking the event loop
+
+        Args:
+            tokens(float): how many tokens to take, default 1
+
+        Returns:
+            float: the seconds spent waiting in the queue
+
+        """
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def stats(self) -> dict:
+        """ Get the bucket counters
+
+        Returns:
+            dict: acquired and delayed counts , the total , mean and max queueing delay with the rate and burst
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(rate=self.rate, burst=self.burst,
+                     mean_delay=stats['total_delay'] / stats['acquired'] if stats['acquired'] else 0.0)
+        return stats
+
+
+class RateLimiter:
+    """ Rate Limiter - a token bucket for each endpoint
+
+    Limits are given as a rate in requests per second , a (rate, burst) tuple or a TokenBucket to share one bucket
+    with something else. Endpoints without a limit of their own use the default bucket , which all of them share so
+    it works as an overall limit , or are not limited at all if there is no default.
+
+    Pass the same RateLimiter to several api objects and they share the buckets , e.g. to keep a whole test run under
+    the backend's limits::
+
+        limiter = RateLimiter(dict(transact=(20, 5), create_address=10), default=50)
+        apis = [WalletAPI(host, rate_limiter=limiter) for host in hosts]
+
+    Args:
+        limits(dict): rate limits keyed by endpoint name
+        default: the rate limit for any other endpoint , default None for no limit
+
+    """
+    def __init__(self, limits: dict=None, default=None):
+        self._buckets = {endpoint: self._bucket(limit) for endpoint, limit in (limits or {}).items()}
+        self._default = self._bucket(default) if default is not None else None
+
+    @staticmethod
+    def _bucket(limit) -> TokenBucket:
+        if isinstance(limit, TokenBucket):
+            return limit
+        if isinstance(limit, (tuple, list)):
+            return TokenBucket(*limit)
+        return TokenBucket(limit)
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        """ The bucket that limits an endpoint , None if it isn't limited """
+        return self._buckets.get(endpoint, self._default)
+
+    def acquire(self, endpoint: str) -> float:
+        """ Acquire: wait for a token for an endpoint
+
+        Args:
+            endpoint(str): the name of the endpoint
+
+        Returns:
+            float: the seconds spent waiting in the queue
+
+        """
+        bucket = self.bucket(endpoint)
+        return bucket.acquire() if bucket else 0.0
+
+    async def acquire_async(self, endpoint: str) -> float:
+        """ Acquire Async: wait for a token for an endpoint without blocking the event loop
+
+        Args:
+            endpoint(str): the name of the endpoint
+
+        Returns:
+            float: the seconds spent waiting in the queue
+
+        """
+        bucket = self.bucket(endpoint)
+        return await bucket.acquire_async() if bucket else 0.0
+
+    def stats(self) -> dict:
+        """ Get the counters of every bucket
+
+        Returns:
+            dict: TokenBucket stats keyed by endpoint , the default bucket is under 'default'
+
+        """
+        stats = {endpoint: bucket.stats() for endpoint, bucket in self._buckets.items()}
+        if self._default:
+            stats['default'] = self._default.stats()
+        return stats
@@ -1,15 +1,21 @@
+import asyncio
 import os
-import select
+import socket
 import threading
+import time
 import paramiko
 import socketserver as SocketServer
 import logging
+from collections import deque
 
-from Theseus import sleep
+from Theseus.Metrics import Metrics
 
 __author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
 __doc__ = 'SSH Tunnel'
-__all__ = ['SSHTunnel']
+__all__ = ['SSHTunnel', 'TunnelRegistry', 'shared_tunnels']
+
+# seconds between checks that the ssh transport is still up
+_WATCH_INTERVAL = 1.0
 
 
 class SSHTunnel:
@@ -22,11 +28,21 @@ class SSHTunnel:
         user(str): username for the ssh connection
         host(str): hostname for the ssh connection
         port(str): port for the ssh connection (usually 22)
-        localport(int): local port for the ssh forward to forward from
+        localport(int): local port for the ssh forward to forward from , 0 to pick a free one
         remoteport(int): remote port for the ssh forward to forward to
         localhost(str):  local host for the ssh forward to forward from, defaults to 127.0.0.1
         remotehost(str): remote host for the ssh forward to forward to , defaults to 127.0.0.1
-
+        key_filename(str): a private key file to use as well as the keys known to ssh, default None
+        buffer_size(int): bytes to move at a time in each direction of a forwarded connection, default 256KiB
+        mode(str): threads to forward each connection with threads of its own or asyncio to forward them all from
+                   one event loop, default threads
+        keepalive(int): seconds between ssh keepalive messages , 0 for none, default 30
+        reconnect(bool): True to rebuild the ssh connection when it drops, default True
+        max_backoff(float): the longest to wait between reconnection attempts , also how long a new connection to
+                            the local port waits for the ssh connection to come back, default 30
+        metrics(Metrics): where to record how long channels take to open and how long they stay open , default a
+                          Metrics of its own
+        log_interval(float): seconds between log lines with the tunnel figures , default None for no log lines
 
     Returns:
         SSHTunnel: a fully operating SSH tunnel.
@@ -41,9 +57,31 @@ class SSHTunnel:
     You will need to call the stop_tunnel method to shutdown your tunnel otherwise your test wont exit
     Hopefully this will be fixed soon and that wiil become a noop
 
+    Each connection to the local port is forwarded by a pair of threads , one for each direction , that block until
+    there is something to move so an idle tunnel costs nothing. With hundreds of connections open at once that is a
+    lot of threads , mode='asyncio' forwards every connection from a single event loop in the tunnel thread instead
+    so memory and context switches stay flat however many connections there are. The byte counts and rates of the
+    open and recently closed connections are available from channel_stats in either mode.
+
+    Keepalives stop idle ssh connections being dropped by firewalls and show up ones that have died quietly. Once the
+    tunnel is up a watchdog thread checks the ssh connection every second , if it has gone the connection is made
+    again , waiting twice as long after each failed attempt up to max_backoff , while the local port keeps listening.
+    Connections forwarded at the time are lost but new ones wait for the ssh connection to come back , so a long
+    load test rides out a network blip. Reconnection counts and how long each outage lasted are available from
+    reconnect_stats. If the forward server is shut down on its own the watchdog stops the rest of the tunnel rather
+    than keep an ssh connection up that nothing can use.
+
+    When api calls slow down tunnel_stats helps tell the tunnel and the backend apart , it has the active and total
+    channel counts , bytes each way , rejected and failed opens and the latency of opening a channel and lifetime
+    of the channels. The latency figures are recorded in metrics under open_channel and channel.
+
     """
     def __init__(self,  user: str, host: str, port: int=22, localport: int=8090,
-                 remoteport: int=8090,  localhost: str='127.0.0.1', remotehost: str='127.0.0.1'):
+                 remoteport: int=8090,  localhost: str='127.0.0.1', remotehost: str='127.0.0.1',
+                 key_filename: str=None, buffer_size: int=262144, mode: str='threads', keepalive: int=30,
+                 reconnect: bool=True, max_backoff: float=30.0, metrics: Metrics=None, log_interval: float=None):
+        if mode not in ('threads', 'asyncio'):
+            raise ValueError('Unknown tunnel mode {0} , use threads or asyncio'.format(mode))
 
         # params for initial ssh to endpoint
         self._user = user
@@ -55,6 +93,27 @@ class SSHTunnel:
         self._remoteport = remoteport
         self._remotehost = remotehost
         self._localhost = localhost
+        self._key_filename = key_filename
+        self._buffer_size = buffer_size
+        self._mode = mode
+        self._keepalive = keepalive
+        self._reconnect = reconnect
+        self._max_backoff = max_backoff
+
+        # set while the ssh connection is up , forwarded connections wait on it during an outage
+        self._up = threading.Event()
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._watchdog = None
+        self._reconnect_lock = threading.Lock()
+        self._down_since = None
+        self._outages = deque(maxlen=100)
+        self._reconnect_counters = dict(reconnects=0, failed_attempts=0, total_outage=0.0, longest_outage=0.0)
+
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._log_interval = log_interval
+        self._open_lock = threading.Lock()
+        self._open_counters = dict(rejected_opens=0, failed_opens=0)
 
         self.logger = logging.getLogger('theseus.ssh-tunnel')
 
@@ -63,7 +122,9 @@ class SSHTunnel:
         self.client.set_log_channel('theseus.ssh-tunnel')
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.client.load_system_host_keys()
-        self.client.load_host_keys(os.path.expanduser('~/.ssh/known_hosts'))
+        known_hosts = os.path.expanduser('~/.ssh/known_hosts')
+        if os.path.exists(known_hosts):
+            self.client.load_host_keys(known_hosts)
 
         self.thread = threading.Thread()
         self.server = ForwardServer
@@ -82,11 +143,7 @@ class SSHTunnel:
         """
         self.logger.info("Connecting to : {0}".format(self.host))
         try:
-            self.client.connect(
-                self.host,
-                port=self._port,
-                username=self.user,
-            )
+            self._connect()
         except Exception as e:
             self.logger.error("Failed to connect: {0}".format(e))
             return
@@ -101,17 +158,206 @@ class SSHTunnel:
             self.logger.error("C-c: Port forwarding stopped.")
             return
 
+        if self._reconnect:
+            self._watchdog = threading.Thread(target=self._watch, name='theseus-ssh-watchdog', daemon=True)
+            self._watchdog.start()
+        if self._log_interval:
+            threading.Thread(target=self._log_stats, name='theseus-ssh-stats', daemon=True).start()
+
+    def _connect(self):
+        self.client.connect(
+            self.host,
+            port=self._port,
+            username=self.user,
+            key_filename=self._key_filename,
+        )
+        if self._keepalive:
+            self.client.get_transport().set_keepalive(self._keepalive)
+        self._up.set()
+
+    def _transport_up(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _lost(self):
+        """ Note the ssh connection has gone and get the watchdog onto it """
+        with self._reconnect_lock:
+            if self._down_since is None:
+                self._down_since = time.monotonic()
+                self.logger.warning('SSH connection to {0} lost'.format(self.host))
+            self._up.clear()
+        self._wake.set()
+
+    def _forwarding(self) -> bool:
+        """ True until the tunnel is stopped or its forward server has been shut down """
+        return self.thread.is_alive() and not self._stopping.is_set()
+
+    def _watch(self):
+        while not self._stopping.is_set():
+            self._wake.wait(_WATCH_INTERVAL)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            if not self.thread.is_alive():
+                # the forward server was shut down without stopping the tunnel , nothing is listening any more so
+                # don't keep the ssh connection up for it
+                self.stop_tunnel()
+                return
+            if not self._transport_up():
+                self._lost()
+                self._rebuild()
+
+    def _rebuild(self):
+        """ Connect again until it works or the tunnel is stopped , backing off between attempts """
+        delay = min(0.5, self._max_backoff)
+        while self._forwarding():
+            try:
+                self.client.close()
+                self._connect()
+            except Exception as e:
+                self._reconnect_counters['failed_attempts'] += 1
+                self.logger.warning('Reconnecting to {0} failed , trying again in {1:.1f}s: {2}'.format(
+                    self.host, delay, e))
+                self._stopping.wait(delay)
+                delay = min(delay * 2, self._max_backoff)
+                continue
+            if not self._forwarding():
+                # stopped while we were connecting
+                self.client.close()
+                return
+
+            with self._reconnect_lock:
+                outage = time.monotonic() - self._down_since
+                self._down_since = None
+                self._outages.append(outage)
+                self._reconnect_counters['reconnects'] += 1
+                self._reconnect_counters['total_outage'] += outage
+                self._reconnect_counters['longest_outage'] = max(self._reconnect_counters['longest_outage'], outage)
+            self.logger.info('Reconnected to {0} after {1:.3f}s'.format(self.host, outage))
+            return
+
+    def open_channel(self, origin: tuple):
+        """ Open Channel: open a forwarding channel to the remote end , waiting out an ssh outage
+
+        Args:
+            origin(tuple): the address of the local connection being forwarded
+
+        Returns:
+            paramiko.Channel: the channel
+
+        Raises:
+            paramiko.SSHException: if the ssh connection is down and doesn't come back within max_backoff seconds
+
+        """
+        start = time.perf_counter()
+        try:
+            chan = self._open_channel(origin)
+        except paramiko.ChannelException as e:
+            # the ssh server said no , e.g. forwarding is not allowed or nothing listens on the remote port
+            self._count_open('rejected_opens', start, e)
+            raise
+        except Exception as e:
+            self._count_open('failed_opens', start, e)
+            raise
+        self.metrics.record('open_channel', time.perf_counter() - start)
+        return chan
+
+    def _count_open(self, counter: str, start: float, error: Exception):
+        with self._open_lock:
+            self._open_counters[counter] += 1
+        self.metrics.record('open_channel', time.perf_counter() - start, error=type(error).__name__)
+
+    def _open_channel(self, origin: tuple):
+        for attempt in range(2):
+            if not self._up.wait(self._max_backoff if self._reconnect else 0) or self._stopping.is_set():
+                raise paramiko.SSHException('SSH connection to {0} is down'.format(self.host))
+            transport = self.client.get_transport()
+            try:
+                return transport.open_channel("direct-tcpip", (self.remotehost, self.remoteport), origin)
+            except (paramiko.SSHException, EOFError, OSError, AttributeError):
+                if attempt or not self._reconnect or self._transport_up():
+                    raise
+                # the ssh connection died under us , once it is rebuilt try again
+                self._lost()
+
+    @property
+    def alive(self) -> bool:
+        """ True if the tunnel is forwarding or will be once it has reconnected """
+        if not self.thread.is_alive() or self._stopping.is_set():
+            return False
+        return self._transport_up() or (self._watchdog is not None and self._watchdog.is_alive())
+
+    def tunnel_stats(self) -> dict:
+        """ Get the tunnel traffic figures
+
+        Returns:
+            dict: active and total channels , bytes sent and received , rejected and failed opens , open_channel
+                  with the count , mean , p50 , p90 , p99 and max seconds taken to open a channel and channel with
+                  the same figures for how long channels stayed open , see Theseus.Metrics.Metrics.snapshot
+
+        """
+        with self._open_lock:
+            stats = dict(self._open_counters)
+        traffic = self.server.traffic() if isinstance(self.server, (ForwardServer, AsyncForwardServer)) else {}
+        stats.update(active_channels=traffic.get('active', 0), total_channels=traffic.get('total', 0),
+                     bytes_sent=traffic.get('sent', 0), bytes_received=traffic.get('received', 0))
+        snapshot = self.metrics.snapshot()
+        stats.update(open_channel=snapshot.get('open_channel', {}), channel=snapshot.get('channel', {}))
+        return stats
+
+    def _log_stats(self):
+        while not self._stopping.wait(self._log_interval) and self.thread.is_alive():
+            stats = self.tunnel_stats()
+            opening = stats['open_channel']
+            self.logger.info(
+                'SSHTunnel {0} -> {1}:{2}: {3} active , {4} total channels , {5} bytes sent , {6} bytes received , '
+                'open p50 {7:.1f}ms p99 {8:.1f}ms , {9} rejected , {10} failed , {11} reconnects'.format(
+                    self.localport, self.remotehost, self.remoteport, stats['active_channels'],
+                    stats['total_channels'], stats['bytes_sent'], stats['bytes_received'],
+                    opening.get('p50', 0.0) * 1000, opening.get('p99', 0.0) * 1000, stats['rejected_opens'],
+                    stats['failed_opens'], self._reconnect_counters['reconnects']))
+
+    def reconnect_stats(self) -> dict:
+        """ Get the reconnection figures
+
+        Returns:
+            dict: whether the ssh connection is up , reconnects , failed attempts , the total and longest outage in
+                  seconds , the last 100 outages and how long the current one has lasted
+
+        """
+        with self._reconnect_lock:
+            stats = dict(self._reconnect_counters)
+            stats.update(connected=self._transport_up(), outages=list(self._outages),
+                         current_outage=time.monotonic() - self._down_since if self._down_since else 0.0)
+        return stats
+
     def stop_tunnel(self):
         """ Stop SSHTunnel - stop the ssh connection and tunnel """
         # this runs in a try catch encase
         self.logger.info("Attempting to close sshtunnel")
+        self._stopping.set()
+        self._wake.set()
         try:
-            temp = self.server
-            temp.server_close()
+            if isinstance(self.server, (ForwardServer, AsyncForwardServer)):
+                if self.thread.is_alive():
+                    self.server.shutdown()
+                self.server.server_close()
             self.client.close()
         except Exception as e:
             self.logger.error('Something bad happened during shutdown of the ssh tunnel: {0}'.format(e))
 
+    def channel_stats(self) -> list:
+        """ Get the figures for each forwarded connection
+
+        Returns:
+            list: a dict for each open connection and the last 100 closed ones with the peer , whether it is open ,
+                  seconds it was open for , bytes sent and received and bytes per second each way
+
+        """
+        if not isinstance(self.server, (ForwardServer, AsyncForwardServer)):
+            return []
+        return self.server.channel_stats()
+
     @property
     def user(self):
         return self._user
@@ -164,42 +410,222 @@ class SSHTunnel:
         # this is a little convoluted, but lets me configure things for the Handler
         # object.  (SocketServer doesn't give Handlers any way to access the outer
         # server normally.)
-        transport = self.client.get_transport()
+        opener = self.open_channel
         remote_host = self.remotehost
         remote_port = self.remoteport
-
-        class SubHander(Handler):
-            self.logger = logging.getLogger('theseus.ssh-sub-handler')
-            chain_host = remote_host
-            chain_port = remote_port
-            ssh_transport = transport
-
-        self.server = ForwardServer(("", self.localport), SubHander)
+        forward_buffer = self._buffer_size
+
+        if self._mode == 'asyncio':
+            self.server = AsyncForwardServer(("", self.localport), opener, remote_host, remote_port, forward_buffer)
+        else:
+            class SubHander(Handler):
+                self.logger = logging.getLogger('theseus.ssh-sub-handler')
+                chain_host = remote_host
+                chain_port = remote_port
+                open_channel = staticmethod(opener)
+                buffer_size = forward_buffer
+
+            self.server = ForwardServer(("", self.localport), SubHander)
+
+        # a localport of 0 lets the os pick a free port , this is the one it picked
+        self._localport = self.server.server_address[1]
+        self.server.metrics = self.metrics
         self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.thread.start()
 
 
-class ForwardServer(SocketServer.ThreadingTCPServer):
+class TunnelRegistry:
+    """ Tunnel Registry - shares one SSHTunnel between everything that needs the same one
+
+    Every SSHTunnel does its own ssh handshake and listens on a local port of its own , so several clients for the
+    same host either collide on the local port or repeat the whole setup. The registry keeps one tunnel for each user ,
+    host , ssh port and remote endpoint and counts who is using it , the tunnel is stopped when the last user
+    releases it. Use the process wide shared_tunnels rather than making one.
+
+    Usage::
+
+        tunnel = shared_tunnels.acquire('user', 'walletnode', remoteport=8090)
+        api = WalletAPI(ssh_tunnel=False, port=tunnel.localport)
+        ...
+        shared_tunnels.release(tunnel)
+
+    Notes:
+        WalletAPI and AsyncWalletAPI do this for you with shared_tunnel=True.
+        The users of each tunnel are available from stats.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [tunnel , how many are using it]
+        self._tunnels = {}
+        self.logger = logging.getLogger('theseus.ssh-tunnel')
+
+    def acquire(self, user: str, host: str, port: int=22, remoteport: int=8090, remotehost: str='127.0.0.1',
+                localport: int=0, **kwargs) -> SSHTunnel:
+        """ Acquire: get the tunnel to a remote endpoint , opening it if nobody has yet
+
+        Args:
+            user(str): username for the ssh connection
+            host(str): hostname for the ssh connection
+            port(int): port for the ssh connection, default 22
+            remoteport(int): remote port to forward to, default 8090
+            remotehost(str): remote host to forward to, default 127.0.0.1
+            localport(int): local port to forward from if the tunnel has to be opened, default 0 to pick a free one
+            kwargs: anything else for SSHTunnel if the tunnel has to be opened
+
+        Returns:
+            SSHTunnel: the tunnel , connect to its localport which may not be the one asked for if it was already open
+
+        """
+        key = (user, host, port, remotehost, remoteport)
+        with self._lock:
+            entry = self._tunnels.get(key)
+            if entry is not None and not entry[0].alive:
+                self.logger.info('Shared tunnel to {0}@{1} has gone down , opening a new one'.format(user, host))
+                entry[0].stop_tunnel()
+                entry = None
+            if entry is None:
+                # opening it under the lock means two users asking at once still share one handshake
+                entry = self._tunnels[key] = [SSHTunnel(user, host, port, localport=localport, remoteport=remoteport,
+                                                        remotehost=remotehost, **kwargs), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, tunnel: SSHTunnel) -> bool:
+        """ Release: stop using a tunnel , it is stopped if nothing else is using it
+
+        Args:
+            tunnel(SSHTunnel): a tunnel from acquire
+
+        Returns:
+            bool: True if this was the last user and the tunnel was stopped
+
+        """
+        with self._lock:
+            for key, entry in self._tunnels.items():
+                if entry[0] is tunnel:
+                    entry[1] -= 1
+                    if entry[1] > 0:
+                        return False
+                    del self._tunnels[key]
+                    break
+            else:
+                return False
+        tunnel.stop_tunnel()
+        return True
+
+    def stats(self) -> dict:
+        """ Get the shared tunnels
+
+        Returns:
+            dict: for each tunnel , keyed by user@host:port->remotehost:remoteport , its local port and user count
+
+        """
+        with self._lock:
+            return {'{0}@{1}:{2}->{3}:{4}'.format(*key): dict(localport=tunnel.localport, users=users)
+                    for key, (tunnel, users) in self._tunnels.items()}
+
+
+# the registry everything in the process shares
+shared_tunnels = TunnelRegistry()
+
+
+class _Channel:
+    """ The byte counts of one forwarded connection """
+    def __init__(self, peer):
+        self.peer = peer
+        self.opened = time.monotonic()
+        self.closed = None
+        self.sent = 0
+        self.received = 0
+
+    def stats(self) -> dict:
+        seconds = (self.closed or time.monotonic()) - self.opened
+        rate = seconds if seconds > 0 else float('inf')
+        return dict(peer=self.peer, open=self.closed is None, seconds=seconds, sent=self.sent,
+                    received=self.received, sent_rate=self.sent / rate, received_rate=self.received / rate)
+
+
+class _ChannelLog:
+    """ Keeps the open and recently closed connections of a forwarding server """
+    def __init__(self, *args, **kwargs):
+        self._channel_lock = threading.Lock()
+        # open connections -> their ends , so closing the server can close them
+        self._open = {}
+        self._closed = deque(maxlen=100)
+        self._traffic = dict(total=0, sent=0, received=0)
+        # where to record channel lifetimes , set by SSHTunnel
+        self.metrics = None
+        super().__init__(*args, **kwargs)
+
+    def opened(self, channel: _Channel, ends: tuple):
+        with self._channel_lock:
+            self._open[channel] = ends
+            self._traffic['total'] += 1
+
+    def closed(self, channel: _Channel):
+        channel.closed = time.monotonic()
+        with self._channel_lock:
+            self._open.pop(channel, None)
+            self._closed.append(channel)
+            self._traffic['sent'] += channel.sent
+            self._traffic['received'] += channel.received
+        if self.metrics is not None:
+            self.metrics.record('channel', channel.closed - channel.opened, sent=channel.sent,
+                                received=channel.received)
+
+    def traffic(self) -> dict:
+        """ Active and total connections with the bytes moved each way , including by the open ones """
+        with self._channel_lock:
+            traffic = dict(self._traffic, active=len(self._open))
+            traffic['sent'] += sum(channel.sent for channel in self._open)
+            traffic['received'] += sum(channel.received for channel in self._open)
+        return traffic
+
+    def channel_stats(self) -> list:
+        with self._channel_lock:
+            channels = list(self._open) + list(self._closed)
+        return [channel.stats() for channel in channels]
+
+
+class ForwardServer(_ChannelLog, SocketServer.ThreadingTCPServer):
     daemon_threads = True
     allow_reuse_address = True
 
     def server_close(self):
-        self.__shutdown_request = True
+        super().server_close()
+        # closing both ends wakes the forwarding threads which are blocked reading them
+        with self._channel_lock:
+            ends = list(self._open.values())
+        for chan, request in ends:
+            _close(chan, request)
+
+
+def _close(chan, request):
+    """ Close both ends of a forwarded connection , either may already be closed """
+    chan.close()
+    try:
+        request.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    request.close()
 
 
 class Handler(SocketServer.BaseRequestHandler):
+    buffer_size = 262144
+
     def __init__(self, *args, **kwargs):
         # add a logger then run the super class passing on all args
         self.logger = logging.getLogger('theseus.ssh_handler')
         super().__init__(*args, **kwargs)
 
+    def setup(self):
+        # requests and responses are often smaller than a packet , don't hold them back
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     def handle(self):
         try:
-            chan = self.ssh_transport.open_channel(
-                "direct-tcpip",
-                (self.chain_host, self.chain_port),
-                self.request.getpeername(),
-            )
+            chan = self.open_channel(self.request.getpeername())
         except Exception as e:
             self.logger.error(
                 "Incoming request to %s:%d failed: %s"
@@ -213,34 +639,246 @@ class Handler(SocketServer.BaseRequestHandler):
             )
             return
 
+        peername = self.request.getpeername()
         self.logger.debug(
             "Connected!  SSHTunnel open %r -> %r -> %r"
             % (
-                self.request.getpeername(),
+                peername,
                 chan.getpeername(),
                 (self.chain_host, self.chain_port),
             )
         )
-        while True:
-            r, w, x = select.select([self.request, chan], [], [])
-            if self.request in r:
-                data = self.request.recv(1024)
-                if len(data) == 0:
+
+        channel = _Channel(peername)
+        self.server.opened(channel, (chan, self.request))
+        replies = threading.Thread(target=self._downstream, args=(chan, channel), daemon=True)
+        replies.start()
+        self._upstream(chan, channel)
+        replies.join()
+
+        _close(chan, self.request)
+        self.server.closed(channel)
+        stats = channel.stats()
+        self.logger.debug("SSHTunnel closed from {0!r} after {1:.3f}s: {2} bytes sent at {3:.0f}/s , {4} bytes "
+                          "received at {5:.0f}/s".format(peername, stats['seconds'], stats['sent'],
+                                                         stats['sent_rate'], stats['received'],
+                                                         stats['received_rate']))
+
+    def _upstream(self, chan, channel: _Channel):
+        """ Local connection to the ssh channel , read straight into one buffer that is used over and over """
+        view = memoryview(bytearray(self.buffer_size))
+        try:
+            while True:
+                count = self.request.recv_into(view)
+                if not count:
                     break
-                chan.send(data)
-            if chan in r:
-                data = chan.recv(1024)
-                if len(data) == 0:
+                # sendall carries on after partial sends until the whole chunk is through
+                chan.sendall(view[:count])
+                channel.sent += count
+            # pass the half close on so the far end still gets to answer
+            chan.shutdown_write()
+        except (OSError, EOFError, paramiko.SSHException):
+            # one end has gone , close both so the other direction stops too
+            _close(chan, self.request)
+
+    def _downstream(self, chan, channel: _Channel):
+        """ SSH channel to the local connection , paramiko hands over bytes of its own so they are sent as they are """
+        try:
+            while True:
+                data = chan.recv(self.buffer_size)
+                if not data:
                     break
-                self.request.send(data)
+                self.request.sendall(data)
+                channel.received += len(data)
+            self.request.shutdown(socket.SHUT_WR)
+        except (OSError, EOFError, paramiko.SSHException):
+            _close(chan, self.request)
+
+
+class AsyncForwardServer(_ChannelLog):
+    """ Async Forward Server - forwards every connection to the local port from one asyncio event loop
 
-            if self.server._BaseServer__is_shut_down.is_set():
-                self.logger.debug('Closing tunnel due to shutdown request.')
+    It has the parts of ForwardServer that SSHTunnel uses , serve_forever runs the event loop in the calling thread
+    until shutdown is called from another.
+
+    Paramiko channels are not asyncio objects but each has a file descriptor that becomes readable when data or the
+    end of the stream arrives , so the loop waits on that for replies. Sends to a channel can only fail when the ssh
+    window is full , then the loop checks back every millisecond until the far end opens the window again.
+
+    Args:
+        server_address(tuple): the host and port to listen on
+        open_channel(callable): opens a channel to the remote end given the local connection's address , see
+                                SSHTunnel.open_channel
+        chain_host(str): the host to forward to from the far end
+        chain_port(int): the port to forward to
+        buffer_size(int): bytes to move at a time in each direction
+
+    """
+    def __init__(self, server_address: tuple, open_channel, chain_host: str, chain_port: int,
+                 buffer_size: int=262144):
+        super().__init__()
+        self.open_channel = open_channel
+        self.chain_host = chain_host
+        self.chain_port = chain_port
+        self.buffer_size = buffer_size
+        self.logger = logging.getLogger('theseus.ssh_handler')
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(server_address)
+        self.socket.listen(512)
+        self.socket.setblocking(False)
+        self.server_address = self.socket.getsockname()
+
+        self.loop = asyncio.new_event_loop()
+        self._stop = self.loop.create_future()
+        self._tasks = set()
+        self._serving = False
+        self._finished = threading.Event()
+
+    def serve_forever(self):
+        """ Run the event loop until shutdown is called """
+        self._serving = True
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+            self._finished.set()
+
+    def shutdown(self):
+        """ Stop the event loop , closing every forwarded connection , and wait for it to finish """
+        if self._serving and not self._finished.is_set():
+            try:
+                self.loop.call_soon_threadsafe(self._request_stop)
+            except RuntimeError:
+                # the loop closed while we were asking
+                pass
+            self._finished.wait()
+
+    def server_close(self):
+        self.socket.close()
+        if not self._serving and not self.loop.is_closed():
+            self.loop.close()
+
+    def _request_stop(self):
+        if not self._stop.done():
+            self._stop.set_result(None)
+
+    async def _serve(self):
+        accepting = self.loop.create_task(self._accept())
+        await self._stop
+        accepting.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(accepting, *self._tasks, return_exceptions=True)
+
+    async def _accept(self):
+        backoff = 0.01
+        while True:
+            try:
+                client, peer = await self.loop.sock_accept(self.socket)
+            except OSError as e:
+                if self.socket.fileno() == -1:
+                    # the listening socket was closed under us , there is nothing left to accept from
+                    self.logger.error("Listening socket closed , shutting down: {0!r}".format(e))
+                    self._request_stop()
+                    return
+                # out of file descriptors or a connection dropped before we took it , keep accepting
+                self.logger.error("Accepting a connection failed: {0!r}".format(e))
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 1.0)
+                continue
+            backoff = 0.01
+            # requests and responses are often smaller than a packet , don't hold them back
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            task = self.loop.create_task(self._forward(client, peer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _forward(self, client, peer):
+        try:
+            # opening a channel waits for the ssh server to answer , or to come back , so do it off the loop
+            chan = await self.loop.run_in_executor(None, self.open_channel, peer)
+        except Exception as e:
+            self.logger.error("Incoming request to {0}:{1} failed: {2!r}".format(self.chain_host, self.chain_port, e))
+            client.close()
+            return
+        if chan is None:
+            self.logger.error("Incoming request to {0}:{1} was rejected by the SSH server.".format(
+                self.chain_host, self.chain_port))
+            client.close()
+            return
+
+        chan.setblocking(False)
+        self.logger.debug("Connected!  SSHTunnel open {0!r} -> {1!r}".format(peer, (self.chain_host, self.chain_port)))
+
+        channel = _Channel(peer)
+        self.opened(channel, (chan, client))
+        directions = [self.loop.create_task(self._upstream(client, chan, channel)),
+                      self.loop.create_task(self._downstream(chan, client, channel))]
+        try:
+            done, pending = await asyncio.wait(directions, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    self.logger.debug('Forwarding for {0!r} stopped: {1!r}'.format(peer, task.exception()))
+        finally:
+            # closing a socket doesn't wake a coroutine waiting on it , so stop the other direction first
+            for task in directions:
+                task.cancel()
+            await asyncio.gather(*directions, return_exceptions=True)
+            _close(chan, client)
+            self.closed(channel)
+            stats = channel.stats()
+            self.logger.debug("SSHTunnel closed from {0!r} after {1:.3f}s: {2} bytes sent at {3:.0f}/s , {4} bytes "
+                              "received at {5:.0f}/s".format(peer, stats['seconds'], stats['sent'],
+                                                             stats['sent_rate'], stats['received'],
+                                                             stats['received_rate']))
+
+    async def _upstream(self, client, chan, channel: _Channel):
+        """ Local connection to the ssh channel , read straight into one buffer that is used over and over """
+        view = memoryview(bytearray(self.buffer_size))
+        while True:
+            count = await self.loop.sock_recv_into(client, view)
+            if not count:
                 break
-            # let the thread give way
-            sleep(0)
+            pending = view[:count]
+            while pending:
+                try:
+                    sent = chan.send(pending)
+                except socket.timeout:
+                    # the ssh window is full and paramiko can't say when it opens , check back shortly
+                    await asyncio.sleep(0.001)
+                    continue
+                if not sent:
+                    raise EOFError('ssh channel closed')
+                pending = pending[sent:]
+            channel.sent += count
+        # pass the half close on so the far end still gets to answer
+        chan.shutdown_write()
+
+    async def _readable(self, chan):
+        """ Wait for the channel to have data or reach its end """
+        if chan.recv_ready() or chan.eof_received or chan.closed:
+            return
+        waiter = self.loop.create_future()
+        descriptor = chan.fileno()
+        self.loop.add_reader(descriptor, lambda: waiter.done() or waiter.set_result(None))
+        try:
+            await waiter
+        finally:
+            self.loop.remove_reader(descriptor)
 
-        peername = self.request.getpeername()
-        chan.close()
-        self.request.close()
-        self.logger.debug("SSHTunnel closed from %r" % (peername,))
+    async def _downstream(self, chan, client, channel: _Channel):
+        """ SSH channel to the local connection , paramiko hands over bytes of its own so they are sent as they are """
+        while True:
+            await self._readable(chan)
+            try:
+                data = chan.recv(self.buffer_size)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            await self.loop.sock_sendall(client, data)
+            channel.received += len(data)
+        client.shutdown(socket.SHUT_WR)
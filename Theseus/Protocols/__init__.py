@@ -1,3 +1,8 @@
-from .SSHTunnel import SSHTunnel
+from .SSHTunnel import SSHTunnel, TunnelRegistry, shared_tunnels
+from .HTTP import PooledSession
+from .Policy import TransportPolicy, CircuitBreaker, CircuitOpenError
+from .RateLimit import TokenBucket, RateLimiter
+from .Cassette import Cassette, CassetteMissError
 
-__all__ = ['SSHTunnel']
\ No newline at end of file
+__all__ = ['SSHTunnel', 'TunnelRegistry', 'shared_tunnels', 'PooledSession', 'TransportPolicy', 'CircuitBreaker',
+           'CircuitOpenError', 'TokenBucket', 'RateLimiter', 'Cassette', 'CassetteMissError']
\ No newline at end of file
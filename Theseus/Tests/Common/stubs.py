@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+import Theseus
+
+__author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
+__doc__ = 'Tests - a scriptable stand in for WalletAPI'
+__all__ = ['StubWalletAPI']
+
+
+class StubWalletAPI:
+    """ Stub Wallet API - answers the WalletAPI calls the bulk helpers use without a backend
+
+    Use Theseus.Mock.MockWalletBackend to test against real http , this is for the cases the backend can't script
+    such as calls that raise , exact failure patterns and counting how many calls are in flight at once.
+
+    Args:
+        delay(float): seconds each transaction takes, default 0.01
+        fail_every(int): every nth create or transaction is refused , 0 for none, default 0
+        raise_every(int): every nth create raises ConnectionError , 0 for none, default 0
+        error(Exception): raised by every transaction listing , default None
+
+    Notes:
+        Every listed transaction gains a confirmation each time it is listed.
+        calls counts the creates and transactions , requests the listings and peak the most transactions in flight.
+
+    """
+    def __init__(self, delay: float=0.01, fail_every: int=0, raise_every: int=0, error: Exception=None):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.raise_every = raise_every
+        self.error = error
+
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.confirmations = {}
+
+    def _call(self) -> int:
+        with self.lock:
+            self.calls += 1
+            return self.calls
+
+    def create_wallet(self, name, phrase, password='', assurance='strict'):
+        call = self._call()
+        if self.raise_every and call % self.raise_every == 0:
+            raise ConnectionError('connection reset')
+        if self.fail_every and call % self.fail_every == 0:
+            return Theseus.Wallet(id='400', type='error', name='Invalid body in request')
+        return Theseus.Wallet(id='wallet{0}'.format(call), name=name)
+
+    def transact(self, transaction_request):
+        call = self._call()
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+        if self.fail_every and call % self.fail_every == 0:
+            return Theseus.TransactionResponse(json.dumps(dict(status='error', message='busy')))
+        data = dict(id='tx{0}'.format(call), confirmations=0, creationTime='', amount=1, inputs=[], outputs=[],
+                    direction='outgoing', type='local')
+        return Theseus.TransactionResponse(json.dumps(dict(status='success', data=data)))
+
+    def list_transactions(self, wallet_id, ids=None, page=1, per_page=50):
+        with self.lock:
+            self.requests += 1
+            if self.error:
+                raise self.error
+            responses = []
+            for transaction_id in ids:
+                self.confirmations[transaction_id] = self.confirmations.get(transaction_id, 0) + 1
+                data = dict(id=transaction_id, confirmations=self.confirmations[transaction_id], creationTime='',
+                            amount=1, inputs=[], outputs=[], direction='outgoing', type='local')
+                responses.append(Theseus.TransactionResponse(dict(status='success', data=data)))
+            return responses
@@ -0,0 +1,140 @@
+import asyncio
+import socket
+import Theseus
+import unittest2
+import warnings
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusAsyncWalletAPI(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+        self.backend = MockWalletBackend(initial_balance=1000, seed=1).start()
+
+    def tearDown(self):
+        self.backend.stop()
+
+    def api(self, **kwargs):
+        return Theseus.AsyncWalletAPI(automatic=False, **self.backend.api_args(), **kwargs)
+
+    def test_01_create(self):
+        """ create_wallet and restore_wallet return cached wallets , the accounts only cost a request if asked for """
+        async def run():
+            async with self.api() as api:
+                created = await api.create_wallet('async wallet', generate_mnemonic(), password='secret',
+                                                  fetch_accounts=True)
+                restored = await api.restore_wallet('restored wallet', generate_mnemonic(), password='')
+                return created, restored, api.cache_stats(), api.endpoint_stats()
+
+        created, restored, cache, endpoints = asyncio.run(run())
+        self.assertNotEqual(created.type, 'error', msg="wallet created")
+        self.assertEqual(created.name, 'async wallet', msg="name kept")
+        self.assertEqual(created.account[0].amount, 1000, msg="accounts loaded")
+        self.assertNotEqual(restored.type, 'error', msg="wallet restored")
+        self.assertEqual(cache['size'], 2, msg="both wallets cached")
+        self.assertEqual(endpoints['get_accounts']['count'], 1, msg="accounts only fetched when asked for")
+
+    def test_02_listing(self):
+        """ fetch_wallet_list pages the listing and iter_wallets walks every page with or without prefetch """
+        for i in range(7):
+            self.backend.state.create_wallet(dict(name='listed {0}'.format(i),
+                                                  backupPhrase=generate_mnemonic().split()))
+
+        async def run():
+            async with self.api() as api:
+                first = await api.fetch_wallet_list(page=1, per_page=3)
+                last = await api.fetch_wallet_list(page=3, per_page=3)
+                prefetched = [wallet async for wallet in api.iter_wallets(per_page=3)]
+                in_turn = [wallet async for wallet in api.iter_wallets(per_page=3, prefetch=False)]
+                return first, last, prefetched, in_turn, api.endpoint_stats()
+
+        first, last, prefetched, in_turn, endpoints = asyncio.run(run())
+        self.assertEqual((len(first), len(last)), (3, 1), msg="listing paged")
+        self.assertTrue(all(wallet.account for wallet in first.values()), msg="listed accounts loaded")
+        self.assertEqual(len({wallet.id for wallet in prefetched}), 7, msg="every page walked with prefetch")
+        self.assertEqual([wallet.id for wallet in in_turn], [wallet.id for wallet in prefetched],
+                         msg="same order without prefetch")
+        self.assertEqual(endpoints['iter_wallets']['count'], 6, msg="three pages fetched by each walk")
+
+    def test_03_error_statuses(self):
+        """ Error statuses come back as error wallets , empty listings and False rather than exceptions """
+        async def run():
+            async with self.api() as api:
+                missing = await api.delete_wallet(Theseus.Wallet(id='missing', name='missing'))
+                self.backend.error_rate = 1.0
+                self.backend.error_status = 400
+                refused = await api.create_wallet('refused', generate_mnemonic())
+                listing = await api.fetch_wallet_list()
+                walked = [wallet async for wallet in api.iter_wallets()]
+                accounts = await api.get_accounts(Theseus.Wallet(id='any', name='any'))
+                return missing, refused, listing, walked, accounts, api.endpoint_stats()
+
+        missing, refused, listing, walked, accounts, endpoints = asyncio.run(run())
+        self.assertFalse(missing, msg="deleting an unknown wallet is refused")
+        self.assertEqual((refused.type, refused.id), ('error', '400'), msg="error wallet returned")
+        self.assertEqual((listing, walked, accounts), ({}, [], []), msg="failed listings are empty")
+        self.assertEqual(endpoints['delete_wallet']['statuses'], {'404': 1}, msg="not found status recorded")
+        self.assertEqual(endpoints['create_wallet']['statuses'], {'400': 1}, msg="error status recorded")
+
+    def test_04_server_and_transport_errors(self):
+        """ Server errors and failed connections come back as error wallets like they do from WalletAPI """
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            closed_port = probe.getsockname()[1]
+
+        async def run():
+            async with self.api() as api:
+                self.backend.error_rate = 1.0
+                self.backend.error_status = 500
+                failed = await api.create_wallet('failed', generate_mnemonic())
+            unreachable = Theseus.AsyncWalletAPI(host='127.0.0.1', port=closed_port, ssh_tunnel=False,
+                                                 automatic=False)
+            async with unreachable:
+                lost = await unreachable.create_wallet('lost', generate_mnemonic())
+                return failed, lost, unreachable.endpoint_stats()
+
+        failed, lost, endpoints = asyncio.run(run())
+        self.assertEqual((failed.type, failed.id), ('error', '500'), msg="server error wallet returned")
+        self.assertEqual((lost.type, lost.id), ('error', '503'), msg="transport error wallet returned")
+        self.assertEqual(endpoints['create_wallet']['error_classes'], {'ClientConnectorError': 1},
+                         msg="transport error recorded")
+
+    def test_05_close(self):
+        """ close shuts the session , can be called twice and a closed api opens a new session on use """
+        async def run():
+            api = self.api()
+            await api.get_node_info()
+            session = api.session
+            await api.close()
+            await api.close()
+            closed = session.closed, api._session
+            info = await api.get_node_info()
+            reopened = api.session is not session
+            await api.close()
+            return closed, info, reopened
+
+        closed, info, reopened = asyncio.run(run())
+        self.assertEqual(closed, (True, None), msg="session closed and dropped")
+        self.assertEqual(info['status'], 'success', msg="api usable after close")
+        self.assertTrue(reopened, msg="new session made")
+
+    def test_06_ssl_verify(self):
+        """ ssl_verify checks the certificate , the mock backend's self signed one is refused """
+        async def run():
+            async with self.api(ssl_verify=True) as api:
+                await api.get_node_info()
+                return api.endpoint_stats()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            endpoints = asyncio.run(run())
+        self.assertEqual(list(endpoints['get_node_info']['error_classes']), ['ClientConnectorCertificateError'],
+                         msg="certificate refused")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,134 @@
+import threading
+import Theseus
+import unittest2
+from concurrent.futures import ThreadPoolExecutor
+
+from Theseus.Common.Cache import WalletCache
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusWalletCache(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_hits_and_misses(self):
+        """ Lookups of cached wallets hit and lookups of unknown wallets miss """
+        cache = WalletCache()
+        cache.put(Theseus.Wallet(id='one', name='first'))
+
+        self.assertEqual(cache.get('one').name, 'first', msg="cached wallet returned")
+        self.assertIsNone(cache.get('two'), msg="unknown wallet is a miss")
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1, msg="one hit counted")
+        self.assertEqual(stats['misses'], 1, msg="one miss counted")
+
+    def test_refresh_updates_in_place(self):
+        """ Storing a wallet that is already cached updates the cached object """
+        cache = WalletCache()
+        original = cache.put(Theseus.Wallet(id='one', name='first', balance=10))
+        refreshed = cache.put(Theseus.Wallet(id='one', name='first', balance=99))
+
+        self.assertIs(refreshed, original, msg="the cached object is kept")
+        self.assertEqual(original.balance, 99, msg="the cached object has the new balance")
+        self.assertEqual(cache.stats()['refreshes'], 1, msg="refresh counted")
+
+    def test_refresh_during_account_load(self):
+        """ A refresh while the cached wallet is loading its accounts doesn't wait for it and its data wins """
+        cache = WalletCache()
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow_loader():
+            started.set()
+            finish.wait(5)
+            return ['stale']
+
+        cached = cache.put(Theseus.Wallet(id='one', name='first'))
+        cached.load_account_lazily(slow_loader)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            reader = executor.submit(lambda: cached.account)
+            started.wait(5)
+
+            fresh = Theseus.Wallet(id='one', name='renamed', balance=99)
+            fresh.load_account_lazily(lambda: ['fresh'])
+            self.assertIs(cache.put(fresh), cached, msg="refreshed while the load is running")
+            finish.set()
+
+            self.assertEqual(reader.result(timeout=5), ['fresh'], msg="the reader got the refreshed accounts")
+        self.assertEqual((cached.name, cached.balance), ('renamed', 99), msg="fields refreshed")
+        self.assertEqual(cached.account, ['fresh'], msg="accounts loaded through the fresh wallet")
+        self.assertTrue(fresh.account_loaded, msg="the fresh wallet loaded them")
+
+        cache.put(Theseus.Wallet(id='one', name='renamed', account=['set']))
+        self.assertEqual(cached.account, ['set'], msg="loaded accounts copied")
+
+    def test_ttl_and_expire(self):
+        """ Expired wallets miss but stay listed until they are refreshed """
+        cache = WalletCache(ttl=0)
+        cache.put(Theseus.Wallet(id='one', name='first'))
+        self.assertIsNone(cache.get('one'), msg="zero ttl entry has expired")
+        self.assertEqual(len(cache.values()), 1, msg="expired wallet is still listed")
+
+        cache = WalletCache(ttl=None)
+        cache.put(Theseus.Wallet(id='one', name='first'))
+        cache.expire('one')
+        self.assertIsNone(cache.get('one'), msg="expired wallet is a miss")
+        self.assertIsNone(cache.get('one'), msg="still a miss")
+        self.assertEqual(cache.stats()['expirations'], 1, msg="expiry counted once")
+
+        cache.put(Theseus.Wallet(id='one', name='first'))
+        cache.expire('one')
+        self.assertEqual(cache.stats()['expirations'], 2, msg="expiry counted again after a refresh")
+
+    def test_eviction_and_invalidation(self):
+        """ The least recently used wallet is evicted when the cache is full """
+        cache = WalletCache(max_size=2)
+        cache.put(Theseus.Wallet(id='one', name='first'))
+        cache.put(Theseus.Wallet(id='two', name='second'))
+        cache.get('one')
+        cache.put(Theseus.Wallet(id='three', name='third'))
+
+        self.assertIn('one', cache, msg="recently used wallet kept")
+        self.assertNotIn('two', cache, msg="least recently used wallet evicted")
+        self.assertEqual(cache.stats()['evictions'], 1, msg="eviction counted")
+
+        cache.invalidate('one')
+        self.assertNotIn('one', cache, msg="invalidated wallet removed")
+        self.assertEqual(len(cache), 1, msg="one wallet left")
+
+    def test_retain(self):
+        """ retain drops the wallets missing from a complete listing """
+        cache = WalletCache()
+        for wallet_id in ('one', 'two', 'three'):
+            cache.put(Theseus.Wallet(id=wallet_id, name=wallet_id))
+
+        self.assertEqual(cache.retain(['one', 'three']), 1, msg="one wallet dropped")
+        self.assertNotIn('two', cache, msg="missing wallet dropped")
+        self.assertEqual(cache.stats()['invalidations'], 1, msg="invalidation counted")
+
+        paged = dict(data=[{}], meta=dict(pagination=dict(totalPages=2)))
+        self.assertFalse(cache.complete_listing(paged, 1, 1), msg="more pages to come")
+        self.assertFalse(cache.complete_listing(dict(data=[]), 2, 50), msg="not the first page")
+        self.assertTrue(cache.complete_listing(dict(data=[{}]), 1, 50), msg="short page without pagination")
+
+    def test_listing_drops_deleted_wallets(self):
+        """ A complete wallet listing removes wallets deleted behind the api's back """
+        with MockWalletBackend(seed=1) as backend:
+            api = Theseus.WalletAPI(automatic=False, **backend.api_args())
+            kept = {api.create_wallet('kept', generate_mnemonic()).id for i in range(2)}
+            deleted = api.create_wallet('deleted', generate_mnemonic())
+            backend.state.delete_wallet(deleted.id)
+
+            api.fetch_wallet_list(per_page=1)
+            self.assertEqual(len(list(api.wallets)), 3, msg="a partial listing drops nothing")
+
+            self.assertEqual(set(api.fetch_wallet_list()), kept, msg="only the kept wallets listed")
+            self.assertEqual({wallet.id for wallet in api.wallets}, kept, msg="deleted wallet dropped")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,100 @@
+import time
+import Theseus
+import unittest2
+
+from Theseus.Common.Address import AddressRequest
+from Theseus.Common.Cluster import WalletCluster
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusCluster(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+        self.fast = MockWalletBackend(seed=1).start()
+        self.slow = MockWalletBackend(latency=0.05, seed=2).start()
+        self.apis = [Theseus.WalletAPI(automatic=False, **backend.api_args()) for backend in (self.fast, self.slow)]
+
+    def tearDown(self):
+        self.fast.stop()
+        self.slow.stop()
+
+    def test_01_latency_routing(self):
+        """ Latency routing sends new wallets to the backend that answers its pings fastest """
+        with WalletCluster(self.apis, routing='latency', health_interval=None) as cluster:
+            wallets = [cluster.create_wallet('cluster {0}'.format(i), generate_mnemonic()) for i in range(3)]
+            self.assertTrue(all(wallet.type != 'error' for wallet in wallets), msg="wallets created")
+            self.assertEqual(len(self.fast.state.list_wallets()), 3, msg="all on the fast backend")
+            self.assertEqual(len(self.slow.state.list_wallets()), 0, msg="none on the slow backend")
+
+    def test_02_pinning(self):
+        """ Calls about a wallet go to the backend it lives on whatever the routing says """
+        with WalletCluster(self.apis, health_interval=None) as cluster:
+            self.slow.state.create_wallet(dict(name='slow wallet', backupPhrase=generate_mnemonic().split()))
+            listing = cluster.fetch_wallet_list()
+            self.assertEqual(len(listing), 1, msg="listing merged")
+            wallet_id = list(listing)[0]
+            self.assertIs(cluster.api_for(wallet_id), self.apis[1], msg="owner learned from the listing")
+
+            for i in range(4):
+                response = cluster.create_address(AddressRequest(listing[wallet_id]))
+                self.assertTrue(response, msg="address created")
+            stats = cluster.stats()
+            self.assertEqual(stats['pinned'], 5, msg="pinned calls counted")
+            self.assertEqual([backend['requests'] for backend in stats['backends'].values()], [1, 5],
+                             msg="only the listing went to the other backend")
+
+    def test_03_unhealthy(self):
+        """ A backend that fails its health checks is left out of the routing until it recovers """
+        with WalletCluster(self.apis, health_interval=None, unhealthy_after=2) as cluster:
+            self.fast.error_rate = 1.0
+            cluster.check_health()
+            self.assertTrue(cluster.stats()['backends'][cluster._backends[0].name]['healthy'], msg="one failure is ok")
+            cluster.check_health()
+            stats = cluster.stats()
+            self.assertEqual([backend['healthy'] for backend in stats['backends'].values()], [False, True],
+                             msg="fast backend unhealthy")
+            for i in range(3):
+                self.assertIs(cluster.route(), self.apis[1], msg="routed to the healthy backend")
+            wallet = cluster.create_wallet('survivor', generate_mnemonic())
+            self.assertNotEqual(wallet.type, 'error', msg="created on the healthy backend")
+
+            self.fast.error_rate = 0.0
+            cluster.check_health()
+            self.assertTrue(all(backend['healthy'] for backend in cluster.stats()['backends'].values()),
+                            msg="recovered")
+
+    def test_04_health_interval(self):
+        """ The background health check marks a failing backend unhealthy and healthy again on its own """
+        with WalletCluster(self.apis, health_interval=0.1, unhealthy_after=2) as cluster:
+            self.fast.error_rate = 1.0
+            deadline = time.time() + 5
+            while cluster.stats()['backends'][cluster._backends[0].name]['healthy'] and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertFalse(cluster.stats()['backends'][cluster._backends[0].name]['healthy'], msg="marked unhealthy")
+
+            self.fast.error_rate = 0.0
+            deadline = time.time() + 5
+            while not cluster.stats()['backends'][cluster._backends[0].name]['healthy'] and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertTrue(cluster.stats()['backends'][cluster._backends[0].name]['healthy'], msg="healthy again")
+            self.assertTrue(cluster._checker._thread.is_alive(), msg="health check still running")
+
+    def test_05_same_host_and_port(self):
+        """ Two apis on the same host and port are kept apart in the stats and an id filter is refused """
+        apis = [Theseus.WalletAPI(automatic=False, **self.fast.api_args()) for i in range(2)]
+        with WalletCluster(apis, health_interval=None) as cluster:
+            for i in range(2):
+                cluster.create_wallet('shared {0}'.format(i), generate_mnemonic())
+            stats = cluster.stats()
+            self.assertEqual(len(stats['backends']), 2, msg="a stats entry for each backend")
+            self.assertEqual(sum(backend['wallets'] for backend in stats['backends'].values()), 2,
+                             msg="wallets counted once each")
+            with self.assertRaises(ValueError):
+                cluster.fetch_wallet_list(id_filter='anything')
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
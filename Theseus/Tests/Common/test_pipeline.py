@@ -0,0 +1,38 @@
+import Theseus
+import unittest2
+
+from Theseus.Common.Pipeline import TransactionPipeline
+from Theseus.Tests.Common.stubs import StubWalletAPI
+
+
+class TestTheseusTransactionPipeline(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_window(self):
+        """ Every request gets a response and no more than max_in_flight are sent at once """
+        api = StubWalletAPI()
+        pipeline = TransactionPipeline(api, max_in_flight=4)
+        responses = list(pipeline.run(Theseus.TransactionRequest() for i in range(40)))
+
+        self.assertEqual(len(responses), 40, msg="a response for every request")
+        self.assertEqual(len({response.transaction_id for response in responses}), 40, msg="responses are unique")
+        self.assertLessEqual(api.peak, 4, msg="window was respected")
+        self.assertEqual(pipeline.stats()['completed'], 40, msg="completions counted")
+
+    def test_backpressure(self):
+        """ Errors from the backend shrink the window """
+        api = StubWalletAPI(fail_every=2)
+        pipeline = TransactionPipeline(api, max_in_flight=8)
+        responses = list(pipeline.run(Theseus.TransactionRequest() for i in range(40)))
+
+        self.assertEqual(len(responses), 40, msg="a response for every request")
+        self.assertEqual(len([response for response in responses if not response]), 20, msg="errors handed back")
+        self.assertGreater(pipeline.stats()['window_cuts'], 0, msg="window was cut")
+        self.assertLess(pipeline.window, 8, msg="window is smaller than the maximum")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,40 @@
+import Theseus
+import unittest2
+
+from Theseus.Common.Provisioning import create_wallets, WalletCreationFailure
+from Theseus.Tests.Common.stubs import StubWalletAPI
+
+
+class TestTheseusProvisioning(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_create_wallets(self):
+        """ Bulk creation returns the wallets made and typed failures for the rest """
+        # every third create is refused and every fifth raises
+        api = StubWalletAPI(fail_every=3, raise_every=5)
+        progress = []
+        result = create_wallets(api, 30, concurrency=4, progress=lambda done, total, item: progress.append(done))
+
+        self.assertEqual(api.calls, 30, msg="a create for every wallet")
+        self.assertEqual(len(result.wallets) + len(result.failures), 30, msg="every create accounted for")
+        self.assertEqual(len(result.latencies), 30, msg="a latency for every create")
+        self.assertEqual(sorted(progress), list(range(1, 31)), msg="progress reported for every create")
+
+        for failure in result.failures:
+            self.assertIsInstance(failure, WalletCreationFailure, msg="failures are typed")
+
+        raised = [failure for failure in result.failures if not failure.rejected]
+        self.assertEqual(len(raised), 6, msg="exceptions recorded as failures")
+        self.assertFalse(result, msg="a result with failures is false")
+
+    def test_create_wallets_rate(self):
+        """ A rate spaces the creates out """
+        result = create_wallets(StubWalletAPI(), 4, concurrency=4, rate=20)
+        self.assertGreaterEqual(result.elapsed, 0.15, msg="creates were paced")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
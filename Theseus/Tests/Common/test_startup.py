@@ -0,0 +1,58 @@
+import Theseus
+import time
+import unittest2
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusStartup(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # every request takes a while so startup work shows up in the timings
+        cls.backend = MockWalletBackend(latency=0.1, seed=1).start()
+        for i in range(3):
+            cls.backend.state.create_wallet(dict(name='startup {0}'.format(i),
+                                                 backupPhrase=generate_mnemonic().split()))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.stop()
+
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_eager(self):
+        """ Eager startup fills the cache before the constructor returns """
+        api = Theseus.WalletAPI(**self.backend.api_args())
+        stats = api.startup_stats()
+        self.assertTrue(stats['warm'], msg="warm straight away")
+        self.assertGreaterEqual(stats['construction'], 0.2, msg="construction paid for the warmup")
+        self.assertEqual(len(list(api.wallets)), 3, msg="wallets cached")
+
+    def test_02_lazy(self):
+        """ Lazy startup does nothing until the first call which warms up first """
+        api = Theseus.WalletAPI(startup='lazy', **self.backend.api_args())
+        self.assertLess(api.startup_stats()['construction'], 0.1, msg="construction is quick")
+        self.assertFalse(api.startup_stats()['connected'], msg="nothing done yet")
+
+        api.get_node_info()
+        stats = api.startup_stats()
+        self.assertTrue(stats['warm'], msg="warmed on first use")
+        self.assertGreaterEqual(stats['first_use_wait'], 0.2, msg="first call waited for the warmup")
+        self.assertEqual(len(list(api.wallets)), 3, msg="wallets cached")
+
+    def test_03_background(self):
+        """ Background startup returns at once and the cache is ready after waiting """
+        start = time.monotonic()
+        api = Theseus.WalletAPI(startup='background', **self.backend.api_args())
+        self.assertLess(time.monotonic() - start, 0.1, msg="constructor didn't wait")
+        self.assertTrue(api.wait_until_ready(timeout=10), msg="became ready")
+        self.assertGreaterEqual(api.startup_stats()['warmup'], 0.2, msg="warmup timed")
+        self.assertEqual(len(list(api.wallets)), 3, msg="wallets cached")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,114 @@
+import time
+import Theseus
+import unittest2
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Common.Trackers import ConfirmationTracker, SyncWatcher
+from Theseus.Mock import MockWalletBackend
+from Theseus.Tests.Common.stubs import StubWalletAPI
+
+
+class TestTheseusConfirmationTracker(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_batched_confirmations(self):
+        """ Many transactions are confirmed with a request per batch """
+        api = StubWalletAPI()
+        tracker = ConfirmationTracker(api, depth=2, batch_size=10, min_interval=0.01, max_interval=0.05)
+        futures = [tracker.track('tx{0}'.format(i), 'wallet') for i in range(25)]
+
+        for future in futures:
+            self.assertGreaterEqual(future.result(timeout=5).confirmations, 2, msg="confirmed at the right depth")
+        tracker.stop()
+
+        self.assertEqual(tracker.pending, 0, msg="nothing left pending")
+        self.assertEqual(len(tracker.latencies), 25, msg="a latency for every transaction")
+        self.assertLessEqual(api.requests, 9, msg="transactions were polled in batches")
+
+    def test_timeout(self):
+        """ A transaction that doesn't confirm in time raises TimeoutError """
+        api = StubWalletAPI()
+        tracker = ConfirmationTracker(api, depth=1000, min_interval=0.01, max_interval=0.05)
+        future = tracker.track('slow', 'wallet', timeout=0.1)
+
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=5)
+        tracker.stop()
+        self.assertEqual(tracker.stats()['timed_out'], 1, msg="timeout counted")
+
+    def test_timeout_while_failing(self):
+        """ A timeout still fires on time while every poll raises """
+        api = StubWalletAPI(error=ConnectionError('connection reset'))
+        tracker = ConfirmationTracker(api, min_interval=0.05, max_interval=5)
+        start = time.monotonic()
+        future = tracker.track('lost', 'wallet', timeout=0.5)
+
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=5)
+        elapsed = time.monotonic() - start
+        tracker.stop()
+
+        self.assertLess(elapsed, 1, msg="not held up by the backed off interval")
+        self.assertGreater(tracker.stats()['poll_errors'], 0, msg="the failed polls were counted")
+        self.assertEqual(tracker.stats()['timed_out'], 1, msg="timeout counted")
+
+
+class TestTheseusSyncWatcher(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = MockWalletBackend(restore_time=0.5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.stop()
+
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_restores_and_node_share_a_loop(self):
+        """ Restores and the node sync are watched together until they finish """
+        api = Theseus.WalletAPI(automatic=False, **self.backend.api_args())
+        wallets = [api.restore_wallet('restoring', generate_mnemonic(), '') for i in range(5)]
+        watcher = SyncWatcher(api, min_interval=0.02, max_interval=0.1)
+        progress = []
+
+        requests = self.backend.stats()['requests']
+        futures = [watcher.watch_wallet(wallet, on_progress=progress.append) for wallet in wallets]
+        node = watcher.watch_node(on_progress=progress.append)
+
+        for wallet, future in zip(wallets, futures):
+            self.assertIs(future.result(timeout=5), wallet, msg="the watched wallet is returned")
+            self.assertEqual(wallet.syncState['tag'], 'synced', msg="wallet sync state updated")
+        self.assertEqual(node.result(timeout=5)['data']['syncProgress']['quantity'], 100, msg="node synced")
+        watcher.stop()
+
+        stats = watcher.stats()
+        self.assertLessEqual(self.backend.stats()['requests'] - requests, stats['polls'] + 1,
+                             msg="all the wallets were fetched in one listing per poll")
+        self.assertIn(100.0, [report.percentage for report in progress], msg="completion reported")
+        self.assertEqual(stats['finished'], 6, msg="everything finished")
+
+    def test_timeout_on_time(self):
+        """ A restore timeout fires at its deadline rather than at the next backed off poll """
+        with MockWalletBackend(restore_time=3600) as backend:
+            api = Theseus.WalletAPI(automatic=False, **backend.api_args())
+            wallet = api.restore_wallet('stuck', generate_mnemonic(), '')
+
+            # nothing changes so the default interval backs off , the first poll after 2.5s would not be until 6s
+            start = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                api.wait_for_restore(wallet, timeout=2.5)
+            elapsed = time.monotonic() - start
+            api.sync_watcher.stop()
+
+        self.assertGreaterEqual(elapsed, 2.5, msg="not before the deadline")
+        self.assertLess(elapsed, 3, msg="close to the deadline")
+        self.assertEqual(api.sync_watcher.stats()['timed_out'], 1, msg="timeout counted")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,95 @@
+import json
+import pickle
+import threading
+import time
+import Theseus
+import unittest2
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+
+class TestTheseusWallet(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def wallet(self):
+        return Theseus.Wallet(id='lazy', name='lazy wallet', balance=10, spendingPasswordLastUpdate='2018-10-18',
+                              createdAt='2018-10-18', type='regular')
+
+    def test_01_json_round_trip(self):
+        """ to_json writes the lazily loaded accounts as account , no private fields and reads back into a Wallet """
+        wallet = self.wallet()
+        wallet.load_account_lazily(lambda: [Theseus.Account('lazy', 0, 10, 'first')])
+
+        data = json.loads(wallet.to_json())
+        self.assertFalse([key for key in data if key.startswith('_')], msg="no private fields")
+        self.assertEqual(data['account'][0]['amount'], 10, msg="accounts written")
+
+        copy = Theseus.Wallet(**data)
+        self.assertEqual((copy.id, copy.name, copy.balance), ('lazy', 'lazy wallet', 10), msg="fields read back")
+        self.assertEqual(json.loads(copy.to_json()), data, msg="same json again")
+
+    def test_02_lazy_load_runs_once(self):
+        """ Concurrent readers wait for the one loader call and all see its result """
+        calls = []
+
+        def loader():
+            calls.append(threading.get_ident())
+            time.sleep(0.1)
+            return ['loaded']
+
+        wallet = self.wallet()
+        wallet.load_account_lazily(loader)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            accounts = list(executor.map(lambda i: wallet.account, range(4)))
+
+        self.assertEqual(len(calls), 1, msg="loaded once")
+        self.assertEqual(accounts, [['loaded']] * 4, msg="every reader got the accounts")
+        self.assertTrue(wallet.account_loaded, msg="marked loaded")
+
+    def test_03_failed_load_is_retried(self):
+        """ A loader that raises is kept so the next access tries again """
+        attempts = []
+
+        def loader():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise IOError('backend down')
+            return ['loaded']
+
+        wallet = self.wallet()
+        wallet.load_account_lazily(loader)
+        with self.assertRaises(IOError):
+            wallet.account
+        self.assertFalse(wallet.account_loaded, msg="still waiting to load")
+        self.assertEqual(wallet.account, ['loaded'], msg="second access loads")
+
+    def test_04_copy_and_pickle(self):
+        """ Wallets can be deep copied , pickled and dumped through __dict__ whether their accounts are loaded or not """
+        loaded = self.wallet()
+        loaded.load_account_lazily(lambda: [Theseus.Account('lazy', 0, 10, 'first')])
+        loaded.account
+        waiting = self.wallet()
+        waiting.load_account_lazily(lambda: ['loaded'])
+
+        for wallet in (loaded, waiting):
+            for copy in (deepcopy(wallet), pickle.loads(pickle.dumps(wallet))):
+                self.assertIsNot(copy, wallet, msg="a new wallet")
+                self.assertEqual((copy.id, copy.name, copy.balance), ('lazy', 'lazy wallet', 10), msg="fields copied")
+                self.assertTrue(copy.account_loaded, msg="no loader carried over")
+                copy.account = ['replaced']
+                self.assertEqual(copy.account, ['replaced'], msg="the copy has a lock of its own")
+
+        self.assertEqual(deepcopy(loaded).account[0].amount, 10, msg="loaded accounts copied")
+        self.assertFalse(waiting.account_loaded, msg="copying didn't load the original")
+        self.assertEqual(waiting.account, ['loaded'], msg="original still loads")
+
+        dumped = json.loads(json.dumps([loaded, waiting], default=lambda o: o.__dict__))
+        self.assertEqual([data['id'] for data in dumped], ['lazy', 'lazy'], msg="dumped through __dict__")
+        self.assertFalse([key for data in dumped for key in data if key.startswith('_')], msg="no private fields")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
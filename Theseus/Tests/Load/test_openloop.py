@@ -0,0 +1,42 @@
+import Theseus
+import unittest2
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Load import OpenLoop
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusOpenLoop(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_schedule(self):
+        """ Constant arrivals are evenly spaced and poisson arrivals average out to the rate """
+        constant = OpenLoop(None, None, rate=10, duration=2).schedule()
+        self.assertEqual(len(constant), 20, msg="one call per tenth of a second")
+        self.assertAlmostEqual(constant[1][0] - constant[0][0], 0.1, msg="evenly spaced")
+
+        poisson = OpenLoop(None, None, rate=100, duration=100, arrival='poisson', seed=1,
+                           actions=dict(transact=3, create_address=1)).schedule()
+        self.assertAlmostEqual(len(poisson) / 10000.0, 1, delta=0.05, msg="rate kept on average")
+        transacts = len([action for offset, action in poisson if action == 'transact'])
+        self.assertAlmostEqual(transacts / len(poisson), 0.75, delta=0.05, msg="actions weighted")
+
+    def test_02_slow_backend(self):
+        """ A backend slower than the rate shows up as missed times and latency from the intended send time """
+        with MockWalletBackend(latency=0.05, initial_balance=1000000, seed=1) as backend:
+            api = Theseus.WalletAPI(automatic=False, **backend.api_args())
+            wallet = api.create_wallet('open loop', generate_mnemonic())
+
+            report = OpenLoop(api, wallet, rate=100, duration=0.3, max_in_flight=1).run()
+
+        self.assertEqual(report.counters['completed'], report.counters['scheduled'], msg="every call made")
+        self.assertGreater(report.counters['missed'], 0, msg="missed times counted")
+        self.assertGreater(report.actions['transact'].latency['max'], 0.5, msg="queueing counted in the latency")
+        self.assertTrue(report, msg="no call failed")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,49 @@
+import Theseus
+import json
+import os
+import tempfile
+import unittest2
+
+from Theseus.Load import Scenario
+from Theseus.Mock import MockWalletBackend
+
+
+class TestTheseusScenario(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_run_from_file(self):
+        """ A json scenario runs its users against the mock backend and reports each action """
+        with MockWalletBackend(initial_balance=1000000, seed=1) as backend:
+            settings = dict(name='spree', users=4, ramp_up=0.2, duration=1, seed=1, api=backend.api_args(),
+                            actions=[dict(action='transact', weight=4, amount=10),
+                                     dict(action='create_address', weight=2),
+                                     dict(action='list_wallets', weight=1, per_page=10),
+                                     dict(action='create_wallet', weight=1)])
+            path = os.path.join(tempfile.mkdtemp(), 'spree.json')
+            with open(path, 'w') as handle:
+                json.dump(settings, handle)
+
+            report = Scenario.from_file(path).run()
+            os.remove(path)
+
+            self.assertEqual(set(report.actions), {'transact', 'create_address', 'list_wallets', 'create_wallet'},
+                             msg="every action was done")
+            self.assertTrue(report, msg="no action failed")
+            self.assertEqual(report.counters['failed_users'], 0, msg="every user set up")
+            self.assertGreater(report.actions['transact'].rate, 0, msg="throughput reported")
+            self.assertGreater(report.actions['transact'].latency['p99'], 0, msg="latency reported")
+            self.assertEqual(backend.stats()['wallets'], 0, msg="wallets cleaned up")
+
+    def test_02_bad_scenarios(self):
+        """ Unknown actions and scenarios with nothing to do are refused """
+        with self.assertRaises(ValueError):
+            Scenario('bad', users=1, actions=[dict(action='mine_bitcoin')])
+        with self.assertRaises(ValueError):
+            Scenario('idle', users=1, actions=[dict(action='transact', weight=0)])
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
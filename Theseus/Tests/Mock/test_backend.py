@@ -0,0 +1,116 @@
+import asyncio
+import time
+import Theseus
+import unittest2
+from concurrent.futures import ThreadPoolExecutor
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+from Theseus.Protocols.Policy import TransportPolicy
+
+
+class TestTheseusMockBackend(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = MockWalletBackend(initial_balance=1000, confirmation_interval=0.05, seed=1).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.stop()
+
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_wallets(self):
+        """ WalletAPI can create , list , update and delete wallets """
+        api = Theseus.WalletAPI(**self.backend.api_args())
+        wallet = api.create_wallet('mock wallet', generate_mnemonic())
+
+        self.assertNotEqual(wallet.type, 'error', msg="wallet created")
+        self.assertEqual(wallet.balance, 1000, msg="initial balance given")
+        self.assertEqual(wallet.account[0].amount, 1000, msg="accounts loaded")
+        self.assertIn(wallet.id, api.fetch_wallet_list(), msg="wallet listed")
+        self.assertEqual(api.update_wallet(wallet.id, name='renamed').name, 'renamed', msg="wallet renamed")
+        self.assertTrue(api.delete_wallet(wallet), msg="wallet deleted")
+        self.assertEqual(api.refresh_wallet(wallet.id).id, '404', msg="wallet gone")
+
+    def test_02_transactions(self):
+        """ A transaction moves the balance and gains confirmations """
+        api = Theseus.WalletAPI(**self.backend.api_args())
+        payer = api.create_wallet('payer', generate_mnemonic())
+        payee = api.create_wallet('payee', generate_mnemonic())
+        address = list(api.create_address(Theseus.AddressRequest(payee)).data)[0]
+
+        source = Theseus.TransactionSource(payer.account[0].index, payer.id)
+        response = api.transact(Theseus.TransactionRequest(source, [Theseus.TransactionDestination(300, address)]))
+        self.assertTrue(response, msg="transaction accepted")
+
+        self.assertEqual(api.get_wallet(payer.id).balance, 700, msg="payer charged")
+        self.assertEqual(api.get_wallet(payee.id, refresh=True).balance, 1300, msg="payee paid")
+
+        time.sleep(0.1)
+        listed = api.list_transactions(payer.id, ids=[response.transaction_id])
+        self.assertGreaterEqual(listed[0].confirmations, 1, msg="transaction confirmed")
+
+        too_much = Theseus.TransactionRequest(source, [Theseus.TransactionDestination(5000, address)])
+        self.assertFalse(api.transact(too_much), msg="overspend refused")
+
+    def test_03_async_api(self):
+        """ AsyncWalletAPI works against the mock backend """
+        async def run():
+            async with Theseus.AsyncWalletAPI(**self.backend.api_args()) as api:
+                wallets = await asyncio.gather(*[api.create_wallet('async {0}'.format(i), generate_mnemonic())
+                                                 for i in range(10)])
+                listed = [wallet async for wallet in api.iter_wallets(per_page=3)]
+                return wallets, listed
+
+        wallets, listed = asyncio.run(run())
+        self.assertTrue(all(wallet.type != 'error' for wallet in wallets), msg="wallets created")
+        self.assertTrue({wallet.id for wallet in wallets} <= {wallet.id for wallet in listed}, msg="all listed")
+
+    def test_04_faults(self):
+        """ Latency , injected errors and the in flight limit all take effect """
+        with MockWalletBackend(latency=0.05, error_rate=1.0, seed=1) as backend:
+            api = Theseus.WalletAPI(automatic=False, policy=TransportPolicy(retries=0), **backend.api_args())
+            start = time.monotonic()
+            wallet = api.create_wallet('broken', generate_mnemonic())
+            self.assertGreaterEqual(time.monotonic() - start, 0.05, msg="latency added")
+            self.assertEqual((wallet.type, wallet.id), ('error', '500'), msg="error injected")
+            self.assertEqual(backend.stats()['injected_errors'], 1, msg="injected error counted")
+
+        with MockWalletBackend(latency=0.2, max_in_flight=1) as backend:
+            apis = [Theseus.WalletAPI(automatic=False, policy=TransportPolicy(retries=0), **backend.api_args())
+                    for i in range(2)]
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda api: api.get_node_info(), apis))
+            self.assertEqual(backend.stats()['refused'], 1, msg="second request refused")
+
+    def test_05_iter_wallets(self):
+        """ WalletAPI.iter_wallets walks every page of the listing with or without prefetch """
+        with MockWalletBackend(initial_balance=1000, seed=1) as backend:
+            for i in range(7):
+                backend.state.create_wallet(dict(name='listed {0}'.format(i), backupPhrase=generate_mnemonic().split()))
+            api = Theseus.WalletAPI(automatic=False, **backend.api_args())
+
+            prefetched = list(api.iter_wallets(per_page=3))
+            in_turn = list(api.iter_wallets(per_page=3, prefetch=False))
+            self.assertEqual(len({wallet.id for wallet in prefetched}), 7, msg="every page walked with prefetch")
+            self.assertEqual([wallet.id for wallet in in_turn], [wallet.id for wallet in prefetched],
+                             msg="same order without prefetch")
+            self.assertEqual(api.endpoint_stats()['iter_wallets']['count'], 6, msg="three pages fetched by each walk")
+
+            self.assertFalse(prefetched[0].account_loaded, msg="accounts not fetched by the walk")
+            self.assertEqual(prefetched[0].account[0].amount, 1000, msg="accounts load on first use")
+            self.assertEqual(len(list(api.wallets)), 0, msg="the cache is left alone")
+
+            # stopping early leaves at most the prefetched page behind
+            walk = api.iter_wallets(per_page=3)
+            self.assertEqual(next(walk).id, prefetched[0].id, msg="first wallet")
+            walk.close()
+            self.assertLessEqual(api.endpoint_stats()['iter_wallets']['count'], 8, msg="no more pages fetched")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
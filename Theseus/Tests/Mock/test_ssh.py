@@ -0,0 +1,281 @@
+import Theseus
+import paramiko
+import socket
+import threading
+import time
+import unittest2
+
+from Theseus.Mock import MockSSHServer, EchoServer, MockWalletBackend
+from Theseus.Protocols.SSHTunnel import SSHTunnel, shared_tunnels
+
+
+class TestTheseusMockSSH(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_tunnel_to_echo(self):
+        """ SSHTunnel forwards through the mock ssh server to the echo server and back """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                local_port = probe.getsockname()[1]
+
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=local_port, remoteport=echo.port,
+                               key_filename=ssh.key_filename)
+            try:
+                with socket.create_connection(('127.0.0.1', local_port), timeout=10) as connection:
+                    connection.sendall(b'theseus')
+                    received = b''
+                    while len(received) < 7:
+                        received += connection.recv(64)
+                self.assertEqual(received, b'theseus', msg="bytes came back")
+                self.assertEqual(ssh.stats()['channels'], 1, msg="one channel forwarded")
+                self.assertGreaterEqual(ssh.stats()['forwarded_bytes'], 14, msg="both directions counted")
+            finally:
+                tunnel.stop_tunnel()
+
+    def test_02_large_transfer(self):
+        """ A transfer many times the buffer size comes back whole and its rate is reported """
+        payload = bytes(range(256)) * 4096
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                local_port = probe.getsockname()[1]
+
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=local_port, remoteport=echo.port,
+                               key_filename=ssh.key_filename, buffer_size=4096)
+            try:
+                with socket.create_connection(('127.0.0.1', local_port), timeout=10) as connection:
+                    received = []
+
+                    def drain():
+                        count = 0
+                        while count < len(payload):
+                            data = connection.recv(65536)
+                            if not data:
+                                break
+                            received.append(data)
+                            count += len(data)
+
+                    reader = threading.Thread(target=drain)
+                    reader.start()
+                    connection.sendall(payload)
+                    reader.join()
+                    self.assertEqual(b''.join(received), payload, msg="every byte came back in order")
+                    self.assertTrue(tunnel.channel_stats()[0]['open'], msg="open while connected")
+
+                # the close reaches the handler in the background
+                deadline = time.monotonic() + 5
+                while tunnel.channel_stats()[0]['open'] and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                stats = tunnel.channel_stats()
+                self.assertEqual(len(stats), 1, msg="one channel")
+                self.assertFalse(stats[0]['open'], msg="closed when the client closed")
+                self.assertEqual(stats[0]['sent'], len(payload), msg="bytes sent counted")
+                self.assertEqual(stats[0]['received'], len(payload), msg="bytes received counted")
+                self.assertGreater(stats[0]['received_rate'], 0, msg="rate worked out")
+            finally:
+                tunnel.stop_tunnel()
+
+
+    def test_03_asyncio_mode(self):
+        """ The asyncio mode forwards many connections at once without a thread for each """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                local_port = probe.getsockname()[1]
+
+            # the threaded mode names its threads after socketserver's process_request_thread
+            def handlers():
+                return {thread.ident for thread in threading.enumerate() if 'process_request' in thread.name}
+
+            before = handlers()
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=local_port, remoteport=echo.port,
+                               key_filename=ssh.key_filename, mode='asyncio')
+            try:
+                connections = [socket.create_connection(('127.0.0.1', local_port), timeout=10) for i in range(50)]
+                for index, connection in enumerate(connections):
+                    connection.sendall('theseus {0:02d}'.format(index).encode())
+                for index, connection in enumerate(connections):
+                    received = b''
+                    while len(received) < 10:
+                        received += connection.recv(64)
+                    self.assertEqual(received, 'theseus {0:02d}'.format(index).encode(), msg="bytes came back")
+
+                self.assertEqual(handlers() - before, set(), msg="no thread per connection")
+                self.assertEqual(len(tunnel.channel_stats()), 50, msg="every channel tracked")
+
+                tunnel.stop_tunnel()
+                for connection in connections:
+                    self.assertEqual(connection.recv(64), b'', msg="closed by stop_tunnel")
+                    connection.close()
+            finally:
+                tunnel.stop_tunnel()
+
+
+    def test_04_shared_tunnels(self):
+        """ Apis asking for the same tunnel share one ssh connection which closes with the last release """
+        with MockWalletBackend() as backend, MockSSHServer() as ssh:
+            # the apis can't pass a key file so open the shared tunnel with it first
+            tunnel = shared_tunnels.acquire('theseus', ssh.host, ssh.port, remoteport=backend.port,
+                                            key_filename=ssh.key_filename)
+            self.assertNotEqual(tunnel.localport, 0, msg="a free port was picked")
+
+            apis = [Theseus.WalletAPI(ssh_tunnel=True, username='theseus', host=ssh.host, ssh_port=ssh.port,
+                                      remote_port=backend.port, local_port=0, shared_tunnel=True, automatic=False,
+                                      startup=startup) for startup in ('eager', 'lazy')]
+            for api in apis:
+                self.assertTrue(api.ping(), msg="api answered through the shared tunnel")
+                self.assertIs(api.tunnel, tunnel, msg="same tunnel")
+            self.assertEqual(ssh.stats()['connections'], 1, msg="one ssh handshake")
+            self.assertEqual(list(shared_tunnels.stats().values())[0]['users'], 3, msg="three users")
+
+            for api in apis:
+                self.assertFalse(shared_tunnels.release(api.tunnel), msg="still in use")
+            self.assertTrue(shared_tunnels.release(tunnel), msg="last release stops the tunnel")
+            self.assertEqual(shared_tunnels.stats(), {}, msg="registry empty")
+            with self.assertRaises(OSError, msg="nothing listening"):
+                socket.create_connection(('127.0.0.1', tunnel.localport), timeout=1).close()
+
+
+    def test_05_reconnect(self):
+        """ The tunnel rebuilds a dropped ssh connection on the same local port and counts the outage """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                local_port = probe.getsockname()[1]
+
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=local_port, remoteport=echo.port,
+                               key_filename=ssh.key_filename, keepalive=1)
+
+            def echo_through():
+                with socket.create_connection(('127.0.0.1', local_port), timeout=10) as connection:
+                    connection.sendall(b'theseus')
+                    received = b''
+                    while len(received) < 7:
+                        data = connection.recv(64)
+                        if not data:
+                            break
+                        received += data
+                return received
+
+            try:
+                self.assertEqual(echo_through(), b'theseus', msg="forwarding before the drop")
+                ssh.drop_connections()
+                self.assertEqual(echo_through(), b'theseus', msg="forwarding after the drop")
+
+                stats = tunnel.reconnect_stats()
+                self.assertTrue(stats['connected'], msg="connected again")
+                self.assertEqual(stats['reconnects'], 1, msg="one reconnect")
+                self.assertEqual(len(stats['outages']), 1, msg="one outage timed")
+                self.assertLess(stats['longest_outage'], 5, msg="outage was short")
+                self.assertEqual(tunnel.localport, local_port, msg="same local port")
+                self.assertEqual(ssh.stats()['connections'], 2, msg="a second ssh connection")
+            finally:
+                tunnel.stop_tunnel()
+
+
+    def test_06_tunnel_stats(self):
+        """ The tunnel counts channels , bytes and failed opens and times opening and lifetime """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                local_port = probe.getsockname()[1]
+
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=local_port, remoteport=echo.port,
+                               key_filename=ssh.key_filename, reconnect=False, log_interval=0.1)
+            try:
+                for i in range(3):
+                    with socket.create_connection(('127.0.0.1', local_port), timeout=10) as connection:
+                        connection.sendall(b'theseus')
+                        received = b''
+                        while len(received) < 7:
+                            received += connection.recv(64)
+                deadline = time.monotonic() + 5
+                while tunnel.tunnel_stats()['active_channels'] and time.monotonic() < deadline:
+                    time.sleep(0.01)
+
+                # without reconnection a channel can't be opened once the ssh connection has gone
+                ssh.drop_connections()
+                while tunnel.reconnect_stats()['connected'] and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                with self.assertRaises(paramiko.SSHException, msg="open failed"):
+                    tunnel.open_channel(('127.0.0.1', 1))
+
+                stats = tunnel.tunnel_stats()
+                self.assertEqual(stats['total_channels'], 3, msg="channels counted")
+                self.assertEqual(stats['active_channels'], 0, msg="all closed")
+                self.assertEqual(stats['bytes_sent'], 21, msg="bytes sent")
+                self.assertEqual(stats['bytes_received'], 21, msg="bytes received")
+                self.assertEqual(stats['failed_opens'], 1, msg="failed open counted")
+                self.assertEqual(stats['open_channel']['count'], 4, msg="every open timed")
+                self.assertEqual(stats['channel']['count'], 3, msg="every lifetime recorded")
+                self.assertGreater(stats['open_channel']['p50'], 0, msg="open latency")
+            finally:
+                tunnel.stop_tunnel()
+
+    def test_07_orphaned_tunnel(self):
+        """ Shutting down the forward server on its own stops the watchdog and closes the ssh connection """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=0, remoteport=echo.port,
+                               key_filename=ssh.key_filename, keepalive=1, log_interval=0.1)
+            try:
+                self.assertEqual(ssh.stats()['open_connections'], 1, msg="connected")
+                tunnel.server.shutdown()
+
+                deadline = time.monotonic() + 5
+                while tunnel._watchdog.is_alive() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertFalse(tunnel._watchdog.is_alive(), msg="watchdog stopped")
+                self.assertFalse(tunnel.alive, msg="tunnel is down")
+                while ssh.stats()['open_connections'] and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(ssh.stats()['open_connections'], 0, msg="ssh connection closed")
+
+                # nothing is left to bring the connection back
+                ssh.drop_connections()
+                time.sleep(1.5)
+                self.assertEqual(ssh.stats()['connections'], 1, msg="no reconnect")
+                self.assertNotIn('theseus-ssh-stats', [thread.name for thread in threading.enumerate()],
+                                 msg="stats thread stopped")
+            finally:
+                tunnel.stop_tunnel()
+
+    def test_08_asyncio_accept_errors(self):
+        """ The asyncio mode logs a failed accept and keeps accepting """
+        with EchoServer() as echo, MockSSHServer() as ssh:
+            tunnel = SSHTunnel('theseus', ssh.host, ssh.port, localport=0, remoteport=echo.port,
+                               key_filename=ssh.key_filename, mode='asyncio')
+            try:
+                server = tunnel.server
+                sock_accept = server.loop.sock_accept
+                failures = [OSError(24, 'Too many open files')] * 3
+
+                async def flaky_accept(sock):
+                    if failures:
+                        raise failures.pop()
+                    return await sock_accept(sock)
+
+                # swapped in on the loop , the accept already waiting takes the first connection and the failures follow
+                server.loop.call_soon_threadsafe(setattr, server.loop, 'sock_accept', flaky_accept)
+                with socket.create_connection(('127.0.0.1', tunnel.localport), timeout=10) as connection:
+                    connection.sendall(b'theseus')
+                    received = b''
+                    while len(received) < 7:
+                        received += connection.recv(64)
+                self.assertEqual(received, b'theseus', msg="bytes came back")
+                with socket.create_connection(('127.0.0.1', tunnel.localport), timeout=10) as connection:
+                    connection.sendall(b'theseus')
+                    received = b''
+                    while len(received) < 7:
+                        received += connection.recv(64)
+                self.assertEqual(received, b'theseus', msg="still accepting after the failures")
+                self.assertEqual(failures, [], msg="every failure was hit")
+            finally:
+                tunnel.stop_tunnel()
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
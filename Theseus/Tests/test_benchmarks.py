@@ -0,0 +1,45 @@
+import Theseus
+import os
+import tempfile
+import unittest2
+
+from Theseus.Benchmarks import measure, write_results, load_results, compare, run
+
+
+class TestTheseusBenchmarks(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_measure(self):
+        """ measure times every iteration , names the result by its parameters and adds up bytes """
+        calls = []
+        result = measure('count', lambda: calls.append(1) or 10, iterations=20, warmup=3, size=10)
+
+        self.assertEqual(len(calls), 23, msg="warmup runs are not timed")
+        self.assertEqual(result.operations, 20, msg="timed operations counted")
+        self.assertEqual(result.name, 'count[size=10]', msg="parameters in the name")
+        self.assertEqual(result.bytes, 200, msg="bytes added up")
+        self.assertLessEqual(result.latency['p50'], result.latency['max'], msg="percentiles ordered")
+        self.assertGreater(result.ops_per_second, 0, msg="rate worked out")
+
+    def test_02_results_and_regressions(self):
+        """ Results round trip through json and slowdowns past the tolerance are reported """
+        results = run(['models'], quick=True)
+        path = os.path.join(tempfile.mkdtemp(), 'benchmarks.json')
+        write_results(results, path)
+        baseline = load_results(path)
+        self.assertEqual(set(baseline), {result.name for result in results}, msg="every result written")
+        self.assertEqual(compare(results, baseline), [], msg="no regression against itself")
+
+        for name in baseline:
+            baseline[name]['ops_per_second'] *= 2
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), len(results), msg="halved throughput is a regression")
+        self.assertAlmostEqual(regressions[0]['change'], -0.5, msg="change reported")
+        os.remove(path)
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
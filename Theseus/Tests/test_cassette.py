@@ -0,0 +1,66 @@
+import Theseus
+import os
+import tempfile
+import time
+import unittest2
+
+from Theseus.Common.Generators import generate_mnemonic
+from Theseus.Mock import MockWalletBackend
+from Theseus.Protocols.Cassette import Cassette
+from Theseus.Protocols.Policy import TransportPolicy
+
+
+class TestTheseusCassette(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+        self.path = os.path.join(tempfile.mkdtemp(), 'wallets.cassette')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def session(self, api):
+        """ The calls recorded and replayed by these tests """
+        wallet = api.create_wallet('cassette', generate_mnemonic(), password='secret password')
+        self.assertEqual(wallet.account[0].amount, 500, msg="accounts loaded")
+        listing = api.fetch_wallet_list()
+        return wallet, listing
+
+    def test_01_record_and_replay(self):
+        """ A recorded session replays without the backend and gives the same results """
+        with MockWalletBackend(initial_balance=500, latency=0.02, seed=1) as backend:
+            api = Theseus.WalletAPI(automatic=False, cassette=Cassette(self.path, mode='record'),
+                                    **backend.api_args())
+            recorded_wallet, recorded_listing = self.session(api)
+            self.assertEqual(api.cassette_stats()['recorded'], 3, msg="create , accounts and listing recorded")
+
+        with open(self.path) as handle:
+            self.assertNotIn('secret password', handle.read(), msg="request bodies are not stored")
+
+        # the backend is gone , ssh_tunnel is left on to show a replay doesn't open one
+        start = time.monotonic()
+        api = Theseus.WalletAPI(automatic=False, host='nowhere', cassette=Cassette(self.path))
+        wallet, listing = self.session(api)
+        self.assertLess(time.monotonic() - start, 0.06, msg="no delay replaying")
+        self.assertIsNone(api.tunnel, msg="no tunnel for a replay")
+        self.assertEqual((wallet.id, wallet.balance), (recorded_wallet.id, 500), msg="same wallet")
+        self.assertEqual(set(listing), set(recorded_listing), msg="same listing")
+        self.assertEqual(api.cassette_stats()['replayed'], 3, msg="replays counted")
+
+        start = time.monotonic()
+        api = Theseus.WalletAPI(automatic=False, ssh_tunnel=False, cassette=Cassette(self.path, timing='realistic'))
+        self.session(api)
+        self.assertGreaterEqual(time.monotonic() - start, 0.06, msg="recorded latency kept")
+
+    def test_02_missing_recording(self):
+        """ A request that was never recorded comes back as an error rather than reaching a network """
+        open(self.path, 'w').close()
+        api = Theseus.WalletAPI(automatic=False, ssh_tunnel=False, policy=TransportPolicy(retries=0),
+                                cassette=Cassette(self.path))
+        self.assertEqual(api.get_node_info(), dict, msg="nothing to answer with")
+        self.assertEqual(api.cassette_stats()['missed'], 1, msg="miss counted")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -0,0 +1,201 @@
+import Theseus
+import threading
+import unittest2
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from Theseus.Protocols.HTTP import PooledSession
+from Theseus.Protocols.Policy import TransportPolicy, CircuitOpenError
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"status": "success"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """ Answers 503 until it has failed the number of times in its server's failures """
+    protocol_version = 'HTTP/1.1'
+
+    def answer(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+        self.server.calls += 1
+        status = 503 if self.server.calls <= self.server.failures else 200
+        body = b'{"status": "success"}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = answer
+    do_POST = answer
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTheseusPooledSession(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.url = 'http://127.0.0.1:{0}/'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_connections_are_reused(self):
+        """ Sequential requests on a keep-alive session reuse one connection """
+        session = PooledSession()
+        for i in range(5):
+            self.assertEqual(session.get(self.url).status_code, 200, msg="request succeeded")
+        stats = session.pool_stats()
+        session.close()
+
+        self.assertEqual(stats['requests'], 5, msg="all requests counted")
+        self.assertEqual(stats['misses'], 1, msg="only one connection was opened")
+        self.assertEqual(stats['hits'], 4, msg="the connection was reused")
+
+    def test_02_keep_alive_off(self):
+        """ With keep alive turned off every request opens a new connection """
+        session = PooledSession(keep_alive=False)
+        for i in range(3):
+            self.assertEqual(session.get(self.url).status_code, 200, msg="request succeeded")
+        stats = session.pool_stats()
+        session.close()
+
+        self.assertEqual(stats['misses'], 3, msg="a connection per request")
+        self.assertEqual(stats['hits'], 0, msg="no connections reused")
+
+
+class TestTheseusTransportPolicy(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), FlakyHandler)
+        cls.url = 'http://127.0.0.1:{0}/'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+        self.server.calls = 0
+        self.server.failures = 0
+        self.session = PooledSession()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_01_idempotent_calls_are_retried(self):
+        """ A GET that gets a 503 is retried until it works """
+        self.server.failures = 2
+        policy = TransportPolicy(backoff=0)
+
+        response = policy.send(self.session, 'GET', 'get_node_info', self.url)
+        stats = policy.stats()
+
+        self.assertEqual(response.status_code, 200, msg="the retry worked")
+        self.assertEqual(self.server.calls, 3, msg="two retries were made")
+        self.assertEqual(stats['endpoints']['get_node_info']['retries'], 2, msg="retries counted")
+        self.assertEqual(stats['breakers']['get_node_info']['state'], 'closed', msg="breaker stays closed")
+
+    def test_02_other_calls_are_not_retried(self):
+        """ A POST that gets a 503 is handed straight back """
+        self.server.failures = 1
+        policy = TransportPolicy(backoff=0)
+
+        response = policy.send(self.session, 'POST', 'transact', self.url, data='{}')
+
+        self.assertEqual(response.status_code, 503, msg="the error was returned")
+        self.assertEqual(self.server.calls, 1, msg="no retry was made")
+        self.assertEqual(policy.stats()['retries'], 0, msg="no retries counted")
+
+    def test_03_breaker_fails_fast(self):
+        """ Once the backend keeps failing the breaker opens and requests stop being sent """
+        self.server.failures = 100
+        policy = TransportPolicy(retries=0, failure_threshold=3, reset_timeout=60)
+
+        for i in range(3):
+            self.assertEqual(policy.send(self.session, 'GET', 'get_accounts', self.url).status_code, 503,
+                             msg="backend error returned")
+
+        with self.assertRaises(CircuitOpenError, msg="breaker is open"):
+            policy.send(self.session, 'GET', 'get_accounts', self.url)
+
+        stats = policy.stats()
+        self.assertEqual(self.server.calls, 3, msg="nothing sent while open")
+        self.assertEqual(stats['breakers']['get_accounts']['trips'], 1, msg="trip counted")
+        self.assertEqual(stats['breakers']['get_accounts']['short_circuits'], 1, msg="short circuit counted")
+
+    def test_04_breaker_recovers(self):
+        """ After the reset timeout a trial request that works closes the breaker """
+        self.server.failures = 1
+        policy = TransportPolicy(retries=0, failure_threshold=1, reset_timeout=0)
+
+        self.assertEqual(policy.send(self.session, 'GET', 'get_accounts', self.url).status_code, 503,
+                         msg="backend error returned")
+        self.assertEqual(policy.breaker('get_accounts').state, 'open', msg="breaker opened")
+        with self.assertRaises(TypeError, msg="a trial that never reaches the backend"):
+            policy.send(self.session, 'GET', 'get_accounts', self.url, bogus=True)
+        self.assertEqual(policy.send(self.session, 'GET', 'get_accounts', self.url).status_code, 200,
+                         msg="trial request went through")
+        self.assertEqual(policy.breaker('get_accounts').state, 'closed', msg="breaker closed again")
+
+    def test_05_breaker_per_endpoint(self):
+        """ Retries count as one failure and a tripped endpoint doesn't stop the others """
+        self.server.failures = 4
+        policy = TransportPolicy(backoff=0, retries=3, failure_threshold=2, reset_timeout=60)
+
+        self.assertEqual(policy.send(self.session, 'GET', 'get_accounts', self.url).status_code, 503,
+                         msg="every try failed")
+        self.assertEqual(self.server.calls, 4, msg="all the retries were made")
+        self.assertEqual(policy.breaker('get_accounts').state, 'closed', msg="one failure for the request")
+
+        self.server.calls = 0
+        self.server.failures = 100
+        policy.send(self.session, 'GET', 'get_accounts', self.url)
+        with self.assertRaises(CircuitOpenError, msg="get_accounts breaker is open"):
+            policy.send(self.session, 'GET', 'get_accounts', self.url)
+
+        self.server.failures = 0
+        self.assertEqual(policy.send(self.session, 'GET', 'ping', self.url).status_code, 200,
+                         msg="other endpoints still sent")
+        self.assertEqual(policy.stats()['breakers']['ping']['state'], 'closed', msg="ping breaker closed")
+
+    def test_06_connection_errors_become_error_responses(self):
+        """ A request with no answer becomes a 503 error response """
+        error = CircuitOpenError('open')
+        response = TransportPolicy.error_response(self.url, error)
+
+        self.assertEqual(response.status_code, 503, msg="503 status")
+        self.assertEqual(response.json()['status'], 'error', msg="api style error body")
+        self.assertIs(response.exception, error, msg="exception kept")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
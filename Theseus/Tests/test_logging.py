@@ -0,0 +1,74 @@
+import Theseus
+import logging
+import unittest2
+
+from Theseus.Logging import PayloadLogger
+
+
+class Unserialisable:
+    """ Fails the test if anything tries to turn it into json """
+    @property
+    def __dict__(self):
+        raise AssertionError('payload was serialised')
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestTheseusPayloadLogger(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+        self.handle = logging.getLogger('theseus.payloads.' + self._testMethodName)
+        self.handle.propagate = False
+        self.records = ListHandler()
+        self.handle.addHandler(self.records)
+        self.handle.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.handle.removeHandler(self.records)
+
+    def test_01_summary(self):
+        """ Summary mode logs counts and sizes without serialising the payload """
+        PayloadLogger('summary').log(self.handle, 'Fetched wallets', [Unserialisable()] * 3, size=1234)
+
+        self.assertEqual(self.records.messages, ['Fetched wallets: 3 items , 1234 bytes'], msg="summary logged")
+
+    def test_02_sampled(self):
+        """ Sampled mode logs 1 in N payloads """
+        payload_logger = PayloadLogger('sampled', sample_every=5)
+        for i in range(10):
+            payload_logger.log(self.handle, 'Node info', dict(number=i))
+
+        self.assertEqual(len(self.records.messages), 2, msg="two of the ten were logged")
+        self.assertIn('"number": 5', self.records.messages[1], msg="whole payload logged")
+
+    def test_03_full_is_lazy(self):
+        """ Full mode only serialises the payload when DEBUG logging is on """
+        payload_logger = PayloadLogger('full')
+        payload_logger.log(self.handle, 'Node info', Unserialisable())
+        self.assertEqual(self.records.messages, [], msg="nothing logged at INFO")
+
+        self.handle.setLevel(logging.DEBUG)
+        payload_logger.log(self.handle, 'Node info', dict(status='success'))
+        self.assertIn('"status": "success"', self.records.messages[0], msg="whole payload logged at DEBUG")
+
+    def test_04_off(self):
+        """ Off mode logs nothing and unknown modes are refused """
+        PayloadLogger('off').log(self.handle, 'Node info', Unserialisable())
+        self.assertEqual(self.records.messages, [], msg="nothing logged")
+
+        with self.assertRaises(ValueError):
+            PayloadLogger('everything')
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
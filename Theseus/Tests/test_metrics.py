@@ -0,0 +1,63 @@
+import Theseus
+import json
+import os
+import tempfile
+import unittest2
+
+from Theseus.Metrics import Metrics
+
+
+class TestTheseusMetrics(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_percentiles(self):
+        """ Latency percentiles , statuses , errors and sizes are worked out per endpoint """
+        metrics = Metrics()
+        for i in range(1, 101):
+            metrics.record('transact', i / 1000.0, status=200, sent=10, received=20)
+        metrics.record('get_accounts', 0.5, error='ConnectTimeout')
+
+        snapshot = metrics.snapshot()
+        transact = snapshot['transact']
+        self.assertEqual(transact['count'], 100, msg="every request counted")
+        self.assertAlmostEqual(transact['p50'], 0.051, msg="median")
+        self.assertAlmostEqual(transact['p99'], 0.1, msg="99th percentile")
+        self.assertAlmostEqual(transact['max'], 0.1, msg="slowest")
+        self.assertEqual(transact['statuses'], {'200': 100}, msg="status codes counted")
+        self.assertEqual((transact['bytes_sent'], transact['bytes_received']), (1000, 2000), msg="sizes added up")
+        self.assertGreater(transact['rate'], 0, msg="rate worked out")
+        self.assertEqual(snapshot['get_accounts']['error_classes'], {'ConnectTimeout': 1}, msg="error class counted")
+
+    def test_02_reservoir_is_bounded(self):
+        """ Only reservoir_size latencies are kept however many are recorded """
+        metrics = Metrics(reservoir_size=50)
+        for i in range(1000):
+            metrics.record('create_address', 0.01)
+
+        self.assertEqual(len(metrics._endpoints['create_address'].sample), 50, msg="sample is bounded")
+        self.assertEqual(metrics.snapshot()['create_address']['count'], 1000, msg="count isn't")
+
+    def test_03_exports(self):
+        """ The figures can be written as prometheus text and as json """
+        metrics = Metrics()
+        metrics.record('transact', 0.25, status=200)
+
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE theseus_api_request_seconds summary', text, msg="summary type")
+        self.assertIn('theseus_api_request_seconds{endpoint="transact",quantile="0.5"} 0.25', text, msg="quantile")
+        self.assertIn('theseus_api_responses_total{endpoint="transact",status="200"} 1', text, msg="status counter")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            metrics.write_json(path)
+            with open(path) as handle:
+                written = json.load(handle)
+            self.assertEqual(os.listdir(directory), ['metrics.json'], msg="no temporary file left")
+        self.assertEqual(written['endpoints']['transact']['count'], 1, msg="json snapshot written")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
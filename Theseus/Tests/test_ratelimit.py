@@ -0,0 +1,65 @@
+import Theseus
+import asyncio
+import time
+import unittest2
+from concurrent.futures import ThreadPoolExecutor
+
+from Theseus.Protocols.RateLimit import TokenBucket, RateLimiter
+
+
+class TestTheseusRateLimit(unittest2.TestCase):
+    def setUp(self):
+        self.logger = Theseus.get_logger(self._testMethodName)
+        self.logger.info(self._testMethodName + ' - ' + self._testMethodDoc)
+
+    def test_01_burst_goes_straight_through(self):
+        """ A full bucket lets a burst through without waiting """
+        bucket = TokenBucket(rate=1, burst=5)
+        delays = [bucket.acquire() for i in range(5)]
+
+        self.assertEqual(sum(delays), 0, msg="no queueing in the burst")
+        self.assertEqual(bucket.stats()['delayed'], 0, msg="nothing delayed")
+
+    def test_02_threads_are_paced(self):
+        """ Threads sharing a bucket are let through at the bucket rate """
+        bucket = TokenBucket(rate=50)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            delays = list(executor.map(lambda i: bucket.acquire(), range(11)))
+        elapsed = time.monotonic() - start
+        stats = bucket.stats()
+
+        self.assertGreaterEqual(elapsed, 0.19, msg="10 waits at 50 per second")
+        self.assertEqual(stats['acquired'], 11, msg="all acquires counted")
+        self.assertEqual(stats['delayed'], len([delay for delay in delays if delay]), msg="queued callers counted")
+        self.assertAlmostEqual(stats['total_delay'], sum(delays), msg="queueing delay reported to the callers")
+
+    def test_03_coroutines_are_paced(self):
+        """ Coroutines sharing a bucket are let through at the bucket rate """
+        bucket = TokenBucket(rate=50)
+
+        async def run():
+            return await asyncio.gather(*[bucket.acquire_async() for i in range(6)])
+
+        start = time.monotonic()
+        delays = asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, 0.09, msg="5 waits at 50 per second")
+        self.assertEqual(sorted(delays)[0], 0, msg="first caller went straight through")
+
+    def test_04_limiter_buckets(self):
+        """ Endpoints use their own bucket , everything else shares the default """
+        limiter = RateLimiter(dict(transact=(10, 2)), default=100)
+
+        self.assertEqual(limiter.bucket('transact').burst, 2, msg="own bucket")
+        self.assertIs(limiter.bucket('get_accounts'), limiter.bucket('create_address'), msg="shared default")
+        self.assertIsNone(RateLimiter().bucket('transact'), msg="no limit without a default")
+
+        limiter.acquire('get_accounts')
+        self.assertEqual(limiter.stats()['default']['acquired'], 1, msg="default bucket counted")
+
+
+# start unittest2 to run these tests
+if __name__ == "__main__":
+    unittest2.main()
@@ -1,6 +1,7 @@
 # theseus internals
-from .Logging import log_to_console, log_to_file, get_logger
+from .Logging import log_to_console, log_to_file, get_logger, PayloadLogger, set_payload_logging
 from .Time import timestamp, sleep
+from .Metrics import Metrics
 from .Secrets import Secrets
 from .Protocols.SSHTunnel import SSHTunnel
 from .version import __version__, __build__
@@ -12,6 +13,7 @@ from .Common.Transaction import TransactionRequest, TransactionResponse, Transac
 from .Common.Address import AddressRequest, AddressResponse
 from .Common.Wallet import Wallet
 from .Common.WalletAPI import WalletAPI
+from .Common.AsyncWalletAPI import AsyncWalletAPI
 from .Common.Generators import generate_mnemonic, check_mnemonic, generate_walletname, generate_spending_password, encode_spending_password
 
 # composed objects representing key parts of cardano
@@ -22,13 +24,13 @@ __author__ = 'Amias Channer <amias.channer@iohk.io> for IOHK'
 __doc__ = 'Theseus Automated Test Framework'
 __all__ = [
            'Secrets', 'Time', 'SSHTunnel',
-           'get_logger', 'log_to_console', 'log_to_file',
-           'timestamp', 'sleep',
+           'get_logger', 'log_to_console', 'log_to_file', 'PayloadLogger', 'set_payload_logging',
+           'timestamp', 'sleep', 'Metrics',
            'Request', 'Response', 'Source', 'Destination', 'Data',
            'Account',
            'TransactionRequest', 'TransactionResponse', 'TransactionDestination', 'TransactionSource',
            'AddressResponse', 'AddressRequest',
-           'Wallet', 'WalletAPI',
+           'Wallet', 'WalletAPI', 'AsyncWalletAPI',
            'generate_mnemonic', 'check_mnemonic', 'generate_walletname', 'generate_spending_password',
            'encode_spending_password',
            'Cardano', 'Daedalus',
@@ -34,7 +34,7 @@ class BigSpender(unittest2.TestCase):
         self.assertEqual(wallet_two_withdraw_response.status, 'success', msg="Wallet two withdraw succeeded")
 
     def test_04_spending_spree(self):
-        # update the list of wallets in the cache to reflect new balances BUT it doesn't update my wallet objects ?
+        # refresh the wallets in the cache to reflect new balances , cached wallets are updated in place
         self.daedalus.fetch_wallet_list()
 
         # make some spending loops
@@ -17,13 +17,14 @@ setup(
     name='theseus',
     version=__version__,
     build=__build__,
-    packages=['Theseus','Theseus.Protocols', 'Theseus.Common', 'Theseus.Daedalus', 'Theseus.Cardano', 'Theseus.Tests'],
+    packages=['Theseus','Theseus.Protocols', 'Theseus.Common', 'Theseus.Daedalus', 'Theseus.Cardano', 'Theseus.Mock', 'Theseus.Benchmarks', 'Theseus.Load', 'Theseus.Tests'],
     url='https://github.com/input-output-hk/theseus',
     license='MIT',
     author='amias.channer@iohk.io',
     author_email='amias.channer@iohk.io',
     description='a system for orchestrating tests for IOHK projects',
-    install_requires=['typing', 'mnemonic', 'pyblake2', 'base58', 'requests', 'urllib3', 'paramiko', 'unittest2', 'sphinx', 'nose', 'nose_xunitmp', 'sphinx_autodoc_napoleon_typehints'],
+    install_requires=['typing', 'mnemonic', 'pyblake2', 'base58', 'requests', 'urllib3', 'aiohttp', 'paramiko', 'cryptography', 'unittest2', 'sphinx', 'nose', 'nose_xunitmp', 'sphinx_autodoc_napoleon_typehints'],
+    extras_require={'yaml': ['pyyaml']},
     zip_safe=True
 )
 